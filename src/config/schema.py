@@ -120,6 +120,13 @@ class MonitoredFolder(BaseModel):
         default=["jpg", "jpeg", "png", "gif", "heic", "heif", "raw", "cr2", "nef", "arw", "dng"],
         description="File extensions to monitor (lowercase, without dots)"
     )
+    debounce_writes: bool = Field(
+        default=False,
+        description=(
+            "Detect finished files by debouncing modifications instead of "
+            "close-after-write events (for network mounts that don't report closes)"
+        )
+    )
     
     @validator("path")
     def validate_path(cls, v):
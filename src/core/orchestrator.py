@@ -8,6 +8,7 @@ Author: Next_Prism Project
 License: MIT
 """
 
+import os
 import time
 from typing import List, Optional
 from threading import Thread, Event
@@ -25,16 +26,23 @@ logger = get_logger(__name__)
 class FileQueueItem:
     """Item in the file processing queue."""
     
-    def __init__(self, file_path: str, folder_config: MonitoredFolder):
+    def __init__(
+        self,
+        file_path: str,
+        folder_config: MonitoredFolder,
+        stat_result: Optional[os.stat_result] = None
+    ):
         """
         Initialize queue item.
         
         Args:
             file_path: Path to the file
             folder_config: Configuration for the source folder
+            stat_result: File status taken at detection time, if known
         """
         self.file_path = file_path
         self.folder_config = folder_config
+        self.stat_result = stat_result
         self.retry_count = 0
         self.max_retries = 3
 
@@ -82,7 +90,6 @@ class Orchestrator:
         self._stop_event = Event()
         
         # Worker threads
-        self._watcher_thread: Optional[Thread] = None
         self._processor_thread: Optional[Thread] = None
         
         # Batch processing
@@ -137,18 +144,24 @@ class Orchestrator:
             
             self.folder_watcher.add_folder(folder_config)
     
-    def _on_new_photo(self, file_path: str, folder_config: MonitoredFolder):
+    def _on_new_photo(
+        self,
+        file_path: str,
+        folder_config: MonitoredFolder,
+        stat_result: Optional[os.stat_result] = None
+    ):
         """
         Callback when a new photo is detected.
         
         Args:
             file_path: Path to the new photo
             folder_config: Configuration for the source folder
+            stat_result: File status from the watcher's existence check
         """
         logger.info(f"New photo callback: {file_path}")
         
         # Add to processing queue
-        queue_item = FileQueueItem(file_path, folder_config)
+        queue_item = FileQueueItem(file_path, folder_config, stat_result)
         self.file_queue.put(queue_item)
         
         logger.debug(f"Added to queue (size: {self.file_queue.qsize()})")
@@ -164,13 +177,9 @@ class Orchestrator:
         self._running = True
         self._stop_event.clear()
         
-        # Start folder watcher
+        # Start folder watcher (releases debounced files on its own thread)
         self.folder_watcher.start()
         
-        # Start watcher thread (processes pending files)
-        self._watcher_thread = Thread(target=self._watcher_loop, daemon=True)
-        self._watcher_thread.start()
-        
         # Start processor thread (processes queued files)
         self._processor_thread = Thread(target=self._processor_loop, daemon=True)
         self._processor_thread.start()
@@ -191,30 +200,11 @@ class Orchestrator:
         self.folder_watcher.stop()
         
         # Wait for threads to finish
-        if self._watcher_thread:
-            self._watcher_thread.join(timeout=10)
-        
         if self._processor_thread:
             self._processor_thread.join(timeout=10)
         
         logger.info("Orchestrator stopped")
     
-    def _watcher_loop(self):
-        """Thread loop for processing pending files in the watcher."""
-        logger.info("Watcher loop started")
-        
-        while self._running:
-            try:
-                # Process pending files every second
-                self.folder_watcher.process_pending_files()
-                time.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"Error in watcher loop: {e}")
-                time.sleep(5)
-        
-        logger.info("Watcher loop stopped")
-    
     def _processor_loop(self):
         """Thread loop for processing queued files."""
         logger.info("Processor loop started")
@@ -271,7 +261,8 @@ class Orchestrator:
                 result = self.sync_engine.sync_file(
                     file_path=item.file_path,
                     folder_config=item.folder_config,
-                    skip_dedupe=False
+                    skip_dedupe=False,
+                    stat_result=item.stat_result
                 )
                 
                 results.append(result)
@@ -280,6 +271,8 @@ class Orchestrator:
                 if not result.status.value in ["completed", "skipped_duplicate"]:
                     if item.retry_count < item.max_retries:
                         item.retry_count += 1
+                        # The file may have changed since detection; re-stat on retry
+                        item.stat_result = None
                         logger.warning(f"Retrying failed file (attempt {item.retry_count})")
                         self.file_queue.put(item)
                 
@@ -18,8 +18,7 @@ from ..utils.logger import get_logger
 from ..utils.file_ops import (
     calculate_file_hash,
     safe_move_file,
-    archive_file,
-    get_file_size_mb
+    archive_file
 )
 from ..config.schema import MonitoredFolder
 from ..docker_interface.executor import (
@@ -238,7 +237,8 @@ class SyncEngine:
         self,
         file_path: str,
         folder_config: MonitoredFolder,
-        skip_dedupe: bool = False
+        skip_dedupe: bool = False,
+        stat_result: Optional[os.stat_result] = None
     ) -> SyncResult:
         """
         Sync a single file through the complete workflow.
@@ -247,25 +247,30 @@ class SyncEngine:
             file_path: Path to the file to sync
             folder_config: Configuration for the source folder
             skip_dedupe: Skip deduplication check
+            stat_result: File status taken by the watcher; when given, it
+                answers the existence and size checks without another stat
             
         Returns:
             SyncResult with operation details
         """
         logger.info(f"Starting sync for file: {file_path}")
         
-        # Verify file exists
-        if not Path(file_path).exists():
-            logger.error(f"File not found: {file_path}")
-            return SyncResult(
-                source_path=file_path,
-                status=SyncStatus.FAILED,
-                error_message="File not found"
-            )
+        # Verify file exists (the watcher's stat already did, if passed on)
+        if stat_result is None:
+            try:
+                stat_result = os.stat(file_path)
+            except OSError:
+                logger.error(f"File not found: {file_path}")
+                return SyncResult(
+                    source_path=file_path,
+                    status=SyncStatus.FAILED,
+                    error_message="File not found"
+                )
         
         # Calculate file hash
         try:
             file_hash = calculate_file_hash(file_path)
-            file_size = get_file_size_mb(file_path)
+            file_size = stat_result.st_size / (1024 * 1024)
             logger.debug(f"File hash: {file_hash}, size: {file_size:.2f}MB")
         except Exception as e:
             logger.error(f"Failed to hash file {file_path}: {e}")
@@ -14,7 +14,7 @@ from typing import Optional, List, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
-from ..utils.logger import get_logger
+from ..utils.logger import get_logger, LazyCommand
 from ..config.schema import Config
 
 logger = get_logger(__name__)
@@ -34,6 +34,11 @@ class CommandResult:
     stderr: str
     exit_code: int
     execution_time: float
+    
+    @property
+    def raw_stdout(self) -> str:
+        """Standard output as captured (already text for subprocess runs)."""
+        return self.stdout
 
 
 class DockerExecutor:
@@ -54,7 +59,7 @@ class DockerExecutor:
         self.config = config
         self.mode = self._detect_execution_mode()
         
-        logger.info(f"DockerExecutor initialized in {self.mode.value} mode")
+        logger.info("DockerExecutor initialized in %s mode", self.mode.value)
     
     def _detect_execution_mode(self) -> ExecutionMode:
         """
@@ -120,11 +125,11 @@ class DockerExecutor:
                 
                 # Retry with exponential backoff
                 wait_time = 2 ** attempt
-                logger.warning(f"Command failed, retrying in {wait_time}s (attempt {attempt + 1}/{retry_count})")
+                logger.warning("Command failed, retrying in %ds (attempt %d/%d)", wait_time, attempt + 1, retry_count)
                 time.sleep(wait_time)
                 
             except Exception as e:
-                logger.error(f"Error executing command (attempt {attempt + 1}/{retry_count}): {e}")
+                logger.error("Error executing command (attempt %d/%d): %s", attempt + 1, retry_count, e)
                 if attempt == retry_count - 1:
                     return CommandResult(
                         success=False,
@@ -171,7 +176,7 @@ class DockerExecutor:
         # Build docker exec command
         docker_cmd = ["docker", "exec", actual_container] + command
         
-        logger.info(f"Executing: {' '.join(docker_cmd)}")
+        logger.info("Executing: %s", LazyCommand(docker_cmd))
         start_time = time.time()
         
         try:
@@ -187,9 +192,9 @@ class DockerExecutor:
             
             success = result.returncode == 0
             if success:
-                logger.info(f"Command completed successfully in {execution_time:.2f}s")
+                logger.info("Command completed successfully in %.2fs", execution_time)
             else:
-                logger.error(f"Command failed with exit code {result.returncode}")
+                logger.error("Command failed with exit code %d", result.returncode)
             
             return CommandResult(
                 success=success,
@@ -201,7 +206,7 @@ class DockerExecutor:
             
         except subprocess.TimeoutExpired:
             execution_time = time.time() - start_time
-            logger.error(f"Command timed out after {timeout}s")
+            logger.error("Command timed out after %ds", timeout)
             return CommandResult(
                 success=False,
                 stdout="",
@@ -247,7 +252,7 @@ class DockerExecutor:
             f"root@{proxy_host}"
         ] + command
         
-        logger.info(f"Executing via SSH proxy: {' '.join(command)}")
+        logger.info("Executing via SSH proxy: %s", LazyCommand(command))
         start_time = time.time()
         
         try:
@@ -263,9 +268,9 @@ class DockerExecutor:
             
             success = result.returncode == 0
             if success:
-                logger.info(f"Command completed successfully in {execution_time:.2f}s")
+                logger.info("Command completed successfully in %.2fs", execution_time)
             else:
-                logger.error(f"Command failed with exit code {result.returncode}")
+                logger.error("Command failed with exit code %d", result.returncode)
             
             return CommandResult(
                 success=success,
@@ -277,7 +282,7 @@ class DockerExecutor:
             
         except subprocess.TimeoutExpired:
             execution_time = time.time() - start_time
-            logger.error(f"SSH command timed out after {timeout}s")
+            logger.error("SSH command timed out after %ds", timeout)
             return CommandResult(
                 success=False,
                 stdout="",
@@ -312,5 +317,5 @@ class DockerExecutor:
                 return False, f"Connection failed: {result.stderr}"
                 
         except Exception as e:
-            logger.error(f"Error testing connection to {container_name}: {e}")
+            logger.error("Error testing connection to %s: %s", container_name, e)
             return False, str(e)
@@ -9,12 +9,17 @@ License: MIT
 """
 
 import docker
+import logging
 import subprocess
-from typing import Optional, Tuple, List
+import threading
+import time
+from typing import Optional, Tuple, List, Union
 from enum import Enum
 from pathlib import Path
 
-from ..utils.logger import get_logger
+from docker.utils.socket import consume_socket_output, demux_adaptor, frames_iter
+
+from ..utils.logger import get_logger, LazyCommand
 
 # Import SSH proxy components (conditional for environments without Paramiko)
 try:
@@ -34,13 +39,18 @@ class ExecutionMode(Enum):
 
 
 class CommandResult:
-    """Result of a command execution."""
+    """
+    Result of a command execution.
+    
+    Output may be passed as raw bytes; it is only decoded to text the first
+    time stdout/stderr is read, since most callers just check success.
+    """
     
     def __init__(
         self,
         success: bool,
-        stdout: str = "",
-        stderr: str = "",
+        stdout: Union[str, bytes] = "",
+        stderr: Union[str, bytes] = "",
         exit_code: int = 0,
         error_message: Optional[str] = None
     ):
@@ -49,17 +59,36 @@ class CommandResult:
         
         Args:
             success: Whether command succeeded
-            stdout: Standard output
-            stderr: Standard error
+            stdout: Standard output (str, or undecoded UTF-8 bytes)
+            stderr: Standard error (str, or undecoded UTF-8 bytes)
             exit_code: Command exit code
             error_message: Human-readable error message
         """
         self.success = success
-        self.stdout = stdout
-        self.stderr = stderr
+        self._stdout = stdout
+        self._stderr = stderr
         self.exit_code = exit_code
         self.error_message = error_message
     
+    @property
+    def stdout(self) -> str:
+        """Standard output, decoded on first access."""
+        if isinstance(self._stdout, bytes):
+            self._stdout = self._stdout.decode('utf-8', errors='replace')
+        return self._stdout
+    
+    @property
+    def stderr(self) -> str:
+        """Standard error, decoded on first access."""
+        if isinstance(self._stderr, bytes):
+            self._stderr = self._stderr.decode('utf-8', errors='replace')
+        return self._stderr
+    
+    @property
+    def raw_stdout(self) -> Union[str, bytes]:
+        """Standard output as captured, without forcing a decode."""
+        return self._stdout
+    
     def __repr__(self) -> str:
         return f"CommandResult(success={self.success}, exit_code={self.exit_code})"
 
@@ -72,6 +101,20 @@ class DockerExecutor:
     Implements command whitelisting for security and retry logic for reliability.
     """
     
+    # Socket timeout for the shared Docker client (ping, list, inspect...),
+    # so a hung daemon fails calls quickly. Only the read of a command's
+    # output waits longer: its deadline plus EXEC_READ_GRACE.
+    API_TIMEOUT = 60
+    EXEC_READ_GRACE = 60
+    
+    # Exit code coreutils `timeout` returns when the deadline expires
+    TIMEOUT_EXIT_CODE = 124
+    
+    # Pooled connections to the Docker daemon. The client is shared with
+    # proxy discovery, whose worker threads and background refresher issue
+    # API calls concurrently; docker-py's default of 10 would queue them.
+    API_POOL_SIZE = 16
+    
     def __init__(
         self,
         docker_socket: str = "/var/run/docker.sock",
@@ -96,13 +139,18 @@ class DockerExecutor:
         self._ssh_nextcloud: Optional[SSHProxyClient] = None
         self._ssh_photoprism: Optional[SSHProxyClient] = None
         self._proxy_discovery: Optional[ProxyDiscovery] = None
+        self._prefetch_thread: Optional[threading.Thread] = None
         
         # Initialize Docker client
         try:
-            self._docker_client = docker.DockerClient(base_url=f"unix://{docker_socket}")
+            self._docker_client = docker.DockerClient(
+                base_url=f"unix://{docker_socket}",
+                timeout=self.API_TIMEOUT,
+                max_pool_size=self.API_POOL_SIZE
+            )
             logger.info("Docker client initialized")
         except Exception as e:
-            logger.error(f"Failed to initialize Docker client: {e}")
+            logger.error("Failed to initialize Docker client: %s", e)
         
         # Detect Swarm mode if not specified
         if self._swarm_mode is None:
@@ -118,7 +166,7 @@ class DockerExecutor:
             else:
                 self._init_ssh_proxies(nextcloud_proxy_key, photoprism_proxy_key)
         
-        logger.info(f"Docker executor initialized (Swarm mode: {self._swarm_mode})")
+        logger.info("Docker executor initialized (Swarm mode: %s)", self._swarm_mode)
     
     def _init_ssh_proxies(
         self,
@@ -141,9 +189,19 @@ class DockerExecutor:
             self._proxy_discovery = ProxyDiscovery(
                 docker_client=self._docker_client,
                 cache_ttl=60,
-                health_check_timeout=5
+                health_check_timeout=5,
+                background_refresh=True
             )
             logger.info("Proxy discovery initialized")
+            
+            # Warm the proxy cache in the background so the first command
+            # does not block on Swarm service enumeration
+            self._prefetch_thread = threading.Thread(
+                target=self._prefetch_proxies,
+                name="proxy-prefetch",
+                daemon=True
+            )
+            self._prefetch_thread.start()
         
         # Initialize Nextcloud SSH proxy
         if Path(nextcloud_key).exists():
@@ -152,13 +210,13 @@ class DockerExecutor:
                     private_key_path=nextcloud_key,
                     connection_timeout=10,
                     command_timeout=300,
-                    max_connections=3
+                    max_connections=2
                 )
                 logger.info("Nextcloud SSH proxy client initialized")
             except Exception as e:
-                logger.error(f"Failed to initialize Nextcloud SSH proxy: {e}")
+                logger.error("Failed to initialize Nextcloud SSH proxy: %s", e)
         else:
-            logger.warning(f"Nextcloud proxy key not found: {nextcloud_key}")
+            logger.warning("Nextcloud proxy key not found: %s", nextcloud_key)
         
         # Initialize PhotoPrism SSH proxy
         if Path(photoprism_key).exists():
@@ -167,13 +225,17 @@ class DockerExecutor:
                     private_key_path=photoprism_key,
                     connection_timeout=10,
                     command_timeout=300,
-                    max_connections=3
+                    max_connections=2
                 )
                 logger.info("PhotoPrism SSH proxy client initialized")
             except Exception as e:
-                logger.error(f"Failed to initialize PhotoPrism SSH proxy: {e}")
+                logger.error("Failed to initialize PhotoPrism SSH proxy: %s", e)
         else:
-            logger.warning(f"PhotoPrism proxy key not found: {photoprism_key}")
+            logger.warning("PhotoPrism proxy key not found: %s", photoprism_key)
+    
+    def _prefetch_proxies(self):
+        """Discover Nextcloud and PhotoPrism proxies ahead of first use."""
+        self._proxy_discovery.discover_all(["nextcloud", "photoprism"])
     
     def _detect_swarm_mode(self) -> bool:
         """
@@ -188,10 +250,10 @@ class DockerExecutor:
         try:
             swarm_info = self._docker_client.swarm.attrs
             is_swarm = swarm_info.get('ID') is not None
-            logger.info(f"Swarm mode detected: {is_swarm}")
+            logger.info("Swarm mode detected: %s", is_swarm)
             return is_swarm
         except Exception as e:
-            logger.debug(f"Not in Swarm mode: {e}")
+            logger.debug("Not in Swarm mode: %s", e)
             return False
     
     def exec_command(
@@ -217,7 +279,7 @@ class DockerExecutor:
         """
         for attempt in range(retry_attempts):
             if attempt > 0:
-                logger.info(f"Retrying command (attempt {attempt + 1}/{retry_attempts})")
+                logger.info("Retrying command (attempt %d/%d)", attempt + 1, retry_attempts)
             
             if self._swarm_mode:
                 result = self._exec_via_proxy(container_name, command, timeout)
@@ -256,35 +318,39 @@ class DockerExecutor:
             # Get container
             container = self._docker_client.containers.get(container_name)
             
-            logger.info(f"Executing in {container_name}: {' '.join(command)}")
+            logger.info("Executing in %s: %s", container_name, LazyCommand(command))
             
-            # Execute command
-            exit_code, output = container.exec_run(
-                cmd=command,
-                stdout=True,
-                stderr=True,
-                demux=True
+            # Execute command, bounded by coreutils timeout in the container
+            started = time.monotonic()
+            exit_code, output = self._exec_and_read(
+                container.id, ["timeout", str(timeout)] + list(command),
+                timeout + self.EXEC_READ_GRACE
             )
+            elapsed = time.monotonic() - started
             
-            # Parse output (output is a tuple of (stdout, stderr) when demux=True)
-            stdout = output[0].decode('utf-8') if output[0] else ""
-            stderr = output[1].decode('utf-8') if output[1] else ""
-            
-            success = exit_code == 0
+            # Output is a tuple of (stdout, stderr) bytes when demux=True;
+            # CommandResult decodes lazily
+            result = CommandResult(
+                success=exit_code == 0,
+                stdout=output[0] or b"",
+                stderr=output[1] or b"",
+                exit_code=exit_code
+            )
             
-            if success:
-                logger.info(f"Command succeeded in {container_name}")
-                logger.debug(f"Output: {stdout}")
+            if result.success:
+                logger.info("Command succeeded in %s", container_name)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Output: %s", result.stdout)
+            elif exit_code == self.TIMEOUT_EXIT_CODE and elapsed >= timeout:
+                # Commands may exit 124 themselves; only a run that lasted
+                # the whole deadline was stopped by `timeout`
+                result.error_message = f"Command timed out after {timeout}s"
+                logger.error("Command timed out in %s after %ds", container_name, timeout)
             else:
-                logger.error(f"Command failed in {container_name} (exit code: {exit_code})")
-                logger.error(f"Error: {stderr}")
+                logger.error("Command failed in %s (exit code: %s)", container_name, exit_code)
+                logger.error("Error: %s", result.stderr)
             
-            return CommandResult(
-                success=success,
-                stdout=stdout,
-                stderr=stderr,
-                exit_code=exit_code
-            )
+            return result
             
         except docker.errors.NotFound:
             error_msg = f"Container not found: {container_name}"
@@ -301,6 +367,37 @@ class DockerExecutor:
             logger.error(error_msg)
             return CommandResult(success=False, error_message=error_msg)
     
+    def _exec_and_read(
+        self,
+        container_id: str,
+        cmd: List[str],
+        read_timeout: float
+    ) -> Tuple[int, Tuple[Optional[bytes], Optional[bytes]]]:
+        """
+        Run a command like exec_run(demux=True), with its own read timeout.
+        
+        The output is read from the raw exec socket, whose timeout is raised
+        to read_timeout; every other API call keeps the client's API_TIMEOUT.
+        
+        Args:
+            container_id: Container ID
+            cmd: Command as list of strings
+            read_timeout: Socket timeout while reading output (seconds)
+            
+        Returns:
+            Tuple of (exit code, (stdout bytes, stderr bytes))
+        """
+        api = self._docker_client.api
+        exec_id = api.exec_create(container_id, cmd, stdout=True, stderr=True)['Id']
+        sock = api.exec_start(exec_id, socket=True)
+        try:
+            getattr(sock, '_sock', sock).settimeout(read_timeout)
+            frames = (demux_adaptor(*frame) for frame in frames_iter(sock, tty=False))
+            output = consume_socket_output(frames, demux=True)
+        finally:
+            sock.close()
+        return api.exec_inspect(exec_id)['ExitCode'], output
+    
     def _exec_via_proxy(
         self,
         container_name: str,
@@ -336,14 +433,14 @@ class DockerExecutor:
             service_type = "photoprism"
             ssh_client = self._ssh_photoprism
         else:
-            logger.error(f"Cannot determine service type from name: {container_name}")
+            logger.error("Cannot determine service type from name: %s", container_name)
             return CommandResult(
                 success=False,
                 error_message=f"Unknown service type for: {container_name}"
             )
         
         if not ssh_client:
-            logger.error(f"SSH client not initialized for {service_type}")
+            logger.error("SSH client not initialized for %s", service_type)
             return CommandResult(
                 success=False,
                 error_message=f"SSH proxy not configured for {service_type}"
@@ -358,12 +455,17 @@ class DockerExecutor:
             )
         
         proxy = self._proxy_discovery.get_cached_proxy(service_type)
+        if not proxy and self._prefetch_thread and self._prefetch_thread.is_alive():
+            # Discovery already in flight - wait for it instead of repeating it
+            self._prefetch_thread.join(timeout=timeout)
+            proxy = self._proxy_discovery.get_cached_proxy(service_type)
+        
         if not proxy:
-            logger.info(f"Discovering {service_type} proxy...")
+            logger.info("Discovering %s proxy...", service_type)
             proxy = self._proxy_discovery.discover_proxy(service_type)
         
         if not proxy or not proxy.is_healthy:
-            logger.error(f"No healthy {service_type} proxy found")
+            logger.error("No healthy %s proxy found", service_type)
             return CommandResult(
                 success=False,
                 error_message=f"No healthy {service_type} proxy available"
@@ -372,8 +474,8 @@ class DockerExecutor:
         # Execute command via SSH
         command_str = " ".join(command)
         logger.info(
-            f"Executing via {service_type} proxy "
-            f"({proxy.hostname}:{proxy.port}): {command_str}"
+            "Executing via %s proxy (%s:%d): %s",
+            service_type, proxy.hostname, proxy.port, command_str
         )
         
         try:
@@ -385,10 +487,10 @@ class DockerExecutor:
             )
             
             if success:
-                logger.info(f"Command succeeded via {service_type} proxy")
+                logger.info("Command succeeded via %s proxy", service_type)
                 self._proxy_discovery.mark_proxy_success(service_type)
             else:
-                logger.warning(f"Command failed via {service_type} proxy")
+                logger.warning("Command failed via %s proxy", service_type)
                 self._proxy_discovery.mark_proxy_error(service_type)
             
             return CommandResult(
@@ -399,7 +501,7 @@ class DockerExecutor:
             )
             
         except Exception as e:
-            logger.error(f"SSH proxy communication error: {e}")
+            logger.error("SSH proxy communication error: %s", e)
             self._proxy_discovery.mark_proxy_error(service_type)
             return CommandResult(
                 success=False,
@@ -429,171 +531,40 @@ class DockerExecutor:
         except docker.errors.NotFound:
             return False
         except Exception as e:
-            logger.error(f"Error checking container existence: {e}")
+            logger.error("Error checking container existence: %s", e)
             return False
-
-
-class NextcloudCommands:
-    """
-    Nextcloud-specific command interface.
     
-    Provides high-level methods for common Nextcloud occ commands.
-    """
-    
-    def __init__(self, executor: DockerExecutor, container_name: str):
-        """
-        Initialize Nextcloud commands interface.
-        
-        Args:
-            executor: DockerExecutor instance
-            container_name: Nextcloud container name
-        """
-        self.executor = executor
-        self.container_name = container_name
-        logger.info(f"NextcloudCommands initialized for container: {container_name}")
-    
-    def files_scan(
+    def execute_command(
         self,
-        path: Optional[str] = None,
-        user: Optional[str] = None,
-        all_users: bool = False
+        container_name: str,
+        command: List[str],
+        timeout: int = 300,
+        retry_count: int = 1
     ) -> CommandResult:
         """
-        Run occ files:scan command.
+        Execute a command in a Docker container.
         
-        Args:
-            path: Specific path to scan (relative to user files)
-            user: Specific user to scan
-            all_users: Scan all users
-            
-        Returns:
-            CommandResult
-        """
-        command = ["php", "occ", "files:scan"]
-        
-        if all_users:
-            command.append("--all")
-        elif user:
-            command.extend(["--path", f"/{user}/files"])
-            if path:
-                command[-1] += f"/{path}"
-        elif path:
-            command.extend(["--path", path])
-        
-        logger.info(f"Running Nextcloud files:scan: {' '.join(command)}")
-        return self.executor.exec_command(self.container_name, command)
-    
-    def memories_index(
-        self,
-        user: Optional[str] = None,
-        path: Optional[str] = None
-    ) -> CommandResult:
-        """
-        Run occ memories:index command.
+        Same call signature as docker_executor.DockerExecutor.execute_command,
+        so the shared NextcloudCommands/PhotoPrismCommands wrappers can drive
+        either executor.
         
         Args:
-            user: Specific user to index
-            path: Specific path to index
+            container_name: Name or ID of the container
+            command: Command to execute as list of strings
+            timeout: Command timeout in seconds
+            retry_count: Number of attempts on failure
             
         Returns:
-            CommandResult
-        """
-        command = ["php", "occ", "memories:index"]
-        
-        if user:
-            command.extend(["--user", user])
-        if path:
-            command.extend(["--path", path])
-        
-        logger.info(f"Running Nextcloud memories:index: {' '.join(command)}")
-        return self.executor.exec_command(self.container_name, command)
-    
-    def check_status(self) -> CommandResult:
-        """
-        Check Nextcloud status.
-        
-        Returns:
-            CommandResult
+            CommandResult with execution details
         """
-        command = ["php", "occ", "status"]
-        return self.executor.exec_command(self.container_name, command)
+        return self.exec_command(
+            container_name,
+            command,
+            timeout=timeout,
+            retry_attempts=retry_count
+        )
 
 
-class PhotoPrismCommands:
-    """
-    PhotoPrism-specific command interface.
-    
-    Provides high-level methods for PhotoPrism CLI commands.
-    """
-    
-    def __init__(self, executor: DockerExecutor, container_name: str):
-        """
-        Initialize PhotoPrism commands interface.
-        
-        Args:
-            executor: DockerExecutor instance
-            container_name: PhotoPrism container name
-        """
-        self.executor = executor
-        self.container_name = container_name
-        logger.info(f"PhotoPrismCommands initialized for container: {container_name}")
-    
-    def index(
-        self,
-        path: Optional[str] = None,
-        cleanup: bool = False
-    ) -> CommandResult:
-        """
-        Run PhotoPrism index command.
-        
-        Args:
-            path: Specific path to index (relative to import folder)
-            cleanup: Remove missing files from index
-            
-        Returns:
-            CommandResult
-        """
-        command = ["photoprism", "index"]
-        
-        if path:
-            command.extend(["--path", path])
-        if cleanup:
-            command.append("--cleanup")
-        
-        logger.info(f"Running PhotoPrism index: {' '.join(command)}")
-        return self.executor.exec_command(self.container_name, command, timeout=600)
-    
-    def import_photos(
-        self,
-        path: Optional[str] = None,
-        move: bool = False
-    ) -> CommandResult:
-        """
-        Run PhotoPrism import command.
-        
-        Args:
-            path: Specific path to import from
-            move: Move files instead of copy
-            
-        Returns:
-            CommandResult
-        """
-        command = ["photoprism", "import"]
-        
-        if path:
-            command.extend(["--path", path])
-        if move:
-            command.append("--move")
-        
-        logger.info(f"Running PhotoPrism import: {' '.join(command)}")
-        return self.executor.exec_command(self.container_name, command, timeout=600)
-    
-    def check_status(self) -> CommandResult:
-        """
-        Check PhotoPrism status.
-        
-        Returns:
-            CommandResult
-        """
-        command = ["photoprism", "status"]
-        return self.executor.exec_command(self.container_name, command)
+# Command wrappers live in their own modules; re-exported for existing imports
+from .nextcloud_commands import NextcloudCommands  # noqa: E402,F401
+from .photoprism_commands import PhotoPrismCommands  # noqa: E402,F401
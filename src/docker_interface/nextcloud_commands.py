@@ -10,7 +10,7 @@ License: MIT
 from pathlib import Path
 from typing import Optional, List
 
-from ..utils.logger import get_logger
+from ..utils.logger import get_logger, LazyCommand
 from .docker_executor import DockerExecutor, CommandResult
 
 logger = get_logger(__name__)
@@ -25,15 +25,83 @@ class NextcloudCommands:
     - memories:index: Trigger Memories app indexing
     """
     
-    def __init__(self, executor: DockerExecutor):
+    def __init__(self, executor: DockerExecutor, container_name: str = "nextcloud"):
         """
         Initialize Nextcloud commands.
         
         Args:
-            executor: DockerExecutor instance
+            executor: DockerExecutor instance (either executor implementation)
+            container_name: Target container passed to the executor
         """
         self.executor = executor
-        logger.info("NextcloudCommands initialized")
+        self.container_name = container_name
+        logger.info("NextcloudCommands initialized for container: %s", container_name)
+    
+    def files_scan(
+        self,
+        path: Optional[str] = None,
+        user: Optional[str] = None,
+        all_users: bool = False
+    ) -> CommandResult:
+        """
+        Run occ files:scan command.
+        
+        Args:
+            path: Specific path to scan (relative to user files)
+            user: Specific user to scan
+            all_users: Scan all users
+            
+        Returns:
+            CommandResult
+        """
+        command = ["php", "occ", "files:scan"]
+        
+        if all_users:
+            command.append("--all")
+        elif user:
+            command.extend(["--path", f"/{user}/files"])
+            if path:
+                command[-1] += f"/{path}"
+        elif path:
+            command.extend(["--path", path])
+        
+        logger.info("Running Nextcloud files:scan: %s", LazyCommand(command))
+        return self.executor.execute_command(self.container_name, command)
+    
+    def memories_index(
+        self,
+        user: Optional[str] = None,
+        path: Optional[str] = None
+    ) -> CommandResult:
+        """
+        Run occ memories:index command.
+        
+        Args:
+            user: Specific user to index
+            path: Specific path to index
+            
+        Returns:
+            CommandResult
+        """
+        command = ["php", "occ", "memories:index"]
+        
+        if user:
+            command.extend(["--user", user])
+        if path:
+            command.extend(["--path", path])
+        
+        logger.info("Running Nextcloud memories:index: %s", LazyCommand(command))
+        return self.executor.execute_command(self.container_name, command)
+    
+    def check_status(self) -> CommandResult:
+        """
+        Check Nextcloud status.
+        
+        Returns:
+            CommandResult
+        """
+        command = ["php", "occ", "status"]
+        return self.executor.execute_command(self.container_name, command)
     
     def scan_user_files(self, username: str, path: Optional[str] = None) -> CommandResult:
         """
@@ -53,8 +121,8 @@ class NextcloudCommands:
         else:
             cmd.append(username)
         
-        logger.info(f"Scanning files for user {username}" + (f" path {path}" if path else ""))
-        return self.executor.execute_command("nextcloud", cmd, timeout=300)
+        logger.info("Scanning files for user %s%s", username, f" path {path}" if path else "")
+        return self.executor.execute_command(self.container_name, cmd, timeout=300)
     
     def scan_all_users(self) -> CommandResult:
         """
@@ -65,7 +133,7 @@ class NextcloudCommands:
         """
         cmd = ["php", "occ", "files:scan", "--all"]
         logger.info("Scanning files for all users")
-        return self.executor.execute_command("nextcloud", cmd, timeout=600)
+        return self.executor.execute_command(self.container_name, cmd, timeout=600)
     
     def trigger_memories_index(self, username: Optional[str] = None) -> CommandResult:
         """
@@ -81,11 +149,11 @@ class NextcloudCommands:
         
         if username:
             cmd.append(username)
-            logger.info(f"Triggering Memories index for user {username}")
+            logger.info("Triggering Memories index for user %s", username)
         else:
             logger.info("Triggering Memories index for all users")
         
-        return self.executor.execute_command("nextcloud", cmd, timeout=600)
+        return self.executor.execute_command(self.container_name, cmd, timeout=600)
     
     def get_status(self) -> CommandResult:
         """
@@ -95,7 +163,7 @@ class NextcloudCommands:
             CommandResult with status information
         """
         cmd = ["php", "occ", "status"]
-        return self.executor.execute_command("nextcloud", cmd, timeout=30)
+        return self.executor.execute_command(self.container_name, cmd, timeout=30)
     
     def maintenance_mode(self, enable: bool) -> CommandResult:
         """
@@ -109,8 +177,8 @@ class NextcloudCommands:
         """
         mode = "on" if enable else "off"
         cmd = ["php", "occ", "maintenance:mode", f"--{mode}"]
-        logger.info(f"Setting maintenance mode: {mode}")
-        return self.executor.execute_command("nextcloud", cmd, timeout=30)
+        logger.info("Setting maintenance mode: %s", mode)
+        return self.executor.execute_command(self.container_name, cmd, timeout=30)
     
     def list_users(self) -> List[str]:
         """
@@ -120,15 +188,16 @@ class NextcloudCommands:
             List of usernames
         """
         cmd = ["php", "occ", "user:list", "--output=json"]
-        result = self.executor.execute_command("nextcloud", cmd, timeout=30)
+        result = self.executor.execute_command(self.container_name, cmd, timeout=30)
         
         if result.success:
             try:
                 import json
-                users_data = json.loads(result.stdout)
+                # json.loads accepts bytes, so skip the intermediate decode
+                users_data = json.loads(result.raw_stdout)
                 return list(users_data.keys())
             except Exception as e:
-                logger.error(f"Error parsing user list: {e}")
+                logger.error("Error parsing user list: %s", e)
                 return []
         else:
             logger.error("Failed to retrieve user list")
@@ -9,7 +9,7 @@ License: MIT
 
 from typing import Optional
 
-from ..utils.logger import get_logger
+from ..utils.logger import get_logger, LazyCommand
 from .docker_executor import DockerExecutor, CommandResult
 
 logger = get_logger(__name__)
@@ -25,34 +25,74 @@ class PhotoPrismCommands:
     - start: Start PhotoPrism server
     """
     
-    def __init__(self, executor: DockerExecutor):
+    def __init__(self, executor: DockerExecutor, container_name: str = "photoprism"):
         """
         Initialize PhotoPrism commands.
         
         Args:
-            executor: DockerExecutor instance
+            executor: DockerExecutor instance (either executor implementation)
+            container_name: Target container passed to the executor
         """
         self.executor = executor
-        logger.info("PhotoPrismCommands initialized")
+        self.container_name = container_name
+        logger.info("PhotoPrismCommands initialized for container: %s", container_name)
     
-    def import_photos(self, move: bool = True) -> CommandResult:
+    def index(
+        self,
+        path: Optional[str] = None,
+        cleanup: bool = False
+    ) -> CommandResult:
+        """
+        Run PhotoPrism index command.
+        
+        Args:
+            path: Specific path to index (relative to import folder)
+            cleanup: Remove missing files from index
+            
+        Returns:
+            CommandResult
+        """
+        command = ["photoprism", "index"]
+        
+        if path:
+            command.extend(["--path", path])
+        if cleanup:
+            command.append("--cleanup")
+        
+        logger.info("Running PhotoPrism index: %s", LazyCommand(command))
+        return self.executor.execute_command(self.container_name, command, timeout=600)
+    
+    def check_status(self) -> CommandResult:
+        """
+        Check PhotoPrism status.
+        
+        Returns:
+            CommandResult
+        """
+        command = ["photoprism", "status"]
+        return self.executor.execute_command(self.container_name, command)
+    
+    def import_photos(self, move: bool = True, path: Optional[str] = None) -> CommandResult:
         """
         Import photos from import directory.
         
         Args:
             move: True to move files, False to copy
+            path: Specific path to import from
         
         Returns:
             CommandResult
         """
         cmd = ["photoprism", "import"]
         
+        if path:
+            cmd.extend(["--path", path])
         if move:
             # Move files instead of copying
             cmd.append("--move")
         
-        logger.info(f"Importing photos ({'move' if move else 'copy'} mode)")
-        return self.executor.execute_command("photoprism", cmd, timeout=600)
+        logger.info("Importing photos (%s mode)", "move" if move else "copy")
+        return self.executor.execute_command(self.container_name, cmd, timeout=600)
     
     def index_photos(self, path: Optional[str] = None) -> CommandResult:
         """
@@ -68,11 +108,11 @@ class PhotoPrismCommands:
         
         if path:
             cmd.append(path)
-            logger.info(f"Indexing photos at path: {path}")
+            logger.info("Indexing photos at path: %s", path)
         else:
             logger.info("Indexing all photos")
         
-        return self.executor.execute_command("photoprism", cmd, timeout=600)
+        return self.executor.execute_command(self.container_name, cmd, timeout=600)
     
     def get_version(self) -> CommandResult:
         """
@@ -82,7 +122,7 @@ class PhotoPrismCommands:
             CommandResult with version information
         """
         cmd = ["photoprism", "version"]
-        return self.executor.execute_command("photoprism", cmd, timeout=30)
+        return self.executor.execute_command(self.container_name, cmd, timeout=30)
     
     def get_status(self) -> CommandResult:
         """
@@ -92,7 +132,7 @@ class PhotoPrismCommands:
             CommandResult with status information
         """
         cmd = ["photoprism", "status"]
-        return self.executor.execute_command("photoprism", cmd, timeout=30)
+        return self.executor.execute_command(self.container_name, cmd, timeout=30)
     
     def optimize_thumbnails(self) -> CommandResult:
         """
@@ -103,7 +143,7 @@ class PhotoPrismCommands:
         """
         cmd = ["photoprism", "thumbnails", "--force"]
         logger.info("Optimizing thumbnails")
-        return self.executor.execute_command("photoprism", cmd, timeout=1800)
+        return self.executor.execute_command(self.container_name, cmd, timeout=1800)
     
     def backup_database(self, output_path: str) -> CommandResult:
         """
@@ -116,8 +156,8 @@ class PhotoPrismCommands:
             CommandResult
         """
         cmd = ["photoprism", "backup", "--force", "--output", output_path]
-        logger.info(f"Backing up database to {output_path}")
-        return self.executor.execute_command("photoprism", cmd, timeout=300)
+        logger.info("Backing up database to %s", output_path)
+        return self.executor.execute_command(self.container_name, cmd, timeout=300)
     
     def restore_database(self, backup_path: str) -> CommandResult:
         """
@@ -130,5 +170,5 @@ class PhotoPrismCommands:
             CommandResult
         """
         cmd = ["photoprism", "restore", "--force", backup_path]
-        logger.info(f"Restoring database from {backup_path}")
-        return self.executor.execute_command("photoprism", cmd, timeout=300)
+        logger.info("Restoring database from %s", backup_path)
+        return self.executor.execute_command(self.container_name, cmd, timeout=300)
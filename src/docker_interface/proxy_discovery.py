@@ -19,11 +19,17 @@ Author: Next_Prism Project
 License: MIT
 """
 
+import errno
 import logging
+import select
 import socket
+import struct
+import threading
 import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple, Union
 
 import docker
 from docker.errors import DockerException
@@ -32,7 +38,7 @@ from docker.errors import DockerException
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class ProxyService:
     """Represents a discovered proxy service."""
     service_name: str
@@ -40,9 +46,10 @@ class ProxyService:
     hostname: str
     port: int
     ip_address: Optional[str] = None
-    last_check: float = 0
+    last_check: float = 0  # time.monotonic() timestamp
     is_healthy: bool = False
     error_count: int = 0
+    stable_hits: int = 0  # consecutive successes; each doubles the cache TTL
 
 
 class ProxyDiscovery:
@@ -67,33 +74,99 @@ class ProxyDiscovery:
         ```
     """
     
+    # Upper bound on cached proxies; least recently used entries are evicted
+    CACHE_MAXSIZE = 64
+    
+    # Daemon connection pool size for a client created here (covers the
+    # discovery worker threads plus the background refresher)
+    DOCKER_POOL_SIZE = 16
+    
+    # How long one services.list() snapshot is reused across lookups (seconds)
+    SERVICE_LIST_TTL = 5
+    
     def __init__(
         self,
         docker_client: Optional[docker.DockerClient] = None,
         cache_ttl: int = 60,
+        cache_ttl_max: int = 600,
         health_check_timeout: int = 5,
-        max_error_count: int = 3
+        max_error_count: int = 3,
+        dns_ttl: int = 60,
+        neg_cache_ttl: int = 5,
+        known_service_types: Optional[List[str]] = None,
+        background_refresh: bool = False
     ):
         """
         Initialize proxy discovery.
         
         Args:
             docker_client: Docker client instance (created if not provided)
-            cache_ttl: Cache validity period in seconds
+            cache_ttl: Cache validity period in seconds (for a freshly discovered proxy)
+            cache_ttl_max: Upper bound for the adaptive TTL of stable proxies
             health_check_timeout: Timeout for health checks
             max_error_count: Remove proxy from cache after this many failures
+            dns_ttl: How long resolved hostnames are reused (seconds)
+            neg_cache_ttl: How long failed resolutions/health checks are
+                remembered before being retried (seconds)
+            known_service_types: Proxy types to look for (default: nextcloud, photoprism)
+            background_refresh: Re-discover known proxies every cache_ttl / 2
+                seconds in a daemon thread so lookups keep hitting a warm cache
         """
-        self.docker_client = docker_client or docker.from_env()
+        self.docker_client = docker_client or docker.from_env(
+            max_pool_size=self.DOCKER_POOL_SIZE
+        )
         self.cache_ttl = cache_ttl
+        self.cache_ttl_max = max(cache_ttl_max, cache_ttl)
         self.health_check_timeout = health_check_timeout
         self.max_error_count = max_error_count
+        self.dns_ttl = dns_ttl
+        self.neg_cache_ttl = neg_cache_ttl
+        self.known_service_types = known_service_types or ["nextcloud", "photoprism"]
+        
+        # Cache: service_type -> ProxyService, in least- to most-recently-used order
+        self._cache: "OrderedDict[str, ProxyService]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # DNS cache: hostname -> (ip, resolved_at monotonic timestamp).
+        # Containers get no OS-level resolver cache, and Swarm overlay DNS
+        # is slow, so repeated discoveries reuse recent answers.
+        self._dns_cache: Dict[str, Tuple[str, float]] = {}
+        
+        # Negative cache: hostname or (target, port) -> failed_at monotonic
+        # timestamp (guarded by _cache_lock)
+        self._neg_cache: Dict[Union[str, Tuple[str, int]], float] = {}
+        
+        # In-flight resolutions: hostname -> Future shared by concurrent callers
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Health-check sockets kept open between checks:
+        # service_type -> ((target, port), socket). Guarded by _cache_lock;
+        # a check takes its socket out of the pool while probing it.
+        self._health_sockets: Dict[str, Tuple[Tuple[str, int], socket.socket]] = {}
+        
+        # Last proxy service listing: (fetched_at monotonic, type -> services)
+        self._services_snapshot: Optional[Tuple[float, Dict[str, List]]] = None
         
-        # Cache: service_type -> ProxyService
-        self._cache: Dict[str, ProxyService] = {}
+        # Shared workers for concurrent discovery and health checks
+        self._executor = ThreadPoolExecutor(
+            max_workers=8, thread_name_prefix="proxy-discovery"
+        )
+        
+        # Background refresher (started only when background_refresh=True)
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        if background_refresh:
+            self._refresher = threading.Thread(
+                target=self._refresh_loop,
+                name="proxy-refresh",
+                daemon=True
+            )
+            self._refresher.start()
         
         logger.info(
-            f"Proxy discovery initialized: cache_ttl={cache_ttl}s, "
-            f"health_timeout={health_check_timeout}s"
+            "Proxy discovery initialized: cache_ttl=%ss, health_timeout=%ss",
+            cache_ttl, health_check_timeout
         )
     
     def discover_proxy(
@@ -124,25 +197,26 @@ class ProxyDiscovery:
             if cached:
                 return cached
         
-        logger.info(f"Discovering {service_type} proxy service...")
+        logger.info("Discovering %s proxy service...", service_type)
         
         try:
-            # Query Swarm for proxy services
-            services = self.docker_client.services.list(
-                filters={"label": f"service={service_type}-proxy"}
-            )
+            # Query Swarm for proxy services (one listing shared by all types)
+            services = self._fetch_all_proxy_services(
+                force_refresh=force_refresh
+            ).get(service_type, [])
             
             if not services:
-                logger.warning(f"No {service_type} proxy services found in Swarm")
+                logger.warning("No %s proxy services found in Swarm", service_type)
+                self.invalidate_cache(service_type)
                 return None
             
             if len(services) > 1:
                 logger.warning(
-                    f"Multiple {service_type} proxy services found, using first"
+                    "Multiple %s proxy services found, using first", service_type
                 )
             
             service = services[0]
-            service_name = service.name
+            service_name = service["Spec"]["Name"]
             
             # Get service endpoint (typically DNS name in overlay network)
             # Format: <service_name> or <service_name>.<network_name>
@@ -150,8 +224,8 @@ class ProxyDiscovery:
             port = 2222  # Standard SSH proxy port
             
             logger.info(
-                f"Found {service_type} proxy service: "
-                f"{service_name} ({hostname}:{port})"
+                "Found %s proxy service: %s (%s:%d)",
+                service_type, service_name, hostname, port
             )
             
             # Resolve DNS to IP
@@ -164,7 +238,7 @@ class ProxyDiscovery:
                 hostname=hostname,
                 port=port,
                 ip_address=ip_address,
-                last_check=time.time(),
+                last_check=time.monotonic(),
                 is_healthy=False,
                 error_count=0
             )
@@ -172,22 +246,105 @@ class ProxyDiscovery:
             # Test connectivity
             if self._check_health(proxy):
                 proxy.is_healthy = True
-                self._cache[service_type] = proxy
-                logger.info(f"Successfully discovered and cached {service_type} proxy")
+                # Keep the earned TTL across refreshes unless the address moved
+                with self._cache_lock:
+                    previous = self._cache.get(service_type)
+                if previous and previous.ip_address == ip_address:
+                    proxy.stable_hits = previous.stable_hits
+                self._cache_put(service_type, proxy)
+                logger.info("Successfully discovered and cached %s proxy", service_type)
                 return proxy
             else:
                 logger.warning(
-                    f"Discovered {service_type} proxy but health check failed"
+                    "Discovered %s proxy but health check failed", service_type
                 )
+                # Don't keep serving a cached entry the refresh just failed
+                self.invalidate_cache(service_type)
                 return None
                 
         except DockerException as e:
-            logger.error(f"Docker API error during proxy discovery: {e}")
+            logger.error("Docker API error during proxy discovery: %s", e)
+            self.mark_proxy_error(service_type)
             return None
         except Exception as e:
-            logger.error(f"Unexpected error during proxy discovery: {e}")
+            logger.error("Unexpected error during proxy discovery: %s", e)
+            self.mark_proxy_error(service_type)
             return None
     
+    def discover_all(
+        self,
+        service_types: List[str],
+        force_refresh: bool = False
+    ) -> Dict[str, Optional[ProxyService]]:
+        """
+        Discover several proxy services concurrently.
+        
+        Discovery is dominated by network waits (Docker API, DNS, TCP
+        health check), so running the lookups side by side bounds the
+        total time by the slowest proxy rather than the sum.
+        
+        Args:
+            service_types: Service types to discover (e.g. ["nextcloud", "photoprism"])
+            force_refresh: Bypass cache and discover fresh
+            
+        Returns:
+            Dictionary mapping service type to ProxyService (None if not found)
+        """
+        if not service_types:
+            return {}
+        
+        results = self._executor.map(
+            lambda t: self.discover_proxy(t, force_refresh=force_refresh),
+            service_types
+        )
+        return dict(zip(service_types, results))
+    
+    def refresh_all(self) -> Dict[str, bool]:
+        """
+        Re-check the health of every cached proxy concurrently.
+        
+        Healthy proxies are marked successful (refreshing their cache age),
+        unhealthy ones get their error counter incremented.
+        
+        Returns:
+            Dictionary mapping service type to health check result
+        """
+        futures = {
+            self._executor.submit(self._check_health, proxy): service_type
+            for service_type, proxy in self._cache_items()
+        }
+        
+        results = {}
+        for future in as_completed(futures):
+            service_type = futures[future]
+            healthy = future.result()
+            results[service_type] = healthy
+            if healthy:
+                self.mark_proxy_success(service_type)
+            else:
+                self.mark_proxy_error(service_type)
+        
+        return results
+    
+    def _refresh_loop(self):
+        """Periodically re-discover known proxies until close() is called."""
+        while not self._stop.wait(self.cache_ttl / 2):
+            try:
+                self.discover_all(self.known_service_types, force_refresh=True)
+            except Exception as e:
+                logger.error("Background proxy refresh failed: %s", e)
+    
+    def close(self):
+        """Stop background refresh, shut down workers and close pooled sockets."""
+        self._stop.set()
+        if self._refresher and self._refresher.is_alive():
+            self._refresher.join(timeout=self.health_check_timeout)
+        self._executor.shutdown(wait=False)
+        with self._cache_lock:
+            service_types = list(self._health_sockets)
+        for service_type in service_types:
+            self._close_health_socket(service_type)
+    
     def get_cached_proxy(self, service_type: str) -> Optional[ProxyService]:
         """
         Get proxy from cache if still valid.
@@ -198,32 +355,63 @@ class ProxyDiscovery:
         Returns:
             Cached ProxyService if valid, None otherwise
         """
+        # Unlocked membership test: most misses return without contending
         if service_type not in self._cache:
             return None
         
-        proxy = self._cache[service_type]
-        age = time.time() - proxy.last_check
+        with self._cache_lock:
+            proxy = self._cache.get(service_type)
+            if proxy is None:
+                return None
+            
+            age = time.monotonic() - proxy.last_check
+            ttl = self._effective_ttl(proxy)
+            
+            # Check cache validity (expired entries are purged on access)
+            if age > ttl:
+                logger.debug(
+                    "Cache expired for %s proxy (age: %.1fs, ttl: %ss)",
+                    service_type, age, ttl
+                )
+                del self._cache[service_type]
+                return None
+            
+            # Check error count
+            if proxy.error_count >= self.max_error_count:
+                logger.warning(
+                    "Removing %s proxy from cache (error count: %d)",
+                    service_type, proxy.error_count
+                )
+                del self._cache[service_type]
+                return None
+            
+            self._cache.move_to_end(service_type)
         
-        # Check cache validity
-        if age > self.cache_ttl:
+        # Hot path: skip the logging call entirely unless debug is on
+        if logger.isEnabledFor(logging.DEBUG):
             logger.debug(
-                f"Cache expired for {service_type} proxy "
-                f"(age: {age:.1f}s, ttl: {self.cache_ttl}s)"
-            )
-            return None
-        
-        # Check error count
-        if proxy.error_count >= self.max_error_count:
-            logger.warning(
-                f"Removing {service_type} proxy from cache "
-                f"(error count: {proxy.error_count})"
+                "Using cached %s proxy: %s:%d", service_type, proxy.hostname, proxy.port
             )
-            del self._cache[service_type]
-            return None
-        
-        logger.debug(f"Using cached {service_type} proxy: {proxy.hostname}:{proxy.port}")
         return proxy
     
+    def _effective_ttl(self, proxy: ProxyService) -> float:
+        """Cache TTL for a proxy: cache_ttl doubled per stable hit, capped at cache_ttl_max."""
+        return min(self.cache_ttl * (2 ** proxy.stable_hits), self.cache_ttl_max)
+    
+    def _cache_put(self, service_type: str, proxy: ProxyService):
+        """Insert a proxy into the cache, evicting the least recently used beyond CACHE_MAXSIZE."""
+        with self._cache_lock:
+            self._cache[service_type] = proxy
+            self._cache.move_to_end(service_type)
+            while len(self._cache) > self.CACHE_MAXSIZE:
+                evicted, _ = self._cache.popitem(last=False)
+                logger.debug("Evicted %s proxy from cache (LRU)", evicted)
+    
+    def _cache_items(self) -> List[Tuple[str, ProxyService]]:
+        """Snapshot cache entries under the lock."""
+        with self._cache_lock:
+            return list(self._cache.items())
+    
     def invalidate_cache(self, service_type: Optional[str] = None):
         """
         Invalidate proxy cache.
@@ -232,11 +420,18 @@ class ProxyDiscovery:
             service_type: Specific type to invalidate, or None for all
         """
         if service_type:
-            if service_type in self._cache:
-                del self._cache[service_type]
-                logger.info(f"Invalidated cache for {service_type} proxy")
+            self._close_health_socket(service_type)
+            with self._cache_lock:
+                removed = self._cache.pop(service_type, None)
+            if removed:
+                logger.info("Invalidated cache for %s proxy", service_type)
         else:
-            self._cache.clear()
+            with self._cache_lock:
+                service_types = list(self._health_sockets)
+            for cached_type in service_types:
+                self._close_health_socket(cached_type)
+            with self._cache_lock:
+                self._cache.clear()
             logger.info("Invalidated all proxy caches")
     
     def mark_proxy_error(self, service_type: str):
@@ -249,26 +444,35 @@ class ProxyDiscovery:
         Args:
             service_type: "nextcloud" or "photoprism"
         """
-        if service_type in self._cache:
-            proxy = self._cache[service_type]
-            proxy.error_count += 1
+        with self._cache_lock:
+            proxy = self._cache.get(service_type)
+            if proxy:
+                proxy.error_count += 1
+                proxy.stable_hits = 0
+        if proxy:
             logger.warning(
-                f"Marked {service_type} proxy error "
-                f"(count: {proxy.error_count}/{self.max_error_count})"
+                "Marked %s proxy error (count: %d/%d)",
+                service_type, proxy.error_count, self.max_error_count
             )
     
     def mark_proxy_success(self, service_type: str):
         """
         Mark proxy as successful (resets error counter).
         
+        Consecutive successes lengthen the proxy's cache TTL (doubling up
+        to cache_ttl_max); any error resets it to cache_ttl.
+        
         Args:
             service_type: "nextcloud" or "photoprism"
         """
-        if service_type in self._cache:
-            proxy = self._cache[service_type]
-            proxy.error_count = 0
-            proxy.last_check = time.time()
-            proxy.is_healthy = True
+        with self._cache_lock:
+            proxy = self._cache.get(service_type)
+            if proxy:
+                proxy.error_count = 0
+                proxy.last_check = time.monotonic()
+                proxy.is_healthy = True
+                if self._effective_ttl(proxy) < self.cache_ttl_max:
+                    proxy.stable_hits += 1
     
     def get_all_proxies(self) -> List[ProxyService]:
         """
@@ -277,7 +481,8 @@ class ProxyDiscovery:
         Returns:
             List of cached ProxyService objects
         """
-        return list(self._cache.values())
+        with self._cache_lock:
+            return list(self._cache.values())
     
     def _resolve_hostname(self, hostname: str) -> Optional[str]:
         """
@@ -289,27 +494,77 @@ class ProxyDiscovery:
         Returns:
             IP address string, or None if resolution failed
         """
+        # IPv4/IPv6 literals need no DNS lookup (inet_pton is strict, unlike inet_aton)
+        for family in (socket.AF_INET, socket.AF_INET6):
+            try:
+                socket.inet_pton(family, hostname)
+                return hostname
+            except OSError:
+                pass
+        
+        entry = self._dns_cache.get(hostname)
+        if entry and time.monotonic() - entry[1] < self.dns_ttl:
+            return entry[0]
+        
+        if self._recently_failed(hostname):
+            logger.debug("Skipping resolution of %s (recently failed)", hostname)
+            return None
+        
+        # Single-flight: only the first caller resolves, others wait on its Future
+        with self._inflight_lock:
+            future = self._inflight.get(hostname)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[hostname] = future
+        
+        if not is_owner:
+            return future.result()
+        
+        ip = None
         try:
-            # Check if already an IP
-            socket.inet_aton(hostname)
-            return hostname
-        except socket.error:
-            pass
+            ip = self._lookup_hostname(hostname)
+        finally:
+            with self._inflight_lock:
+                del self._inflight[hostname]
+            future.set_result(ip)
+        return ip
+    
+    def _lookup_hostname(self, hostname: str) -> Optional[str]:
+        """
+        Resolve hostname via DNS and store the answer in the DNS cache.
         
+        Args:
+            hostname: DNS name
+            
+        Returns:
+            IP address string, or None if resolution failed
+        """
         try:
-            logger.debug(f"Resolving hostname: {hostname}")
-            ip = socket.gethostbyname(hostname)
-            logger.debug(f"Resolved {hostname} -> {ip}")
+            logger.debug("Resolving hostname: %s", hostname)
+            infos = socket.getaddrinfo(
+                hostname, None,
+                family=socket.AF_INET,
+                type=socket.SOCK_STREAM
+            )
+            ip = infos[0][4][0]
+            logger.debug("Resolved %s -> %s", hostname, ip)
+            self._dns_cache[hostname] = (ip, time.monotonic())
             return ip
         except socket.gaierror as e:
-            logger.warning(f"Failed to resolve hostname {hostname}: {e}")
+            logger.warning("Failed to resolve hostname %s: %s", hostname, e)
+            with self._cache_lock:
+                self._neg_cache[hostname] = time.monotonic()
             return None
     
     def _check_health(self, proxy: ProxyService) -> bool:
         """
         Check if proxy service is reachable.
         
-        Performs a basic TCP connection test to the SSH port.
+        Reuses the TCP connection opened by a previous check when it is still
+        alive; otherwise connects to the SSH port and keeps the socket open
+        (with TCP keepalive) for the next check. Failed targets are not
+        retried for neg_cache_ttl seconds.
         
         Args:
             proxy: ProxyService to check
@@ -318,36 +573,175 @@ class ProxyDiscovery:
             True if healthy, False otherwise
         """
         target = proxy.ip_address or proxy.hostname
+        address = (target, proxy.port)
         
-        try:
+        # Check the pooled socket out, so no other check closes it mid-probe
+        with self._cache_lock:
+            pooled = self._health_sockets.pop(proxy.service_type, None)
+        if pooled:
+            if pooled[0] == address and self._socket_alive(pooled[1]):
+                self._pool_health_socket(proxy.service_type, *pooled)
+                logger.debug("Health check passed for %s proxy (pooled)", proxy.service_type)
+                return True
+            self._abort_socket(pooled[1])
+        
+        if self._recently_failed(address):
             logger.debug(
-                f"Health checking {proxy.service_type} proxy: {target}:{proxy.port}"
+                "Health check skipped for %s proxy (recently failed)", proxy.service_type
             )
+            return False
+        
+        healthy = self._connect_health(proxy, address)
+        if not healthy:
+            with self._cache_lock:
+                self._neg_cache[address] = time.monotonic()
+        return healthy
+    
+    def _recently_failed(self, key: Union[str, Tuple[str, int]]) -> bool:
+        """Check the negative cache for a hostname or (target, port) address."""
+        with self._cache_lock:
+            failed_at = self._neg_cache.get(key)
+            if failed_at is None:
+                return False
+            if time.monotonic() - failed_at < self.neg_cache_ttl:
+                return True
+            del self._neg_cache[key]
+            return False
+    
+    def _connect_health(self, proxy: ProxyService, address: Tuple[str, int]) -> bool:
+        """
+        Open a TCP connection to the proxy SSH port and pool it on success.
+        
+        Args:
+            proxy: ProxyService to check
+            address: (target, port) to connect to
             
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(self.health_check_timeout)
-            result = sock.connect_ex((target, proxy.port))
-            sock.close()
+        Returns:
+            True if the connection succeeded, False otherwise
+        """
+        target = address[0]
+        sock = None
+        try:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Health checking %s proxy: %s:%d",
+                    proxy.service_type, target, proxy.port
+                )
+            
+            family = socket.AF_INET6 if ":" in target else socket.AF_INET
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, "TCP_USER_TIMEOUT"):
+                # Bound kernel retransmits on the pooled socket as well
+                sock.setsockopt(
+                    socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT,
+                    int(self.health_check_timeout * 1000)
+                )
+            
+            # Non-blocking connect: a refused connection is reported as soon
+            # as the RST arrives, only silent hosts wait out the timeout
+            sock.setblocking(False)
+            result = sock.connect_ex(address)
+            if result in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+                _, writable, errored = select.select(
+                    [], [sock], [sock], self.health_check_timeout
+                )
+                if not writable and not errored:
+                    logger.warning(
+                        "Health check timeout for %s proxy after %ss",
+                        proxy.service_type, self.health_check_timeout
+                    )
+                    return False
+                result = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
             
             if result == 0:
-                logger.debug(f"Health check passed for {proxy.service_type} proxy")
+                self._enable_keepalive(sock)
+                self._pool_health_socket(proxy.service_type, address, sock)
+                sock = None
+                logger.debug("Health check passed for %s proxy", proxy.service_type)
                 return True
             else:
                 logger.warning(
-                    f"Health check failed for {proxy.service_type} proxy: "
-                    f"connection refused (code: {result})"
+                    "Health check failed for %s proxy: connection refused (code: %s)",
+                    proxy.service_type, result
                 )
                 return False
                 
-        except socket.timeout:
-            logger.warning(
-                f"Health check timeout for {proxy.service_type} proxy "
-                f"after {self.health_check_timeout}s"
-            )
-            return False
         except Exception as e:
-            logger.error(f"Health check error for {proxy.service_type} proxy: {e}")
+            logger.error("Health check error for %s proxy: %s", proxy.service_type, e)
             return False
+        finally:
+            if sock is not None:
+                self._abort_socket(sock)
+    
+    @staticmethod
+    def _enable_keepalive(sock: socket.socket):
+        """Enable TCP keepalive so the kernel detects dead pooled sockets."""
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60)
+        if hasattr(socket, "TCP_KEEPINTVL"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+        if hasattr(socket, "TCP_KEEPCNT"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+    
+    @staticmethod
+    def _socket_alive(sock: socket.socket) -> bool:
+        """
+        Probe a pooled (non-blocking) socket.
+        
+        Whatever the server has sent (its SSH banner) is read and discarded,
+        so unread data can't hide the end-of-stream that marks a closed
+        connection. Nothing to read means the peer is still connected.
+        """
+        try:
+            if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR):
+                return False
+            for _ in range(16):
+                if not sock.recv(4096):
+                    return False
+            return True
+        except BlockingIOError:
+            return True
+        except (OSError, ValueError):
+            return False
+    
+    def _pool_health_socket(
+        self,
+        service_type: str,
+        address: Tuple[str, int],
+        sock: socket.socket
+    ):
+        """Keep a health-check socket for the next check, unless one is pooled already."""
+        with self._cache_lock:
+            if service_type not in self._health_sockets:
+                self._health_sockets[service_type] = (address, sock)
+                return
+        self._abort_socket(sock)
+    
+    def _close_health_socket(self, service_type: str):
+        """Close and forget the pooled health-check socket for a proxy."""
+        with self._cache_lock:
+            pooled = self._health_sockets.pop(service_type, None)
+        if pooled:
+            self._abort_socket(pooled[1])
+    
+    @staticmethod
+    def _abort_socket(sock: socket.socket):
+        """
+        Close a health-check socket with SO_LINGER 0.
+        
+        The kernel resets the connection instead of leaving it in TIME_WAIT,
+        so frequent checks do not pile up sockets holding ephemeral ports.
+        """
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        except OSError:
+            pass
+        try:
+            sock.close()
+        except OSError:
+            pass
     
     def list_all_proxy_services(self) -> List[Dict[str, str]]:
         """
@@ -357,41 +751,114 @@ class ProxyDiscovery:
             List of service info dictionaries
         """
         try:
-            services = self.docker_client.services.list(
-                filters={"label": "service"}
+            grouped = self._fetch_all_proxy_services()
+            running = self._count_running_tasks(
+                [service["ID"] for services in grouped.values() for service in services]
             )
             
             proxy_services = []
-            for service in services:
-                labels = service.attrs.get("Spec", {}).get("Labels", {})
-                if labels.get("service", "").endswith("-proxy"):
+            for service_type, services in grouped.items():
+                for service in services:
+                    spec = service.get("Spec", {})
+                    service_id = service["ID"]
                     proxy_services.append({
-                        "name": service.name,
-                        "type": labels.get("service", "").replace("-proxy", ""),
-                        "id": service.id[:12],
-                        "replicas": self._get_replica_count(service)
+                        "name": spec.get("Name", ""),
+                        "type": service_type,
+                        "id": service_id[:12],
+                        "replicas": self._get_replica_count(
+                            spec,
+                            running.get(service_id, 0) if running is not None else None
+                        )
                     })
             
             return proxy_services
             
         except DockerException as e:
-            logger.error(f"Failed to list proxy services: {e}")
+            logger.error("Failed to list proxy services: %s", e)
             return []
     
-    def _get_replica_count(self, service) -> str:
-        """Get service replica count as string (e.g., "1/1")."""
+    def _fetch_all_proxy_services(self, force_refresh: bool = False) -> Dict[str, List]:
+        """
+        List all proxy services with a single Docker API call.
+        
+        Services labelled ``service=<type>-proxy`` are grouped by type. The
+        daemon only returns services carrying a ``service`` label (label
+        filters are ANDed, so one filter per proxy type would match nothing).
+        The result is reused for SERVICE_LIST_TTL seconds so that discovering
+        several proxies back to back costs one daemon round-trip. The
+        low-level API is used so services stay plain inspect dicts instead
+        of being wrapped in docker-py Service objects.
+        
+        Args:
+            force_refresh: Ignore the cached listing
+            
+        Returns:
+            Dictionary mapping service type to list of service inspect dicts
+            
+        Raises:
+            DockerException: Docker API call failed
+        """
+        snapshot = self._services_snapshot
+        if (
+            not force_refresh
+            and snapshot
+            and time.monotonic() - snapshot[0] < self.SERVICE_LIST_TTL
+        ):
+            return snapshot[1]
+        
+        services = self.docker_client.api.services(filters={"label": "service"})
+        
+        grouped: Dict[str, List] = {}
+        for service in services:
+            label = service.get("Spec", {}).get("Labels", {}).get("service", "")
+            service_type = label.removesuffix("-proxy")
+            if service_type != label:
+                grouped.setdefault(service_type, []).append(service)
+        
+        self._services_snapshot = (time.monotonic(), grouped)
+        return grouped
+    
+    def _count_running_tasks(self, service_ids: List[str]) -> Optional[Dict[str, int]]:
+        """
+        Count running tasks for several services with one tasks API call.
+        
+        Args:
+            service_ids: Docker service IDs
+            
+        Returns:
+            Dictionary mapping service ID to running task count,
+            or None if the tasks could not be listed
+        """
+        if not service_ids:
+            return {}
+        
+        try:
+            tasks = self.docker_client.api.tasks(
+                filters={"service": service_ids, "desired-state": "running"}
+            )
+        except Exception as e:
+            logger.debug("Failed to list proxy service tasks: %s", e)
+            return None
+        
+        # Generator feeds Counter directly; malformed task entries are skipped
+        return Counter(
+            task.get("ServiceID")
+            for task in tasks
+            if (task.get("Status") or {}).get("State") == "running"
+        )
+    
+    def _get_replica_count(self, spec: Dict, running: Optional[int]) -> str:
+        """Get service replica count as string (e.g., "1/1") from its parsed Spec."""
+        if running is None:
+            return "unknown"
+        
         try:
-            spec = service.attrs.get("Spec", {})
             mode = spec.get("Mode", {})
             
             if "Replicated" in mode:
                 desired = mode["Replicated"].get("Replicas", 0)
-                tasks = service.tasks(filters={"desired-state": "running"})
-                running = len([t for t in tasks if t["Status"]["State"] == "running"])
                 return f"{running}/{desired}"
             elif "Global" in mode:
-                tasks = service.tasks(filters={"desired-state": "running"})
-                running = len([t for t in tasks if t["Status"]["State"] == "running"])
                 return f"{running} (global)"
             else:
                 return "unknown"
@@ -9,7 +9,9 @@ The SSHProxyClient maintains persistent SSH connections to lightweight proxy con
 that validate and execute whitelisted commands on target containers.
 
 Architecture:
-- Connection pooling: Reuse SSH connections across multiple commands
+- Connection pooling: One or two SSH transports per route (host, port), each
+  multiplexing up to MaxSessions concurrent command channels, with
+  independent per-route state so hosts never contend
 - Automatic reconnection: Detect and recover from connection failures
 - Thread-safe: Support concurrent command execution
 - Timeout handling: Prevent hung operations
@@ -24,44 +26,92 @@ Author: Next_Prism Project
 License: MIT
 """
 
+import functools
 import logging
+import select
+import socket
 import threading
 import time
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Deque, Dict, List, Optional, Set, Tuple
 
 import paramiko
-from paramiko import SSHClient, AutoAddPolicy, RSAKey, Ed25519Key
+from paramiko import Ed25519Key
 
 
 logger = logging.getLogger(__name__)
 
+# A channel's fileno() only signals stdout data and EOF, so stderr and the
+# exit status are polled at this interval while draining (seconds)
+_CHANNEL_POLL_INTERVAL = 0.05
 
-@dataclass
+# Clock for pool bookkeeping (last_used, idle timeouts). Idle times don't
+# need better than the coarse clock's few-millisecond resolution, and it is
+# cheaper to read than the wall clock.
+if hasattr(time, "CLOCK_MONOTONIC_COARSE"):
+    _now = functools.partial(time.clock_gettime, time.CLOCK_MONOTONIC_COARSE)
+else:
+    _now = time.monotonic
+
+
+@dataclass(eq=False)
 class SSHConnection:
-    """Represents a pooled SSH connection."""
-    client: SSHClient
+    """
+    Represents a pooled SSH transport (hashed by identity).
+    
+    A transport is shared by up to max_sessions concurrent users, each
+    running its command on a separate channel.
+    """
+    transport: paramiko.Transport
     host: str
     port: int
-    last_used: float
-    in_use: bool = False
+    last_used: float  # monotonic, see _now
+    sessions: int = 0  # channel slots currently reserved
     error_count: int = 0
+    retired: bool = False  # dropped from the route, close when last user leaves
+    
+    @property
+    def in_use(self) -> bool:
+        """Whether any user currently holds a channel slot."""
+        return self.sessions > 0
+
+
+@dataclass
+class RouteState:
+    """
+    Pool state for one (host, port) route.
+    
+    The condition's lock only guards this route, so traffic to different
+    proxies never contends on a shared mutex. Waiters for a free slot are
+    woken by the condition as soon as a channel slot is released.
+    """
+    cond: threading.Condition = field(default_factory=threading.Condition)
+    idle: Deque[SSHConnection] = field(default_factory=deque)
+    in_use: Set[SSHConnection] = field(default_factory=set)  # sessions > 0
+    size: int = 0  # transports owned by the route, including ones being opened
+    # Counts last folded into the client-wide pool stats
+    counted_total: int = 0
+    counted_active: int = 0
 
 
 class SSHProxyClient:
     """
     SSH client for communicating with Docker Swarm proxy services.
     
-    Maintains a pool of persistent SSH connections to proxy containers,
+    Maintains a pool of persistent SSH transports to proxy containers,
     automatically reconnects on failure, and provides thread-safe command execution.
+    Concurrent commands share a transport on separate channels, so parallelism
+    is bounded by max_sessions per transport rather than by handshakes.
     
     Example:
         ```python
         proxy = SSHProxyClient(
             private_key_path="/run/secrets/nextcloud_proxy_privkey",
             connection_timeout=10,
-            max_connections=5
+            max_connections=2
         )
         
         success, stdout, stderr = proxy.execute_command(
@@ -72,14 +122,19 @@ class SSHProxyClient:
         ```
     """
     
+    # SSH keepalive interval (seconds). A transport used more recently than
+    # this is trusted without probing; its keepalives surface dead peers.
+    KEEPALIVE_INTERVAL = 30
+    
     def __init__(
         self,
         private_key_path: str,
         connection_timeout: int = 10,
         command_timeout: int = 300,
-        max_connections: int = 5,
+        max_connections: int = 2,
         max_retries: int = 3,
-        connection_idle_timeout: int = 300
+        connection_idle_timeout: int = 300,
+        max_sessions: int = 10
     ):
         """
         Initialize SSH proxy client.
@@ -88,9 +143,10 @@ class SSHProxyClient:
             private_key_path: Path to ED25519 private key file
             connection_timeout: Timeout for establishing connections (seconds)
             command_timeout: Timeout for command execution (seconds)
-            max_connections: Maximum pooled connections per host
+            max_connections: Maximum pooled transports per host
             max_retries: Maximum retry attempts for failed operations
             connection_idle_timeout: Close idle connections after this time (seconds)
+            max_sessions: Concurrent channels per connection (sshd MaxSessions)
         """
         self.private_key_path = Path(private_key_path)
         self.connection_timeout = connection_timeout
@@ -98,23 +154,38 @@ class SSHProxyClient:
         self.max_connections = max_connections
         self.max_retries = max_retries
         self.connection_idle_timeout = connection_idle_timeout
+        self.max_sessions = max_sessions
+        
+        # Connection pool: (host, port) -> RouteState
+        # _routes_lock is only taken to insert a new route
+        self._routes: Dict[Tuple[str, int], RouteState] = {}
+        self._routes_lock = threading.Lock()
         
-        # Connection pool: (host, port) -> List[SSHConnection]
-        self._pool: Dict[Tuple[str, int], list[SSHConnection]] = {}
-        self._pool_lock = threading.Lock()
+        # Running pool totals for get_pool_stats, kept in step by _sync_stats
+        self._stats_lock = threading.Lock()
+        self._total_hosts = 0
+        self._total_connections = 0
+        self._active_connections = 0
         
-        # Private key (loaded once)
+        # Private key, loaded eagerly and never replaced once set. A key file
+        # that does not exist yet (e.g. secret mounted later) is loaded on
+        # first connect instead.
         self._private_key: Optional[Ed25519Key] = None
-        self._key_lock = threading.Lock()
+        if self.private_key_path.exists():
+            self._load_private_key()
         
         logger.info(
             f"SSH proxy client initialized: key={self.private_key_path}, "
-            f"timeout={self.connection_timeout}s, max_conn={self.max_connections}"
+            f"timeout={self.connection_timeout}s, max_conn={self.max_connections}, "
+            f"max_sessions={self.max_sessions}"
         )
     
     def _load_private_key(self) -> Ed25519Key:
         """
-        Load ED25519 private key from file.
+        Load ED25519 private key from file (no-op once loaded).
+        
+        No lock is needed: the attribute read is atomic and the key never
+        changes after the first successful load.
         
         Returns:
             Loaded private key
@@ -123,183 +194,268 @@ class SSHProxyClient:
             FileNotFoundError: Key file not found
             paramiko.SSHException: Invalid key format
         """
-        with self._key_lock:
-            if self._private_key is None:
-                if not self.private_key_path.exists():
-                    raise FileNotFoundError(
-                        f"Private key not found: {self.private_key_path}"
-                    )
-                
-                logger.info(f"Loading private key: {self.private_key_path}")
-                self._private_key = Ed25519Key.from_private_key_file(
-                    str(self.private_key_path)
-                )
-                logger.info("Private key loaded successfully")
-            
-            return self._private_key
+        key = self._private_key
+        if key is not None:
+            return key
+        
+        if not self.private_key_path.exists():
+            raise FileNotFoundError(
+                f"Private key not found: {self.private_key_path}"
+            )
+        
+        logger.info(f"Loading private key: {self.private_key_path}")
+        key = Ed25519Key.from_private_key_file(str(self.private_key_path))
+        self._private_key = key
+        logger.info("Private key loaded successfully")
+        return key
     
-    def _get_connection(self, host: str, port: int) -> SSHConnection:
+    def _get_route(self, pool_key: Tuple[str, int]) -> RouteState:
+        """Get pool state for a route, creating it on first use."""
+        route = self._routes.get(pool_key)
+        if route is None:
+            with self._routes_lock:
+                route = self._routes.get(pool_key)
+                if route is None:
+                    route = RouteState()
+                    self._routes[pool_key] = route
+        return route
+    
+    def _get_connection(self, host: str, port: int, sessions: int = 1) -> SSHConnection:
         """
-        Get or create SSH connection from pool.
+        Reserve channel slots on a pooled SSH transport.
+        
+        Busy transports with spare sessions are shared first, then idle ones
+        are reused, and a new transport is only opened while the route has
+        fewer than max_connections. Otherwise waits (up to connection_timeout)
+        on the route's condition for slots to be released.
         
         Args:
             host: Proxy hostname or IP
             port: SSH port (typically 2222)
+            sessions: Number of concurrent channels the caller will open
             
         Returns:
-            Available SSH connection
+            SSH connection with the requested slots reserved
             
         Raises:
-            Exception: Connection failed after retries
+            TimeoutError: No channel slot became available in time
+            Exception: Connection failed
         """
-        pool_key = (host, port)
-        
-        with self._pool_lock:
-            # Check for existing idle connection
-            if pool_key in self._pool:
-                for conn in self._pool[pool_key]:
-                    if not conn.in_use:
-                        # Test if connection is still alive
-                        try:
-                            transport = conn.client.get_transport()
-                            if transport and transport.is_active():
-                                conn.in_use = True
-                                conn.last_used = time.time()
-                                conn.error_count = 0
-                                logger.debug(f"Reusing connection to {host}:{port}")
-                                return conn
-                        except Exception as e:
-                            logger.debug(f"Stale connection detected: {e}")
-                            # Will be cleaned up and recreated below
-            
-            # Clean up stale/idle connections
-            self._cleanup_connections(pool_key)
-            
-            # Create new connection if under limit
-            if pool_key not in self._pool:
-                self._pool[pool_key] = []
-            
-            if len(self._pool[pool_key]) < self.max_connections:
-                try:
-                    conn = self._create_connection(host, port)
-                    self._pool[pool_key].append(conn)
-                    logger.info(
-                        f"Created new SSH connection to {host}:{port} "
-                        f"(pool size: {len(self._pool[pool_key])})"
-                    )
-                    return conn
-                except Exception as e:
-                    logger.error(f"Failed to create connection to {host}:{port}: {e}")
-                    raise
-            
-            # Wait for available connection
-            logger.warning(
-                f"Connection pool full for {host}:{port}, "
-                f"waiting for available connection..."
-            )
+        route = self._get_route((host, port))
+        sessions = min(sessions, self.max_sessions)
+        deadline = time.monotonic() + self.connection_timeout
+        stale = []
         
-        # Wait outside lock (to allow connections to be released)
-        for attempt in range(self.max_retries):
-            time.sleep(1)
-            with self._pool_lock:
-                for conn in self._pool[pool_key]:
-                    if not conn.in_use:
-                        conn.in_use = True
-                        conn.last_used = time.time()
-                        return conn
-        
-        raise Exception(
-            f"No available connections to {host}:{port} after "
-            f"{self.max_retries} retries"
+        with route.cond:
+            try:
+                while True:
+                    conn = self._acquire_slots(route, sessions, stale)
+                    if conn is not None:
+                        break
+                    
+                    # Reserve a slot and create the connection outside the lock
+                    if route.size < self.max_connections:
+                        route.size += 1
+                        break
+                    
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(
+                            f"No available connections to {host}:{port} after "
+                            f"{self.connection_timeout}s"
+                        )
+                    route.cond.wait(remaining)
+            finally:
+                self._sync_stats(route)
+        
+        for dead in stale:
+            self._close_connection(dead, "stale")
+        
+        if conn is not None:
+            logger.debug(f"Reusing connection to {host}:{port}")
+            return conn
+        
+        try:
+            conn = self._create_connection(host, port)
+        except Exception as e:
+            with route.cond:
+                route.size -= 1
+                route.cond.notify()
+            logger.error(f"Failed to create connection to {host}:{port}: {e}")
+            raise
+        
+        with route.cond:
+            conn.sessions = sessions
+            route.in_use.add(conn)
+            self._sync_stats(route)
+        logger.info(
+            f"Created new SSH connection to {host}:{port} "
+            f"(pool size: {route.size})"
         )
+        return conn
+    
+    def _acquire_slots(
+        self,
+        route: RouteState,
+        sessions: int,
+        stale: List[SSHConnection]
+    ) -> Optional[SSHConnection]:
+        """
+        Reserve slots on an existing transport (route.cond must be held).
+        
+        Dead idle transports are removed from the route and appended to
+        stale so the caller can close them outside the lock.
+        """
+        now = _now()
+        for conn in route.in_use:
+            if conn.sessions + sessions <= self.max_sessions:
+                conn.sessions += sessions
+                conn.last_used = now
+                return conn
+        
+        # Reuse the most recently released live transport
+        while route.idle:
+            conn = route.idle.pop()
+            recent = now - conn.last_used < self.KEEPALIVE_INTERVAL
+            if recent or self._is_alive(conn):
+                conn.sessions = sessions
+                conn.last_used = now
+                conn.error_count = 0
+                route.in_use.add(conn)
+                return conn
+            route.size -= 1
+            stale.append(conn)
+        
+        return None
+    
+    @staticmethod
+    def _is_alive(conn: SSHConnection) -> bool:
+        """Check whether a pooled connection's transport is still active."""
+        try:
+            return conn.transport.is_active()
+        except Exception as e:
+            logger.debug(f"Stale connection detected: {e}")
+            return False
+    
+    def _close_connection(self, conn: SSHConnection, reason: str):
+        """Close a connection that has been removed from its route."""
+        try:
+            conn.transport.close()
+            logger.debug(f"Closed connection to {conn.host}:{conn.port} ({reason})")
+        except Exception as e:
+            logger.debug(f"Error closing connection: {e}")
     
     def _create_connection(self, host: str, port: int) -> SSHConnection:
         """
-        Create new SSH connection to proxy.
+        Create new SSH transport to proxy.
+        
+        Host keys are not verified; proxies are reached over the internal
+        overlay network and authenticate us by key.
         
         Args:
             host: Proxy hostname or IP
             port: SSH port
             
         Returns:
-            New SSH connection
+            New SSH connection with no slots reserved
             
         Raises:
             Exception: Connection failed
         """
-        client = SSHClient()
-        client.set_missing_host_key_policy(AutoAddPolicy())
-        
         pkey = self._load_private_key()
         
         logger.info(f"Connecting to SSH proxy: {host}:{port}")
-        client.connect(
-            hostname=host,
-            port=port,
-            username="proxyuser",
-            pkey=pkey,
-            timeout=self.connection_timeout,
-            look_for_keys=False,
-            allow_agent=False
-        )
+        sock = socket.create_connection((host, port), timeout=self.connection_timeout)
+        transport = paramiko.Transport(sock)
+        transport.banner_timeout = self.connection_timeout
+        transport.auth_timeout = self.connection_timeout
+        try:
+            transport.connect(username="proxyuser", pkey=pkey)
+        except Exception:
+            transport.close()
+            raise
+        transport.set_keepalive(self.KEEPALIVE_INTERVAL)
         
         return SSHConnection(
-            client=client,
+            transport=transport,
             host=host,
             port=port,
-            last_used=time.time(),
-            in_use=True,
-            error_count=0
+            last_used=_now()
         )
     
-    def _release_connection(self, conn: SSHConnection):
-        """Mark connection as available for reuse."""
-        with self._pool_lock:
-            conn.in_use = False
-            conn.last_used = time.time()
+    def _release_connection(
+        self,
+        conn: SSHConnection,
+        discard: bool = False,
+        sessions: int = 1
+    ):
+        """
+        Release channel slots reserved with _get_connection.
+        
+        Args:
+            conn: Connection obtained from _get_connection
+            discard: Drop the transport from the pool; it is closed once its
+                last concurrent user has released it
+            sessions: Number of slots reserved by the caller
+        """
+        route = self._routes[(conn.host, conn.port)]
+        close = False
+        with route.cond:
+            conn.sessions -= min(sessions, self.max_sessions)
+            conn.last_used = _now()
+            if discard and not conn.retired:
+                conn.retired = True
+                route.in_use.discard(conn)
+                route.size -= 1
+            if conn.retired:
+                close = conn.sessions == 0
+            elif conn.sessions == 0:
+                route.in_use.discard(conn)
+                route.idle.append(conn)
+            self._sync_stats(route)
+            route.cond.notify()
+        
+        if close:
+            self._close_connection(conn, f"{conn.error_count} errors")
     
     def _cleanup_connections(self, pool_key: Optional[Tuple[str, int]] = None):
         """
         Clean up stale or idle connections.
         
+        Only idle connections are inspected; checked-out connections are
+        dealt with by their users. The idle stack is ordered oldest-first
+        from the left, so it is drained with popleft() and survivors are
+        re-appended in their original order, keeping LIFO reuse intact.
+        
         Args:
-            pool_key: Specific pool to clean, or None for all pools
+            pool_key: Specific route to clean, or None for all routes
         """
-        now = time.time()
-        keys_to_clean = [pool_key] if pool_key else list(self._pool.keys())
+        now = _now()
+        keys_to_clean = [pool_key] if pool_key else list(self._routes.keys())
         
         for key in keys_to_clean:
-            if key not in self._pool:
+            route = self._routes.get(key)
+            if route is None:
                 continue
             
-            connections = self._pool[key]
-            cleaned = []
-            
-            for conn in connections:
-                # Remove if idle too long or transport is dead
-                transport = conn.client.get_transport()
-                is_stale = (
-                    not conn.in_use and 
-                    (now - conn.last_used) > self.connection_idle_timeout
-                )
-                is_dead = not transport or not transport.is_active()
-                
-                if is_stale or is_dead:
-                    try:
-                        conn.client.close()
-                        logger.debug(
-                            f"Closed connection to {conn.host}:{conn.port} "
-                            f"(stale={is_stale}, dead={is_dead})"
-                        )
-                    except Exception as e:
-                        logger.debug(f"Error closing connection: {e}")
-                else:
-                    cleaned.append(conn)
+            closed = []
+            with route.cond:
+                idle = route.idle
+                for _ in range(len(idle)):
+                    conn = idle.popleft()
+                    # Remove if idle too long or transport is dead
+                    is_stale = (now - conn.last_used) > self.connection_idle_timeout
+                    if is_stale or not self._is_alive(conn):
+                        closed.append(conn)
+                    else:
+                        idle.append(conn)
+                route.size -= len(closed)
+                if closed:
+                    self._sync_stats(route)
+                    route.cond.notify(len(closed))
             
-            if cleaned:
-                self._pool[key] = cleaned
-            else:
-                del self._pool[key]
+            for conn in closed:
+                self._close_connection(conn, "stale or dead")
     
     def execute_command(
         self,
@@ -337,92 +493,322 @@ class SSHProxyClient:
             ```
         """
         timeout = timeout or self.command_timeout
-        conn = None
         
-        for attempt in range(1, self.max_retries + 1):
+        try:
+            return self._exec_once(host, port, command, timeout)
+        except Exception as e:
+            logger.error(
+                f"SSH command execution failed on {host}:{port} "
+                f"(attempt 1/{self.max_retries}): {e}"
+            )
+            return self._exec_retry(host, port, command, timeout, e)
+    
+    def _exec_once(
+        self,
+        host: str,
+        port: int,
+        command: str,
+        timeout: float
+    ) -> Tuple[bool, str, str]:
+        """
+        Run a command once on a pooled connection, without retrying.
+        
+        Raises:
+            Exception: Connection or channel failure (connection is released,
+                and discarded if it is dead or keeps failing)
+        """
+        conn = self._get_connection(host, port)
+        logger.info(f"Executing command on {host}:{port}: {command}")
+        
+        try:
+            # Execute command on its own channel of the shared transport
+            channel = conn.transport.open_session(timeout=self.connection_timeout)
             try:
-                # Get connection from pool
-                conn = self._get_connection(host, port)
+                channel.exec_command(command)
                 
-                logger.info(
-                    f"Executing command on {host}:{port} (attempt {attempt}): {command}"
+                # Read stdout and stderr together so neither stream stalls
+                (success, stdout_data, stderr_data), = self._drain_channels(
+                    [channel], timeout
                 )
-                
-                # Execute command
-                stdin, stdout, stderr = conn.client.exec_command(
-                    command,
-                    timeout=timeout
+            finally:
+                channel.close()
+        except BaseException:
+            conn.error_count += 1
+            # Close connection if too many errors or transport died
+            discard = conn.error_count >= 3 or not self._is_alive(conn)
+            if discard:
+                logger.info(
+                    f"Closing connection to {host}:{port} "
+                    f"after {conn.error_count} errors"
                 )
-                
-                # Read output
-                exit_code = stdout.channel.recv_exit_status()
-                stdout_data = stdout.read().decode('utf-8', errors='replace')
-                stderr_data = stderr.read().decode('utf-8', errors='replace')
-                
-                success = exit_code == 0
-                
-                if success:
-                    logger.info(
-                        f"Command succeeded on {host}:{port}: "
-                        f"{len(stdout_data)} bytes output"
-                    )
-                    conn.error_count = 0
-                else:
-                    logger.warning(
-                        f"Command failed on {host}:{port} with exit code {exit_code}: "
-                        f"{stderr_data[:200]}"
-                    )
-                    conn.error_count += 1
-                
-                return success, stdout_data, stderr_data
-                
+            self._release_connection(conn, discard=discard)
+            raise
+        
+        if success:
+            logger.info(
+                f"Command succeeded on {host}:{port}: "
+                f"{len(stdout_data)} bytes output"
+            )
+            conn.error_count = 0
+        else:
+            logger.warning(
+                f"Command failed on {host}:{port} with exit code "
+                f"{channel.exit_status}: {stderr_data[:200]}"
+            )
+            conn.error_count += 1
+        
+        self._release_connection(conn)
+        return success, stdout_data, stderr_data
+    
+    def _exec_retry(
+        self,
+        host: str,
+        port: int,
+        command: str,
+        timeout: float,
+        error: Exception
+    ) -> Tuple[bool, str, str]:
+        """
+        Retry a command whose first attempt raised, with exponential backoff.
+        
+        Returns:
+            Result of the first successful attempt, or (False, "", error)
+            once max_retries attempts have failed
+        """
+        for attempt in range(2, self.max_retries + 1):
+            time.sleep(2 ** (attempt - 1))  # Exponential backoff
+            try:
+                return self._exec_once(host, port, command, timeout)
             except Exception as e:
+                error = e
                 logger.error(
                     f"SSH command execution failed on {host}:{port} "
                     f"(attempt {attempt}/{self.max_retries}): {e}"
                 )
-                
-                if conn:
-                    conn.error_count += 1
-                    # Close connection if too many errors
-                    if conn.error_count >= 3:
-                        try:
-                            conn.client.close()
-                            with self._pool_lock:
-                                pool_key = (host, port)
-                                if pool_key in self._pool:
-                                    self._pool[pool_key].remove(conn)
-                            logger.info(
-                                f"Closed connection to {host}:{port} "
-                                f"after {conn.error_count} errors"
-                            )
-                        except Exception as close_err:
-                            logger.debug(f"Error closing connection: {close_err}")
-                
-                if attempt < self.max_retries:
-                    time.sleep(2 ** attempt)  # Exponential backoff
-                else:
-                    return False, "", str(e)
+        
+        return False, "", str(error)
+    
+    def execute_commands_batch(
+        self,
+        host: str,
+        port: int,
+        commands: List[str],
+        timeout: Optional[int] = None
+    ) -> List[Tuple[bool, str, str]]:
+        """
+        Execute several commands on a proxy over one pooled connection.
+        
+        Up to max_sessions commands are started on parallel channels of the
+        same SSH transport before any output is read, so N commands cost one
+        round-trip per batch instead of N. Commands are not retried.
+        
+        As many channel slots as the largest batch needs are reserved on the
+        transport, so concurrent callers never exceed the proxy's MaxSessions.
+        
+        Args:
+            host: Proxy hostname or IP
+            port: SSH port (typically 2222)
+            commands: Commands to execute
+            timeout: Timeout per batch of max_sessions commands (seconds)
+            
+        Returns:
+            List of (success, stdout, stderr) tuples, in command order
+        """
+        timeout = timeout or self.command_timeout
+        results: List[Tuple[bool, str, str]] = []
+        if not commands:
+            return results
+        
+        sessions = min(len(commands), self.max_sessions)
+        conn = self._get_connection(host, port, sessions=sessions)
+        discard = False
+        try:
+            transport = conn.transport
+            for start in range(0, len(commands), self.max_sessions):
+                chunk = commands[start:start + self.max_sessions]
+                logger.info(
+                    f"Executing batch of {len(chunk)} commands on {host}:{port}"
+                )
+                channels = []
+                try:
+                    for command in chunk:
+                        channel = transport.open_session(timeout=self.connection_timeout)
+                        channel.exec_command(command)
+                        channels.append(channel)
+                    results.extend(self._drain_channels(channels, timeout))
+                finally:
+                    for channel in channels:
+                        channel.close()
+            conn.error_count = 0
+        except Exception as e:
+            logger.error(f"SSH batch execution failed on {host}:{port}: {e}")
+            conn.error_count += 1
+            discard = conn.error_count >= 3 or not self._is_alive(conn)
+            results.extend((False, "", str(e)) for _ in commands[len(results):])
+        finally:
+            self._release_connection(conn, discard=discard, sessions=sessions)
+        
+        return results
+    
+    def execute_many(
+        self,
+        targets: List[Tuple[str, int, str]],
+        timeout: Optional[int] = None
+    ) -> List[Tuple[bool, str, str]]:
+        """
+        Execute commands across many proxies concurrently.
+        
+        Connections for all routes are acquired in parallel, then every
+        command is started on its own channel and all channels are drained
+        by a single select() loop, so fanning out to N proxies needs no
+        thread per command. Commands are not retried.
+        
+        Args:
+            targets: (host, port, command) tuples
+            timeout: Timeout per round of max_sessions commands per host (seconds)
+            
+        Returns:
+            List of (success, stdout, stderr) tuples, in target order
+        """
+        timeout = timeout or self.command_timeout
+        results: List[Optional[Tuple[bool, str, str]]] = [None] * len(targets)
+        if not targets:
+            return []
+        
+        by_route: Dict[Tuple[str, int], List[int]] = {}
+        for index, (host, port, _) in enumerate(targets):
+            by_route.setdefault((host, port), []).append(index)
+        sessions = {
+            key: min(len(indexes), self.max_sessions)
+            for key, indexes in by_route.items()
+        }
+        
+        conns: Dict[Tuple[str, int], SSHConnection] = {}
+        with ThreadPoolExecutor(max_workers=min(16, len(by_route))) as pool:
+            futures = {
+                key: pool.submit(self._get_connection, *key, sessions[key])
+                for key in by_route
+            }
+        for key, future in futures.items():
+            try:
+                conns[key] = future.result()
+            except Exception as e:
+                logger.error(f"Failed to connect to {key[0]}:{key[1]}: {e}")
+                for index in by_route[key]:
+                    results[index] = (False, "", str(e))
+        
+        try:
+            longest = max((len(by_route[key]) for key in conns), default=0)
+            for start in range(0, longest, self.max_sessions):
+                channels = []
+                started = []
+                try:
+                    for key, conn in conns.items():
+                        for index in by_route[key][start:start + self.max_sessions]:
+                            try:
+                                channel = conn.transport.open_session(
+                                    timeout=self.connection_timeout
+                                )
+                                channels.append(channel)
+                                channel.exec_command(targets[index][2])
+                            except Exception as e:
+                                conn.error_count += 1
+                                results[index] = (False, "", str(e))
+                                continue
+                            started.append((index, channel))
                     
-            finally:
-                if conn:
-                    self._release_connection(conn)
+                    logger.info(
+                        f"Executing {len(started)} commands across {len(conns)} proxies"
+                    )
+                    outputs = self._drain_channels(
+                        [channel for _, channel in started], timeout
+                    )
+                    for (index, _), result in zip(started, outputs):
+                        results[index] = result
+                finally:
+                    for channel in channels:
+                        channel.close()
+        finally:
+            for key, conn in conns.items():
+                self._release_connection(
+                    conn,
+                    discard=conn.error_count >= 3 or not self._is_alive(conn),
+                    sessions=sessions[key]
+                )
+        
+        return results
+    
+    @staticmethod
+    def _drain_channels(channels: list, timeout: float) -> List[Tuple[bool, str, str]]:
+        """
+        Read stdout/stderr of several exec channels concurrently.
+        
+        Both streams of every channel are drained until EOF, so a command
+        that writes heavily to stderr never blocks on a full window while
+        stdout is being read. The exit status is collected after EOF: servers
+        may send it before the last output.
+        
+        Args:
+            channels: paramiko channels with a command already started
+            timeout: Overall deadline for all channels (seconds)
+            
+        Returns:
+            List of (success, stdout, stderr) tuples, in channel order
+        """
+        stdout = {channel: bytearray() for channel in channels}
+        stderr = {channel: bytearray() for channel in channels}
+        reading = list(channels)  # Output not yet complete
+        waiting = []  # At EOF, exit status not yet received
+        deadline = time.monotonic() + timeout
+        
+        while reading or waiting:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            poll = min(remaining, _CHANNEL_POLL_INTERVAL)
+            if reading:
+                select.select(reading, [], [], poll)
+            else:
+                time.sleep(poll)
+            
+            for channel in list(reading):
+                # Checked before draining: once EOF is in, all output is buffered
+                at_eof = channel.eof_received
+                while channel.recv_ready():
+                    stdout[channel] += channel.recv(32768)
+                while channel.recv_stderr_ready():
+                    stderr[channel] += channel.recv_stderr(32768)
+                if at_eof:
+                    reading.remove(channel)
+                    waiting.append(channel)
+            
+            waiting = [channel for channel in waiting if not channel.exit_status_ready()]
         
-        return False, "", "Maximum retries exceeded"
+        results = []
+        for channel in channels:
+            out = stdout[channel].decode('utf-8', errors='replace')
+            err = stderr[channel].decode('utf-8', errors='replace')
+            if channel in reading or channel in waiting:
+                results.append((False, out, f"Command timed out after {timeout}s"))
+            else:
+                results.append((channel.recv_exit_status() == 0, out, err))
+        return results
     
     def close_all(self):
         """Close all pooled connections."""
-        with self._pool_lock:
-            for pool_key, connections in self._pool.items():
-                for conn in connections:
-                    try:
-                        conn.client.close()
-                        logger.debug(f"Closed connection to {conn.host}:{conn.port}")
-                    except Exception as e:
-                        logger.debug(f"Error closing connection: {e}")
-            
-            self._pool.clear()
-            logger.info("All SSH connections closed")
+        for route in list(self._routes.values()):
+            with route.cond:
+                connections = list(route.idle) + list(route.in_use)
+                route.size -= len(route.idle)
+                route.idle.clear()
+                self._sync_stats(route)
+                route.cond.notify_all()
+            # Checked-out connections are closed now and dropped as dead
+            # when their users release them
+            for conn in connections:
+                self._close_connection(conn, "close_all")
+        
+        logger.info("All SSH connections closed")
     
     def get_pool_stats(self) -> Dict[str, int]:
         """
@@ -431,16 +817,32 @@ class SSHProxyClient:
         Returns:
             Dictionary with pool statistics
         """
-        with self._pool_lock:
-            total_connections = sum(len(conns) for conns in self._pool.values())
-            active_connections = sum(
-                sum(1 for conn in conns if conn.in_use)
-                for conns in self._pool.values()
-            )
-            
-            return {
-                "total_hosts": len(self._pool),
-                "total_connections": total_connections,
-                "active_connections": active_connections,
-                "idle_connections": total_connections - active_connections
-            }
+        with self._stats_lock:
+            total_hosts = self._total_hosts
+            total_connections = self._total_connections
+            active_connections = self._active_connections
+        
+        return {
+            "total_hosts": total_hosts,
+            "total_connections": total_connections,
+            "active_connections": active_connections,
+            "idle_connections": total_connections - active_connections
+        }
+    
+    def _sync_stats(self, route: RouteState):
+        """
+        Fold a route's current counts into the pool totals (route.cond held).
+        
+        Only the difference since the route's last sync is applied, so
+        get_pool_stats never has to scan the routes.
+        """
+        active = len(route.in_use)
+        total = active + len(route.idle)
+        if total == route.counted_total and active == route.counted_active:
+            return
+        with self._stats_lock:
+            self._total_connections += total - route.counted_total
+            self._active_connections += active - route.counted_active
+            self._total_hosts += (total > 0) - (route.counted_total > 0)
+        route.counted_total = total
+        route.counted_active = active
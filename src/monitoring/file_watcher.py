@@ -8,12 +8,17 @@ Author: Next_Prism Project
 License: MIT
 """
 
+import bisect
+import heapq
 import os
 import time
 from pathlib import Path
-from typing import Set, Callable, Optional, Dict
+from typing import Set, Callable, Optional, Dict, List, Tuple
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler, FileCreatedEvent, FileModifiedEvent
+from watchdog.events import (
+    EVENT_TYPE_CLOSED, EVENT_TYPE_CREATED, EVENT_TYPE_MODIFIED, EVENT_TYPE_MOVED,
+    FileSystemEvent, FileSystemEventHandler
+)
 from threading import Lock
 import logging
 
@@ -31,12 +36,12 @@ class PhotoFileHandler(FileSystemEventHandler):
     """
     
     # Photo file extensions to monitor (case-insensitive)
-    PHOTO_EXTENSIONS = {
+    PHOTO_EXTENSIONS = frozenset({
         '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif',
         '.heic', '.heif', '.webp',
         '.raw', '.cr2', '.nef', '.arw', '.dng', '.orf', '.rw2',
         '.raf', '.sr2', '.pef', '.crw'
-    }
+    })
     
     def __init__(self, callback: Callable[[Path, str], None], debounce_seconds: float = 5.0):
         """
@@ -50,57 +55,77 @@ class PhotoFileHandler(FileSystemEventHandler):
         self.callback = callback
         self.debounce_seconds = debounce_seconds
         
-        # Track files being written (debouncing)
-        self._pending_files: Dict[str, float] = {}
+        # Extensions as a tuple for str.endswith (a single C-level loop)
+        self._ext_tuple = tuple(self.PHOTO_EXTENSIONS)
+        
+        # Track files being written (debouncing): a min-heap of
+        # (deadline, path) plus each path's latest deadline, so a tick only
+        # touches matured entries. Heap entries whose deadline no longer
+        # matches _latest were superseded by a later event and are dropped.
+        self._heap: List[Tuple[float, str]] = []
+        self._latest: Dict[str, float] = {}
         self._lock = Lock()
     
-    def _is_photo_file(self, path: str) -> bool:
-        """Check if file is a photo based on extension."""
-        return Path(path).suffix.lower() in self.PHOTO_EXTENSIONS
-    
-    def _is_hidden_or_temp(self, path: str) -> bool:
-        """Check if file is hidden or temporary."""
-        filename = os.path.basename(path)
-        return (
-            filename.startswith('.') or
-            filename.startswith('~') or
-            filename.endswith('.tmp') or
-            filename.endswith('.part') or
-            '/.~' in path
-        )
+    def _should_process(self, path: str) -> bool:
+        """
+        Check if an event path is a photo worth queueing.
+        
+        The extension test runs first since it rejects most events; only
+        then is the filename located to skip hidden (.*) and lock (~*)
+        files. Partial uploads (.tmp/.part) never pass the extension test.
+        Uses plain string slicing since this runs on every filesystem event.
+        """
+        # Extensions are at most 5 chars, so only the tail needs lowercasing
+        if not path[-6:].lower().endswith(self._ext_tuple):
+            return False
+        name_start = path.rfind(os.sep) + 1
+        return path[name_start:name_start + 1] not in ('.', '~')
     
-    def on_created(self, event: FileCreatedEvent):
-        """Handle file creation events."""
+    def dispatch(self, event: FileSystemEvent):
+        """
+        Route an observer event directly, bypassing watchdog's on_* lookup.
+        
+        Created/modified files start (or restart) their debounce period; a
+        file moved into place is debounced under its destination path. A
+        close-after-write event means the file is complete and it is
+        processed right away.
+        """
         if event.is_directory:
             return
         
-        if not self._is_photo_file(event.src_path):
+        event_type = event.event_type
+        if event_type == EVENT_TYPE_CREATED or event_type == EVENT_TYPE_MODIFIED:
+            path = event.src_path
+        elif event_type == EVENT_TYPE_MOVED:
+            path = event.dest_path
+        elif event_type == EVENT_TYPE_CLOSED:
+            self.handle_completed(event.src_path)
             return
-        
-        if self._is_hidden_or_temp(event.src_path):
+        else:
             return
         
-        logger.debug(f"Photo file created: {event.src_path}")
-        self._add_pending_file(event.src_path)
+        if self._should_process(path):
+            self._add_pending_file(path)
     
-    def on_modified(self, event: FileModifiedEvent):
-        """Handle file modification events (file write completion)."""
-        if event.is_directory:
-            return
-        
-        if not self._is_photo_file(event.src_path):
-            return
+    def handle_completed(self, path: str):
+        """
+        Process a file whose writer has finished (close-after-write event).
         
-        if self._is_hidden_or_temp(event.src_path):
+        The kernel reports these once the file is complete, so no debounce
+        is needed; any pending entry for the path is cancelled.
+        """
+        if not self._should_process(path):
             return
-        
-        logger.debug(f"Photo file modified: {event.src_path}")
-        self._add_pending_file(event.src_path)
+        with self._lock:
+            self._latest.pop(path, None)
+        self._process_file(path)
     
     def _add_pending_file(self, path: str):
-        """Add file to pending queue with timestamp."""
+        """Add file to pending queue, (re)starting its debounce period."""
+        deadline = time.monotonic() + self.debounce_seconds
         with self._lock:
-            self._pending_files[path] = time.time()
+            self._latest[path] = deadline
+            heapq.heappush(self._heap, (deadline, path))
     
     def process_pending_files(self):
         """
@@ -108,25 +133,33 @@ class PhotoFileHandler(FileSystemEventHandler):
         
         This should be called periodically (e.g., every second) to check for stable files.
         """
-        current_time = time.time()
-        files_to_process = []
+        current_time = time.monotonic()
+        matured = []
         
         with self._lock:
-            for path, timestamp in list(self._pending_files.items()):
-                # Check if file has been stable for debounce period
-                if current_time - timestamp >= self.debounce_seconds:
-                    # Check if file still exists (might have been moved/deleted)
-                    if os.path.exists(path) and os.path.isfile(path):
-                        files_to_process.append(path)
-                    del self._pending_files[path]
+            heap = self._heap
+            while heap and heap[0][0] <= current_time:
+                deadline, path = heapq.heappop(heap)
+                # Skip entries superseded by a later event for the same file
+                if self._latest.get(path) != deadline:
+                    continue
+                del self._latest[path]
+                matured.append(path)
+        
+        # Check if file still exists (might have been moved/deleted)
+        files_to_process = [path for path in matured if os.path.isfile(path)]
         
         # Process stable files
         for path in files_to_process:
-            try:
-                logger.info(f"Processing stable file: {path}")
-                self.callback(Path(path), str(Path(path).parent))
-            except Exception as e:
-                logger.error(f"Error processing file {path}: {e}")
+            self._process_file(path)
+    
+    def _process_file(self, path: str):
+        """Hand a stable file to the callback."""
+        try:
+            logger.info(f"Processing stable file: {path}")
+            self.callback(Path(path), str(Path(path).parent))
+        except Exception as e:
+            logger.error(f"Error processing file {path}: {e}")
 
 
 class FileWatcher:
@@ -134,6 +167,8 @@ class FileWatcher:
     Main file watcher service.
     
     Monitors multiple folders and dispatches detected photos to callback.
+    A single PhotoFileHandler serves every watched folder; the source label
+    is recovered from the event path.
     """
     
     def __init__(self, config: Config, callback: Callable[[Path, str], None]):
@@ -147,8 +182,14 @@ class FileWatcher:
         self.config = config
         self.callback = callback
         self.observer = Observer()
-        self._watched_paths: Set[str] = set()
-        self._handlers: Dict[str, PhotoFileHandler] = {}
+        self._path_to_label: Dict[str, str] = {}
+        # Watched roots in sorted order with their labels, for _label_for
+        self._sorted_paths: List[str] = []
+        self._sorted_labels: List[str] = []
+        self._handler = PhotoFileHandler(
+            callback=self._dispatch,
+            debounce_seconds=self.config.monitoring.debounce_seconds
+        )
         self._is_running = False
         
         logger.info("FileWatcher initialized")
@@ -169,7 +210,7 @@ class FileWatcher:
         self.observer.start()
         self._is_running = True
         
-        logger.info(f"FileWatcher started, monitoring {len(self._watched_paths)} folders")
+        logger.info(f"FileWatcher started, monitoring {len(self._path_to_label)} folders")
     
     def stop(self):
         """Stop watching folders."""
@@ -212,14 +253,18 @@ class FileWatcher:
         """
         nc_config = self.config.nextcloud
         
-        # Get all users from data directory
+        # Get all users from data directory. DirEntry.is_dir() answers from
+        # the directory listing's d_type, so only the "files" check stats.
+        # Symlinked entries are not users (same policy as watcher.py).
         all_users = set()
         try:
-            for item in data_path.iterdir():
-                if item.is_dir() and not item.name.startswith('.'):
+            with os.scandir(data_path) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.') or not entry.is_dir(follow_symlinks=False):
+                        continue
                     # Check if it has a files directory (valid user)
-                    if (item / "files").exists():
-                        all_users.add(item.name)
+                    if os.path.exists(os.path.join(entry.path, "files")):
+                        all_users.add(entry.name)
         except Exception as e:
             logger.error(f"Error reading Nextcloud data directory: {e}")
             return set()
@@ -264,28 +309,54 @@ class FileWatcher:
             path: Directory path to monitor
             source_label: Human-readable label for logging
         """
-        if path in self._watched_paths:
+        path = path.rstrip(os.sep) or os.sep
+        if path in self._path_to_label:
             logger.debug(f"Path already being watched: {path}")
             return
         
-        # Create handler for this path
-        handler = PhotoFileHandler(
-            callback=lambda p, s: self.callback(p, source_label),
-            debounce_seconds=self.config.monitoring.debounce_seconds
-        )
+        self.observer.schedule(self._handler, path, recursive=True)
         
-        # Schedule watch
-        self.observer.schedule(handler, path, recursive=True)
-        
-        self._watched_paths.add(path)
-        self._handlers[path] = handler
+        self._path_to_label[path] = source_label
+        index = bisect.bisect_left(self._sorted_paths, path)
+        self._sorted_paths.insert(index, path)
+        self._sorted_labels.insert(index, source_label)
         
         logger.debug(f"Added watch path: {path} (label: {source_label})")
     
+    def _label_for(self, path: str) -> Optional[str]:
+        """
+        Find the source label of the deepest watched folder containing path.
+        
+        Binary-searches the sorted roots for the greatest one <= path. If it
+        is not an ancestor (a sibling like "/a/b" for "/a/c/x"), every
+        ancestor is a prefix of their common prefix, so the search repeats
+        on that shorter key; each retry moves strictly left, and nested
+        roots are rare, so this is O(log N) in practice.
+        """
+        paths = self._sorted_paths
+        key = path
+        while True:
+            index = bisect.bisect_right(paths, key) - 1
+            if index < 0:
+                return None
+            root = paths[index]
+            if path.startswith(root) and (
+                len(path) == len(root) or path[len(root)] == os.sep or root == os.sep
+            ):
+                return self._sorted_labels[index]
+            key = os.path.commonprefix((root, path))
+            if key == root:
+                # root is a prefix of path but not at a directory boundary
+                key = key[:-1]
+    
+    def _dispatch(self, path: Path, parent: str):
+        """Forward a stable file from the shared handler with its source label."""
+        label = self._label_for(str(path))
+        self.callback(path, label if label is not None else parent)
+    
     def process_pending_files(self):
-        """Process pending files in all handlers (call periodically)."""
-        for handler in self._handlers.values():
-            handler.process_pending_files()
+        """Process pending files of the shared handler (call periodically)."""
+        self._handler.process_pending_files()
     
     def get_watched_folders(self) -> list:
         """
@@ -294,7 +365,7 @@ class FileWatcher:
         Returns:
             List of folder paths
         """
-        return list(self._watched_paths)
+        return list(self._path_to_label)
     
     def reload_folders(self):
         """Reload folder configuration (e.g., after config change)."""
@@ -305,9 +376,10 @@ class FileWatcher:
         if was_running:
             self.stop()
         
-        # Clear current watches
-        self._watched_paths.clear()
-        self._handlers.clear()
+        # Clear current watches (pending files stay queued on the handler)
+        self._path_to_label.clear()
+        self._sorted_paths.clear()
+        self._sorted_labels.clear()
         self.observer = Observer()
         
         # Restart with new configuration
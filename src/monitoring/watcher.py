@@ -1,24 +1,63 @@
 """
 File System Watcher
 
-Monitors configured folders for new photo files using the watchdog library.
+Monitors configured folders for new photo files. On Linux all folders share
+one inotify instance read by a single thread; elsewhere (or if inotify fails)
+each folder falls back to a watchdog Observer.
 Implements debouncing to avoid duplicate triggers and queues files for processing.
+Debounced files are released by a background thread that sleeps until the
+next deadline is due, so an idle watcher does no periodic work.
 
 Author: Next_Prism Project
 License: MIT
 """
 
+import ctypes
+import heapq
+import math
+import os
+import select
+import struct
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Set, Callable, Optional
+from typing import Dict, Iterable, Iterator, List, Set, Callable, Optional, Tuple
 from threading import Lock
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler, FileCreatedEvent, FileModifiedEvent
 
 from ..utils.logger import get_logger
-from ..utils.file_ops import is_image_file
 from ..config.schema import MonitoredFolder
 
+# Native inotify (Linux only), via watchdog's ctypes bindings
+try:
+    from watchdog.observers.inotify_c import (
+        InotifyConstants, inotify_add_watch, inotify_init, inotify_rm_watch
+    )
+    INOTIFY_AVAILABLE = hasattr(os, "eventfd") and hasattr(select, "epoll")
+    # Only the events needed to spot new photos; IN_ACCESS/IN_OPEN etc. would
+    # flood the queue with reads of unrelated files. Files are complete on
+    # IN_CLOSE_WRITE / IN_MOVED_TO; IN_CREATE is kept for new directories.
+    INOTIFY_MASK = (
+        InotifyConstants.IN_CREATE | InotifyConstants.IN_MOVED_TO |
+        InotifyConstants.IN_CLOSE_WRITE
+    )
+    # Folders with debounce_writes set are debounced on modifications instead
+    INOTIFY_DEBOUNCE_MASK = (
+        InotifyConstants.IN_CREATE | InotifyConstants.IN_MOVED_TO |
+        InotifyConstants.IN_MODIFY
+    )
+except Exception:
+    INOTIFY_AVAILABLE = False
+
+# struct inotify_event header: wd, mask, cookie, len (name follows)
+_INOTIFY_EVENT = struct.Struct("iIII")
+_INOTIFY_BUFFER_SIZE = 64 * 1024
+
+# Non-user entries in the Nextcloud data directory (plus appdata_<instanceid>)
+_NC_SYSTEM_DIRS = frozenset({'__groupfolders', 'files_external', '.ocdata'})
+
 logger = get_logger(__name__)
 
 
@@ -33,24 +72,40 @@ class PhotoFileHandler(FileSystemEventHandler):
     def __init__(
         self,
         folder_config: MonitoredFolder,
-        on_new_photo: Callable[[str, MonitoredFolder], None],
-        debounce_seconds: int = 2
+        on_new_photo: Callable[..., None],
+        debounce_seconds: int = 2,
+        on_schedule: Optional[Callable[[float], None]] = None,
+        submit: Optional[Callable[..., None]] = None
     ):
         """
         Initialize the photo file handler.
         
         Args:
             folder_config: Configuration for the monitored folder
-            on_new_photo: Callback function(file_path, folder_config) when new photo detected
+            on_new_photo: Callback function(file_path, folder_config, stat_result=...)
+                when new photo detected
             debounce_seconds: Seconds to wait before confirming a file is stable
+            on_schedule: Called with each new debounce deadline (monotonic)
+            submit: Runs submit(fn, *args) off the event thread; callbacks run
+                inline if not given
         """
         super().__init__()
         self.folder_config = folder_config
         self.on_new_photo = on_new_photo
         self.debounce_seconds = debounce_seconds
+        self.on_schedule = on_schedule
+        self.submit = submit
+        
+        # Extensions as ".ext" suffixes for str.endswith (one C-level pass)
+        self._ext_tuple = tuple(
+            '.' + ext.lower().lstrip('.') for ext in folder_config.extensions
+        )
         
-        # Track pending files with their last modification time
+        # Track pending files with their debounce deadline (monotonic), plus
+        # a min-heap of (deadline, path). Heap entries whose deadline no
+        # longer matches _pending_files were superseded by a later event.
         self._pending_files: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
         self._lock = Lock()
         
         logger.info(f"Initialized handler for {folder_config.path}")
@@ -67,10 +122,40 @@ class PhotoFileHandler(FileSystemEventHandler):
         if event.is_directory:
             return
         
-        # Update modification time for pending files
+        self._handle_modified(event.src_path)
+    
+    def _handle_modified(self, file_path: str):
+        """Restart the debounce period of a pending file."""
+        self._handle_modified_batch((file_path,))
+    
+    def _handle_modified_batch(self, file_paths: Iterable[str]):
+        """
+        Restart the debounce period of several pending files at once.
+        
+        Takes the lock once for the whole batch; paths that are not
+        pending are ignored.
+        
+        Args:
+            file_paths: Paths that were modified (duplicates already removed)
+        """
+        # Non-images are never pending, so rewrites of them skip the lock
+        ext_tuple = self._ext_tuple
+        file_paths = [path for path in file_paths if path.lower().endswith(ext_tuple)]
+        if not file_paths:
+            return
+        
+        deadline = time.monotonic() + self.debounce_seconds
+        touched = False
         with self._lock:
-            if event.src_path in self._pending_files:
-                self._pending_files[event.src_path] = time.time()
+            pending = self._pending_files
+            for file_path in file_paths:
+                if file_path in pending:
+                    pending[file_path] = deadline
+                    heapq.heappush(self._heap, (deadline, file_path))
+                    touched = True
+        
+        if touched and self.on_schedule:
+            self.on_schedule(deadline)
     
     def _handle_file_event(self, file_path: str):
         """
@@ -80,66 +165,167 @@ class PhotoFileHandler(FileSystemEventHandler):
             file_path: Path to the file
         """
         # Check if it's an image file based on extension
-        if not is_image_file(file_path, extensions=self.folder_config.extensions):
-            logger.debug(f"Skipping non-image file: {file_path}")
+        if not file_path.lower().endswith(self._ext_tuple):
+            logger.debug("Skipping non-image file: %s", file_path)
             return
         
         # Add to pending files
         with self._lock:
-            self._pending_files[file_path] = time.time()
-            logger.debug(f"Added to pending: {file_path}")
+            deadline = self._push_pending(file_path)
+            logger.debug("Added to pending: %s", file_path)
+        
+        if self.on_schedule:
+            self.on_schedule(deadline)
+    
+    def handle_completed(self, file_path: str):
+        """
+        Process a file whose writer has finished (IN_CLOSE_WRITE / IN_MOVED_TO).
+        
+        The kernel reports these once the file is complete, so it is
+        dispatched immediately and any pending debounce entry is cancelled.
+        """
+        if not file_path.lower().endswith(self._ext_tuple):
+            return
+        
+        with self._lock:
+            self._pending_files.pop(file_path, None)
+        
+        self._dispatch(file_path)
+    
+    def _push_pending(self, file_path: str) -> float:
+        """(Re)start a file's debounce period (lock must be held)."""
+        deadline = time.monotonic() + self.debounce_seconds
+        self._pending_files[file_path] = deadline
+        heapq.heappush(self._heap, (deadline, file_path))
+        return deadline
+    
+    def next_deadline(self) -> Optional[float]:
+        """
+        Get the earliest pending debounce deadline.
+        
+        Returns:
+            Monotonic deadline, or None if nothing is pending
+        """
+        with self._lock:
+            heap = self._heap
+            # Drop superseded entries so the top is a live deadline
+            while heap and self._pending_files.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)
+            return heap[0][0] if heap else None
     
     def process_pending(self):
         """
         Process pending files that have stabilized (no changes for debounce period).
         
-        Should be called periodically by the watcher.
+        Only matured heap entries are touched, so this is cheap to call
+        whenever a deadline may have passed.
         """
-        current_time = time.time()
+        current_time = time.monotonic()
         stable_files = []
         
         with self._lock:
-            # Find files that haven't been modified recently
-            for file_path, last_modified in list(self._pending_files.items()):
-                if current_time - last_modified >= self.debounce_seconds:
-                    stable_files.append(file_path)
-                    del self._pending_files[file_path]
+            heap = self._heap
+            while heap and heap[0][0] <= current_time:
+                deadline, file_path = heapq.heappop(heap)
+                # Skip entries superseded by a later event for the same file
+                if self._pending_files.get(file_path) != deadline:
+                    continue
+                del self._pending_files[file_path]
+                stable_files.append(file_path)
+            
+            # Write bursts leave one superseded entry per event; rebuild the
+            # heap from the live deadlines once stale entries dominate
+            if len(heap) > 2 * len(self._pending_files) + 64:
+                self._heap = [
+                    (deadline, file_path)
+                    for file_path, deadline in self._pending_files.items()
+                ]
+                heapq.heapify(self._heap)
         
         # Process stable files (outside the lock)
         for file_path in stable_files:
-            # Verify file still exists and is accessible
-            if not Path(file_path).exists():
-                logger.warning(f"File disappeared before processing: {file_path}")
-                continue
-            
-            try:
-                # Call the callback
-                logger.info(f"New photo detected: {file_path}")
-                self.on_new_photo(file_path, self.folder_config)
-            except Exception as e:
-                logger.error(f"Error processing new photo {file_path}: {e}")
+            self._dispatch(file_path)
+    
+    def _dispatch(self, file_path: str):
+        """Hand a finished photo to the callback, off the event thread if possible."""
+        if self.submit:
+            self.submit(self._process_file, file_path)
+        else:
+            self._process_file(file_path)
+    
+    def _process_file(self, file_path: str):
+        """
+        Run the callback for a finished photo if it still exists.
+        
+        The single stat both verifies the file and hands its size/mtime to
+        the callback, which would otherwise stat it again.
+        """
+        try:
+            stat_result = os.stat(file_path)
+        except FileNotFoundError:
+            logger.warning(f"File disappeared before processing: {file_path}")
+            return
+        except OSError as e:
+            logger.warning(f"Cannot access new photo {file_path}: {e}")
+            return
+        
+        try:
+            # Call the callback
+            logger.info(f"New photo detected: {file_path}")
+            self.on_new_photo(file_path, self.folder_config, stat_result=stat_result)
+        except Exception as e:
+            logger.error(f"Error processing new photo {file_path}: {e}")
 
 
 class FolderWatcher:
     """
     Manages file system monitoring for multiple folders.
     
-    Creates observers for each configured folder and coordinates
-    event processing across all monitored locations.
+    On Linux every folder tree is watched through one inotify instance with
+    a watch per directory; a single thread waits (epoll) on it and routes
+    each event to its folder's handler via the watch descriptor. New
+    subdirectories get watches as they appear. Files are dispatched as soon
+    as their writer closes them, unless the folder sets debounce_writes.
+    Folders that cannot use inotify get their own watchdog Observer.
+    
+    A debounce thread waits until the earliest pending deadline across all
+    handlers and is woken early only when an event schedules an earlier one.
+    Callbacks run on a bounded thread pool, so a slow callback never holds
+    up reading further events.
     """
     
-    def __init__(self, on_new_photo: Callable[[str, MonitoredFolder], None]):
+    def __init__(self, on_new_photo: Callable[..., None]):
         """
         Initialize the folder watcher.
         
         Args:
-            on_new_photo: Callback function when new photo is detected
+            on_new_photo: Callback function(file_path, folder_config, stat_result=...)
+                when new photo is detected
         """
         self.on_new_photo = on_new_photo
-        self.observers: Dict[str, Observer] = {}
+        self.observers: Dict[str, Observer] = {}  # Fallback watches only
         self.handlers: Dict[str, PhotoFileHandler] = {}
         self._running = False
         
+        # Shared inotify instance: watch descriptor -> (directory, handler).
+        # The reader thread is woken for shutdown through an eventfd.
+        self._inotify_fd: Optional[int] = None
+        self._shutdown_fd: Optional[int] = None
+        self._watches: Dict[int, Tuple[str, PhotoFileHandler]] = {}
+        self._watch_lock = Lock()
+        self._inotify_thread: Optional[threading.Thread] = None
+        if INOTIFY_AVAILABLE:
+            self._init_inotify()
+        
+        # Debounce thread and its wakeup: _next_wake is the deadline it is
+        # currently sleeping towards (inf while idle or rescanning)
+        self._wake = threading.Event()
+        self._next_wake = math.inf
+        self._debounce_thread: Optional[threading.Thread] = None
+        
+        # Callback pool, created on start
+        self._executor: Optional[ThreadPoolExecutor] = None
+        
         logger.info("FolderWatcher initialized")
     
     def add_folder(self, folder_config: MonitoredFolder):
@@ -163,19 +349,24 @@ class FolderWatcher:
             logger.error(f"Path is not a directory: {folder_config.path}")
             return
         
-        # Create handler and observer
+        # Create handler
         handler = PhotoFileHandler(
             folder_config=folder_config,
             on_new_photo=self.on_new_photo,
-            debounce_seconds=2
+            debounce_seconds=2,
+            on_schedule=self._schedule_wakeup,
+            submit=self._submit
         )
+        self.handlers[folder_config.path] = handler
+        
+        # Prefer the shared inotify instance; fall back to an observer
+        if self._watch_tree(str(folder_path), handler):
+            logger.info(f"Monitoring via inotify: {folder_config.path}")
+            return
         
         observer = Observer()
         observer.schedule(handler, str(folder_path), recursive=True)
-        
-        # Store references
         self.observers[folder_config.path] = observer
-        self.handlers[folder_config.path] = handler
         
         # Start observer if watcher is running
         if self._running:
@@ -191,15 +382,207 @@ class FolderWatcher:
         Args:
             folder_path: Path to the folder to stop monitoring
         """
+        handler = self.handlers.pop(folder_path, None)
+        if handler is None:
+            return
+        
         if folder_path in self.observers:
-            observer = self.observers[folder_path]
+            observer = self.observers.pop(folder_path)
             observer.stop()
             observer.join(timeout=5)
+        else:
+            self._unwatch_handler(handler)
+        
+        logger.info(f"Stopped monitoring: {folder_path}")
+    
+    def _init_inotify(self):
+        """Create the shared inotify instance and the shutdown eventfd."""
+        fd = inotify_init()
+        if fd == -1:
+            err = ctypes.get_errno()
+            logger.warning(f"inotify unavailable, using observers: {os.strerror(err)}")
+            return
+        os.set_blocking(fd, False)
+        os.set_inheritable(fd, False)
+        self._inotify_fd = fd
+        self._shutdown_fd = os.eventfd(0, os.EFD_CLOEXEC | os.EFD_NONBLOCK)
+    
+    def _add_watch(self, directory: str, handler: PhotoFileHandler):
+        """
+        Watch one directory on the shared inotify instance.
+        
+        Raises:
+            OSError: inotify_add_watch failed (e.g. watch limit reached)
+        """
+        if handler.folder_config.debounce_writes:
+            mask = INOTIFY_DEBOUNCE_MASK
+        else:
+            mask = INOTIFY_MASK
+        wd = inotify_add_watch(self._inotify_fd, os.fsencode(directory), mask)
+        if wd == -1:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), directory)
+        with self._watch_lock:
+            self._watches[wd] = (directory, handler)
+    
+    def _watch_tree(self, root: str, handler: PhotoFileHandler) -> bool:
+        """
+        Watch every directory under root on the shared inotify instance.
+        
+        Returns:
+            True if the tree is watched, False if inotify is unavailable or
+            failed (partial watches are removed again)
+        """
+        if self._inotify_fd is None:
+            return False
+        try:
+            self._seed_watches(root, handler)
+            return True
+        except OSError as e:
+            logger.warning(f"inotify watch failed for {root}, using observer: {e}")
+            self._unwatch_handler(handler)
+            return False
+    
+    def _seed_watches(self, root: str, handler: PhotoFileHandler):
+        """
+        Install the initial watches for a tree, one directory level at a time.
+        
+        Each level is listed and watched on a thread pool, so large or
+        slow (network) trees are not walked one syscall at a time.
+        Directories created later are picked up from IN_CREATE | IN_ISDIR.
+        
+        Raises:
+            OSError: A watch could not be added
+        """
+        def watch_directory(directory: str) -> List[str]:
+            try:
+                with os.scandir(directory) as entries:
+                    # Don't descend into symlinked directories
+                    subdirs = [
+                        entry.path for entry in entries
+                        if entry.is_dir(follow_symlinks=False)
+                    ]
+            except OSError:
+                # Unreadable directories are skipped, as os.walk does
+                return []
+            self._add_watch(directory, handler)
+            return subdirs
+        
+        with ThreadPoolExecutor(
+            max_workers=min(32, (os.cpu_count() or 1) * 2),
+            thread_name_prefix="folder-watcher-seed"
+        ) as pool:
+            level = [root]
+            while level:
+                level = [
+                    subdir
+                    for subdirs in pool.map(watch_directory, level)
+                    for subdir in subdirs
+                ]
+        
+        logger.debug("Seeded inotify watches for %s", root)
+    
+    def _unwatch_handler(self, handler: PhotoFileHandler):
+        """Remove all inotify watches routed to a handler."""
+        with self._watch_lock:
+            wds = [wd for wd, (_, owner) in self._watches.items() if owner is handler]
+            for wd in wds:
+                del self._watches[wd]
+        for wd in wds:
+            inotify_rm_watch(self._inotify_fd, wd)
+    
+    def _watch_new_directory(self, directory: str, handler: PhotoFileHandler):
+        """
+        Watch a directory created inside a watched tree.
+        
+        Files already inside were possibly written before the watch existed,
+        so they are queued as if just created.
+        """
+        for subdir, _, filenames in os.walk(directory):
+            try:
+                self._add_watch(subdir, handler)
+            except OSError as e:
+                logger.warning(f"Failed to watch new directory {subdir}: {e}")
+            for filename in filenames:
+                handler._handle_file_event(os.path.join(subdir, filename))
+    
+    def _inotify_loop(self):
+        """Wait on the shared inotify fd and dispatch events in batches until shutdown."""
+        logger.info("inotify loop started")
+        
+        epoll = select.epoll()
+        epoll.register(self._inotify_fd, select.EPOLLIN)
+        epoll.register(self._shutdown_fd, select.EPOLLIN)
+        try:
+            while True:
+                ready = [fd for fd, _ in epoll.poll()]
+                if self._shutdown_fd in ready:
+                    os.eventfd_read(self._shutdown_fd)
+                    break
+                # Drain the fd to EAGAIN so a burst costs one wakeup, then
+                # handle the whole batch (reads always return whole events)
+                chunks = []
+                while True:
+                    try:
+                        chunk = os.read(self._inotify_fd, _INOTIFY_BUFFER_SIZE)
+                    except BlockingIOError:
+                        break
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                if not chunks:
+                    continue
+                try:
+                    self._handle_inotify_events(b"".join(chunks))
+                except Exception as e:
+                    logger.error(f"Error handling inotify events: {e}")
+        finally:
+            epoll.close()
+        
+        logger.info("inotify loop stopped")
+    
+    def _handle_inotify_events(self, buffer: bytes):
+        """Route a buffer of raw inotify events to their folders' handlers."""
+        # IN_MODIFY bursts are coalesced per handler (insertion-ordered,
+        # one entry per path) and applied once the batch is parsed
+        modified: Dict[PhotoFileHandler, Dict[str, None]] = {}
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(buffer):
+            wd, mask, _, length = _INOTIFY_EVENT.unpack_from(buffer, offset)
+            name_start = offset + _INOTIFY_EVENT.size
+            name = buffer[name_start:name_start + length].rstrip(b"\0")
+            offset = name_start + length
+            
+            if mask & InotifyConstants.IN_Q_OVERFLOW:
+                logger.warning("inotify queue overflowed, events were lost")
+                continue
             
-            del self.observers[folder_path]
-            del self.handlers[folder_path]
+            with self._watch_lock:
+                if mask & InotifyConstants.IN_IGNORED:
+                    # Watch removed (directory deleted or unwatched)
+                    self._watches.pop(wd, None)
+                    continue
+                watch = self._watches.get(wd)
+            if watch is None:
+                continue
+            
+            directory, handler = watch
+            path = os.path.join(directory, os.fsdecode(name))
             
-            logger.info(f"Stopped monitoring: {folder_path}")
+            if mask & InotifyConstants.IN_ISDIR:
+                if mask & (InotifyConstants.IN_CREATE | InotifyConstants.IN_MOVED_TO):
+                    self._watch_new_directory(path, handler)
+            elif handler.folder_config.debounce_writes:
+                if mask & InotifyConstants.IN_MODIFY:
+                    modified.setdefault(handler, {})[path] = None
+                else:
+                    handler._handle_file_event(path)
+            elif mask & (InotifyConstants.IN_CLOSE_WRITE | InotifyConstants.IN_MOVED_TO):
+                handler.handle_completed(path)
+            # Plain IN_CREATE of a file: IN_CLOSE_WRITE follows once written
+        
+        for handler, paths in modified.items():
+            handler._handle_modified_batch(paths)
     
     def start(self):
         """Start monitoring all configured folders."""
@@ -207,12 +590,31 @@ class FolderWatcher:
             logger.warning("FolderWatcher already running")
             return
         
-        # Start all observers
+        self._executor = ThreadPoolExecutor(
+            max_workers=min(32, (os.cpu_count() or 1) * 2),
+            thread_name_prefix="folder-watcher-callback"
+        )
+        
+        # Start the inotify reader and any fallback observers
+        if self._inotify_fd is not None:
+            self._inotify_thread = threading.Thread(
+                target=self._inotify_loop,
+                name="folder-watcher-inotify",
+                daemon=True
+            )
+            self._inotify_thread.start()
+        
         for folder_path, observer in self.observers.items():
             observer.start()
             logger.info(f"Started monitoring: {folder_path}")
         
         self._running = True
+        self._debounce_thread = threading.Thread(
+            target=self._debounce_loop,
+            name="folder-watcher-debounce",
+            daemon=True
+        )
+        self._debounce_thread.start()
         logger.info("FolderWatcher started")
     
     def stop(self):
@@ -229,17 +631,78 @@ class FolderWatcher:
         for observer in self.observers.values():
             observer.join(timeout=5)
         
+        if self._inotify_thread:
+            os.eventfd_write(self._shutdown_fd, 1)
+            self._inotify_thread.join(timeout=5)
+            self._inotify_thread = None
+        
         self._running = False
+        self._wake.set()
+        if self._debounce_thread:
+            self._debounce_thread.join(timeout=5)
+            self._debounce_thread = None
+        
+        # Let already-detected photos reach the callback
+        executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
         logger.info("FolderWatcher stopped")
     
+    def _submit(self, fn: Callable[..., None], *args):
+        """Run a handler callback on the pool (inline when not started)."""
+        executor = self._executor
+        if executor is None:
+            fn(*args)
+            return
+        try:
+            executor.submit(fn, *args)
+        except RuntimeError:
+            # Pool shut down concurrently by stop()
+            fn(*args)
+    
+    def _schedule_wakeup(self, deadline: float):
+        """Wake the debounce thread if a deadline is earlier than its target."""
+        if deadline < self._next_wake:
+            self._wake.set()
+    
+    def _debounce_loop(self):
+        """
+        Release debounced files exactly when they are due.
+        
+        _next_wake is held at inf while handlers are scanned, so any event
+        arriving mid-scan sets the wakeup and the wait below returns at once.
+        """
+        logger.info("Debounce loop started")
+        
+        while self._running:
+            self._wake.clear()
+            self._next_wake = math.inf
+            next_wake = math.inf
+            try:
+                self.process_pending_files()
+                for handler in list(self.handlers.values()):
+                    deadline = handler.next_deadline()
+                    if deadline is not None and deadline < next_wake:
+                        next_wake = deadline
+            except Exception as e:
+                logger.error(f"Error in debounce loop: {e}")
+            
+            self._next_wake = next_wake
+            if next_wake == math.inf:
+                self._wake.wait()
+            else:
+                self._wake.wait(max(0.0, next_wake - time.monotonic()))
+        
+        logger.info("Debounce loop stopped")
+    
     def process_pending_files(self):
         """
         Process pending files across all handlers.
         
-        Should be called periodically (e.g., every second) to check for
-        stabilized files that are ready for processing.
+        Runs automatically on the debounce thread while the watcher is
+        started; may also be called directly to release due files.
         """
-        for handler in self.handlers.values():
+        for handler in list(self.handlers.values()):
             handler.process_pending()
     
     def is_running(self) -> bool:
@@ -248,7 +711,7 @@ class FolderWatcher:
     
     def get_monitored_folders(self) -> Set[str]:
         """Get set of currently monitored folder paths."""
-        return set(self.observers.keys())
+        return set(self.handlers.keys())
 
 
 class NextcloudUserDetector:
@@ -266,12 +729,14 @@ class NextcloudUserDetector:
             nextcloud_data_path: Path to Nextcloud data directory
         """
         self.nextcloud_data_path = Path(nextcloud_data_path)
+        # Plain string for os.path/os.scandir on the per-user paths
+        self._data_dir = os.fspath(self.nextcloud_data_path)
         logger.info(f"NextcloudUserDetector initialized for: {nextcloud_data_path}")
     
     def detect_users(
         self,
-        include_list: Optional[list] = None,
-        exclude_list: Optional[list] = None
+        include_list: Optional[Iterable[str]] = None,
+        exclude_list: Optional[Iterable[str]] = None
     ) -> Set[str]:
         """
         Detect Nextcloud users in the data directory.
@@ -283,41 +748,83 @@ class NextcloudUserDetector:
         Returns:
             Set of detected usernames
         """
-        if not self.nextcloud_data_path.exists():
-            logger.error(f"Nextcloud data path does not exist: {self.nextcloud_data_path}")
-            return set()
+        detected_users = {
+            username
+            for username, _ in self._scan_users(include_list, exclude_list, self._files_dir)
+        }
         
-        detected_users = set()
+        logger.info(f"Detected {len(detected_users)} Nextcloud users")
+        return detected_users
+    
+    def _scan_users(
+        self,
+        include_list: Optional[Iterable[str]],
+        exclude_list: Optional[Iterable[str]],
+        probe: Callable[[str], Optional[str]]
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        Scan the data directory once for user directories.
         
-        # Scan for user directories
-        for item in self.nextcloud_data_path.iterdir():
-            if not item.is_dir():
-                continue
-            
-            # Skip system directories
-            if item.name in ['__groupfolders', 'appdata_', 'files_external', '.ocdata']:
-                continue
+        Args:
+            include_list: If provided, only include these users (whitelist)
+            exclude_list: List of users to exclude (blacklist)
+            probe: Maps a user directory to the path to report, or None to
+                skip the directory
             
-            # Check if it looks like a user directory (has 'files' subdirectory)
-            files_dir = item / 'files'
-            if files_dir.exists() and files_dir.is_dir():
-                username = item.name
+        Yields:
+            (username, probed path) for each accepted user
+        """
+        if not os.path.exists(self._data_dir):
+            logger.error(f"Nextcloud data path does not exist: {self._data_dir}")
+            return
+        
+        # Sets make the per-user filter checks O(1); empty means no filter
+        include_set = frozenset(include_list) if include_list is not None else frozenset()
+        exclude_set = frozenset(exclude_list) if exclude_list is not None else frozenset()
+        
+        # Scan for user directories (DirEntry caches the type from readdir)
+        with os.scandir(self._data_dir) as entries:
+            for entry in entries:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                
+                # Skip system directories
+                if entry.name in _NC_SYSTEM_DIRS or entry.name.startswith('appdata_'):
+                    continue
+                
+                found = probe(entry.path)
+                if found is None:
+                    continue
+                
+                username = entry.name
                 
                 # Apply include list filter (whitelist)
-                if include_list and username not in include_list:
-                    logger.debug(f"Skipping user (not in include list): {username}")
+                if include_set and username not in include_set:
+                    logger.debug("Skipping user (not in include list): %s", username)
                     continue
                 
                 # Apply exclude list filter (blacklist)
-                if exclude_list and username in exclude_list:
-                    logger.debug(f"Skipping user (in exclude list): {username}")
+                if exclude_set and username in exclude_set:
+                    logger.debug("Skipping user (in exclude list): %s", username)
                     continue
                 
-                detected_users.add(username)
                 logger.info(f"Detected Nextcloud user: {username}")
-        
-        logger.info(f"Detected {len(detected_users)} Nextcloud users")
-        return detected_users
+                yield username, found
+    
+    @staticmethod
+    def _files_dir(user_dir: str) -> Optional[str]:
+        """Return a user's 'files' directory if it exists (marks a user directory)."""
+        files_dir = os.path.join(user_dir, 'files')
+        return files_dir if os.path.isdir(files_dir) else None
+    
+    @staticmethod
+    def _photos_dir(user_dir: str) -> Optional[str]:
+        """Return a user's Photos directory ('Photos', then 'photos') if it exists."""
+        for name in ('Photos', 'photos'):
+            photos_dir = os.path.join(user_dir, 'files', name)
+            if os.path.isdir(photos_dir):
+                return photos_dir
+        return None
     
     def get_user_photos_path(self, username: str) -> Optional[Path]:
         """
@@ -329,23 +836,17 @@ class NextcloudUserDetector:
         Returns:
             Path to user's Photos directory, or None if it doesn't exist
         """
-        photos_path = self.nextcloud_data_path / username / 'files' / 'Photos'
+        photos_dir = self._photos_dir(os.path.join(self._data_dir, username))
+        if photos_dir is not None:
+            return Path(photos_dir)
         
-        if photos_path.exists() and photos_path.is_dir():
-            return photos_path
-        
-        # Try 'photos' (lowercase) as fallback
-        photos_path = self.nextcloud_data_path / username / 'files' / 'photos'
-        if photos_path.exists() and photos_path.is_dir():
-            return photos_path
-        
-        logger.debug(f"No Photos directory found for user: {username}")
+        logger.debug("No Photos directory found for user: %s", username)
         return None
     
     def get_all_user_photos_paths(
         self,
-        include_list: Optional[list] = None,
-        exclude_list: Optional[list] = None
+        include_list: Optional[Iterable[str]] = None,
+        exclude_list: Optional[Iterable[str]] = None
     ) -> Dict[str, Path]:
         """
         Get photos paths for all detected users.
@@ -357,12 +858,13 @@ class NextcloudUserDetector:
         Returns:
             Dictionary mapping username to photos path
         """
-        users = self.detect_users(include_list, exclude_list)
-        user_paths = {}
-        
-        for username in users:
-            photos_path = self.get_user_photos_path(username)
-            if photos_path:
-                user_paths[username] = photos_path
-        
+        # One pass over the data directory; users without Photos are skipped
+        user_paths = {
+            username: Path(photos_dir)
+            for username, photos_dir in self._scan_users(
+                include_list, exclude_list, self._photos_dir
+            )
+        }
+        
+        logger.info(f"Found Photos directories for {len(user_paths)} Nextcloud users")
         return user_paths
@@ -7,6 +7,10 @@ Author: Next_Prism Project
 License: MIT
 """
 
+import hashlib
+from functools import lru_cache
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
@@ -30,15 +34,19 @@ class TaskScheduler:
     - Persistence across restarts
     """
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, async_mode: bool = False):
         """
         Initialize task scheduler.
         
         Args:
             config: Configuration object
+            async_mode: Schedule on the running asyncio event loop instead of
+                a dedicated background thread. start() must then be called
+                from within the loop (e.g. an ASGI startup handler).
         """
         self.config = config
-        self.scheduler = BackgroundScheduler(
+        scheduler_class = AsyncIOScheduler if async_mode else BackgroundScheduler
+        self.scheduler = scheduler_class(
             timezone='UTC',
             job_defaults={
                 'coalesce': True,  # Combine missed executions
@@ -86,20 +94,9 @@ class TaskScheduler:
             return
         
         try:
-            # Parse cron expression
-            # Format: "minute hour day month day_of_week"
-            parts = cron_expr.split()
-            
-            if len(parts) == 5:
-                trigger = CronTrigger(
-                    minute=parts[0],
-                    hour=parts[1],
-                    day=parts[2],
-                    month=parts[3],
-                    day_of_week=parts[4],
-                    timezone='UTC'
-                )
-            else:
+            try:
+                trigger = self._make_trigger(cron_expr)
+            except ValueError:
                 logger.error(f"Invalid cron expression: {cron_expr}")
                 return
             
@@ -125,22 +122,13 @@ class TaskScheduler:
             schedule: Cron expression
         """
         try:
-            parts = schedule.split()
-            
-            if len(parts) == 5:
-                trigger = CronTrigger(
-                    minute=parts[0],
-                    hour=parts[1],
-                    day=parts[2],
-                    month=parts[3],
-                    day_of_week=parts[4],
-                    timezone='UTC'
-                )
-            else:
+            try:
+                trigger = self._make_trigger(schedule)
+            except ValueError:
                 logger.error(f"Invalid cron expression: {schedule}")
                 return
             
-            job_id = f"scan_{hash(folder_path)}"
+            job_id = self._job_id(folder_path)
             
             self.scheduler.add_job(
                 func=lambda: self._execute_folder_scan(folder_path),
@@ -162,7 +150,7 @@ class TaskScheduler:
         Args:
             folder_path: Folder path
         """
-        job_id = f"scan_{hash(folder_path)}"
+        job_id = self._job_id(folder_path)
         
         try:
             self.scheduler.remove_job(job_id)
@@ -170,6 +158,34 @@ class TaskScheduler:
         except Exception as e:
             logger.warning(f"Could not remove job {job_id}: {e}")
     
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _make_trigger(cron_expr: str) -> CronTrigger:
+        """
+        Build a UTC cron trigger, cached per expression.
+        
+        Triggers are immutable, so jobs sharing a schedule (most folders use
+        the default) share one instance.
+        
+        Args:
+            cron_expr: Format "minute hour day month day_of_week"
+            
+        Raises:
+            ValueError: Invalid cron expression
+        """
+        return CronTrigger.from_crontab(cron_expr, timezone='UTC')
+    
+    @staticmethod
+    def _job_id(folder_path: str) -> str:
+        """
+        Get the scan job ID for a folder.
+        
+        Uses a digest rather than hash(), which is randomized per interpreter
+        start, so the ID stays the same across restarts.
+        """
+        digest = hashlib.blake2b(folder_path.encode("utf-8"), digest_size=8)
+        return "scan_" + digest.hexdigest()
+    
     def add_periodic_cleanup_job(self, interval_hours: int = 24):
         """
         Add periodic cleanup job for cache and old logs.
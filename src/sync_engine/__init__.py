@@ -7,7 +7,7 @@ Author: Next_Prism Project
 License: MIT
 """
 
-from .deduplicator import Deduplicator, DuplicateCheckResult
+from .deduplicator import Deduplicator, DuplicateCheckResult, HashAlgorithm
 from .file_mover import FileMover, MoveResult
 
-__all__ = ['Deduplicator', 'DuplicateCheckResult', 'FileMover', 'MoveResult']
+__all__ = ['Deduplicator', 'DuplicateCheckResult', 'HashAlgorithm', 'FileMover', 'MoveResult']
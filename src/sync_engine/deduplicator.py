@@ -9,17 +9,143 @@ License: MIT
 """
 
 import hashlib
+import math
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Optional, Dict, Tuple
+from typing import Any, Callable, Optional, Dict, Iterator, List, Tuple
 from dataclasses import dataclass
-import json
+from enum import Enum
+import sqlite3
 import time
 
 from ..utils.logger import get_logger
 
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
 logger = get_logger(__name__)
 
+# First bytes of every SQLite 3 database file
+_SQLITE_HEADER = b'SQLite format 3\x00'
+
+# Page-cache hints for one-pass reads (Linux/BSD; absent on macOS/Windows)
+_HAS_FADVISE = hasattr(os, 'posix_fadvise')
+
+
+def _fadvise(fd: int, advice: int):
+    """Give the kernel an access-pattern hint for a whole file; best effort."""
+    try:
+        os.posix_fadvise(fd, 0, 0, advice)
+    except OSError:
+        pass
+
+
+def _read_head(f, limit: int) -> bytes:
+    """
+    Read up to limit bytes from the start of an unbuffered file.
+    
+    A raw read may return fewer bytes than asked for before EOF (NFS, SMB
+    and FUSE mounts do), so this loops; otherwise one file could get
+    different prefix keys on different reads.
+    """
+    chunks = []
+    while limit > 0 and (chunk := f.read(limit)):
+        chunks.append(chunk)
+        limit -= len(chunk)
+    return b"".join(chunks)
+
+
+def _walk_files(root: str) -> Iterator[Tuple[str, os.stat_result]]:
+    """
+    Yield (path, stat) for every regular file below root.
+    
+    Uses os.scandir with an explicit stack: file types come from the cached
+    directory entries, so only regular files are stat()ed. Symlinks are not
+    followed and unreadable directories are skipped.
+    """
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry.path, entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+
+
+class _BloomFilter:
+    """
+    Bloom filter over string keys, backed by a bytearray.
+    
+    Never gives false negatives; false positives occur at about error_rate
+    while no more than capacity keys have been added.
+    """
+    
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """
+        Size the filter.
+        
+        Args:
+            capacity: Expected number of keys
+            error_rate: Target false-positive rate
+        """
+        capacity = max(capacity, 1)
+        self._num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._num_hashes = max(1, round(self._num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self._num_bits + 7) // 8)
+    
+    def _positions(self, key: str) -> Iterator[int]:
+        # Double hashing: k bit positions from one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self._num_hashes):
+            yield (h1 + i * h2) % self._num_bits
+    
+    def add(self, key: str):
+        """Add a key."""
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+    
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class _HashIndex(dict):
+    """
+    Hash -> paths index that may carry a pre-filter of its files' prefix keys.
+    
+    The pre-filter lets check_duplicate_fast() rule a file out without
+    hashing all of it. It only ever says "definitely absent" for files whose
+    size and leading bytes match no indexed file.
+    """
+    prefilter: Optional[_BloomFilter] = None
+
+
+class HashAlgorithm(str, Enum):
+    """Content hash algorithms for duplicate detection."""
+    SHA256 = "sha256"
+    BLAKE3 = "blake3"  # Faster, multithreaded; needs the blake3 package
+
 
 @dataclass
 class DuplicateCheckResult:
@@ -30,71 +156,337 @@ class DuplicateCheckResult:
     match_type: Optional[str] = None  # 'filename', 'hash', or None
 
 
+class _HashCache:
+    """
+    Persistent (path, algorithm) -> hash cache backed by SQLite.
+    
+    Each lookup and update is a single indexed statement, so nothing is
+    loaded or rewritten as a whole. Without a file the cache lives in memory.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS file_hashes (
+            path TEXT NOT NULL,
+            algo TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            inode INTEGER NOT NULL,
+            PRIMARY KEY (path, algo)
+        );
+        CREATE INDEX IF NOT EXISTS file_hashes_mtime ON file_hashes (mtime_ns);
+    """
+    
+    def __init__(self, cache_file: Optional[str] = None):
+        """
+        Open (or create) the cache.
+        
+        Args:
+            cache_file: SQLite database path, or None for an in-memory cache
+        """
+        self._lock = threading.Lock()  # Hashing may run on worker threads
+        self._conn = self._connect(cache_file)
+    
+    def _connect(self, cache_file: Optional[str]) -> sqlite3.Connection:
+        """Connect to the cache database, falling back to memory on error."""
+        if cache_file:
+            try:
+                directory = os.path.dirname(cache_file)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._move_aside_legacy(cache_file)
+                conn = sqlite3.connect(
+                    cache_file, isolation_level=None, check_same_thread=False
+                )
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(self.SCHEMA)
+                return conn
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Could not open hash cache {cache_file}, using memory: {e}")
+        
+        conn = sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False)
+        conn.executescript(self.SCHEMA)
+        return conn
+    
+    @staticmethod
+    def _move_aside_legacy(cache_file: str):
+        """
+        Rename a cache file that is not an SQLite database out of the way.
+        
+        Older versions stored the cache as JSON at the same path; SQLite
+        can't open it, which would leave the cache in memory on every
+        start. Its entries hold only a float mtime, not enough to validate
+        them, so they are not migrated: files are re-hashed on first use.
+        """
+        try:
+            with open(cache_file, 'rb') as f:
+                header = f.read(len(_SQLITE_HEADER))
+        except FileNotFoundError:
+            return
+        if header and header != _SQLITE_HEADER:
+            legacy_file = cache_file + '.legacy'
+            os.replace(cache_file, legacy_file)
+            logger.warning(f"Hash cache {cache_file} is not a database (old JSON format?), "
+                           f"moved it to {legacy_file}")
+    
+    def get(self, path: str, algo: str) -> Optional[Tuple[str, int, int, int]]:
+        """Return (hash, size, mtime_ns, inode) for a path and algorithm, if cached."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT hash, size, mtime_ns, inode FROM file_hashes "
+                "WHERE path = ? AND algo = ?",
+                (path, algo)
+            ).fetchone()
+    
+    def put(
+        self,
+        path: str,
+        algo: str,
+        hash_value: str,
+        size: int,
+        mtime_ns: int,
+        inode: int
+    ):
+        """Insert or replace a path's entry for one algorithm."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?, ?, ?)",
+                (path, algo, hash_value, size, mtime_ns, inode)
+            )
+    
+    def paths(self) -> List[str]:
+        """Return all cached paths."""
+        with self._lock:
+            return [
+                row[0] for row in self._conn.execute("SELECT DISTINCT path FROM file_hashes")
+            ]
+    
+    def delete(self, paths: List[str]):
+        """Remove all entries for the given paths."""
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM file_hashes WHERE path = ?", ((path,) for path in paths)
+            )
+    
+    def delete_older_than(self, mtime_ns: int) -> int:
+        """Remove entries whose file mtime is before mtime_ns; returns the count."""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM file_hashes WHERE mtime_ns < ?", (mtime_ns,)
+            ).rowcount
+    
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._conn.execute("DELETE FROM file_hashes")
+    
+    def checkpoint(self):
+        """Fold the write-ahead log into the database file."""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM file_hashes").fetchone()[0]
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
 class Deduplicator:
     """
     File deduplication system using hash comparison.
     
     Features:
-    - SHA256 hash calculation for accuracy
+    - SHA256 (or BLAKE3) hash calculation for accuracy
     - Filename matching for quick checks
     - Hash cache for performance
     - EXIF metadata comparison (optional, future enhancement)
     """
     
-    HASH_ALGORITHM = 'sha256'
-    CHUNK_SIZE = 65536  # 64KB chunks for hashing
+    HASH_ALGORITHM = HashAlgorithm.SHA256  # Default content hash
+    FAST_HASH_ALGORITHM = 'xxh3_64'  # Pre-filter only, when xxhash is installed
+    PREFIX_KEY_ALGORITHM = 'blake2b-prefix'  # Size + first PREFIX_SIZE bytes
+    PREFIX_SIZE = 65536
+    CHUNK_SIZE = 1 << 20  # 1 MiB read buffer for hashing
     
-    def __init__(self, cache_file: Optional[str] = None):
+    def __init__(
+        self,
+        cache_file: Optional[str] = None,
+        hash_algorithm: HashAlgorithm = HASH_ALGORITHM
+    ):
         """
         Initialize deduplicator.
         
         Args:
-            cache_file: Path to hash cache file (JSON)
+            cache_file: Path to hash cache file (SQLite); in-memory if omitted
+            hash_algorithm: Content hash to use. Cache entries are tagged
+                with their algorithm, so switching never reuses stale hashes.
         """
         self.cache_file = cache_file
-        self._hash_cache: Dict[str, Tuple[str, float]] = {}  # path -> (hash, mtime)
+        self._hash_cache = _HashCache(cache_file)
         
-        if cache_file and os.path.exists(cache_file):
-            self._load_cache()
+        self.hash_algorithm = HashAlgorithm(hash_algorithm)
+        if self.hash_algorithm == HashAlgorithm.BLAKE3 and not BLAKE3_AVAILABLE:
+            logger.warning("blake3 package not installed, using sha256")
+            self.hash_algorithm = HashAlgorithm.SHA256
         
         logger.info("Deduplicator initialized")
     
-    def calculate_hash(self, file_path: Path, use_cache: bool = True) -> str:
+    def calculate_hash(
+        self,
+        file_path: Path,
+        use_cache: bool = True,
+        stat_result: Optional[os.stat_result] = None
+    ) -> str:
         """
-        Calculate SHA256 hash of file.
+        Calculate the content hash (hash_algorithm) of file.
         
         Args:
             file_path: Path to file
             use_cache: Whether to use cached hash if available
+            stat_result: The file's current stat, if the caller already has
+                one (saves the stat() call)
         
         Returns:
             Hex string of file hash
         """
-        file_str = str(file_path)
+        return self._hash_file(
+            file_path, self.hash_algorithm.value, self._content_digest(), use_cache,
+            stat_result=stat_result
+        )
+    
+    def _content_digest(self):
+        """Return the hashlib name or hash constructor for hash_algorithm."""
+        if self.hash_algorithm == HashAlgorithm.BLAKE3:
+            # blake3 hashes large updates across threads
+            return partial(blake3.blake3, max_threads=blake3.blake3.AUTO)
+        return self.hash_algorithm.value
+    
+    def new_hasher(self):
+        """
+        Create an empty hash object for the content hash algorithm.
         
-        # Check cache if enabled
-        if use_cache and file_str in self._hash_cache:
-            cached_hash, cached_mtime = self._hash_cache[file_str]
-            current_mtime = os.path.getmtime(file_str)
-            
-            # Use cached hash if file hasn't been modified
-            if abs(current_mtime - cached_mtime) < 1.0:  # 1 second tolerance
-                logger.debug(f"Using cached hash for {file_path.name}")
-                return cached_hash
+        Returns:
+            Object with update() and hexdigest(), matching calculate_hash()
+        """
+        if self.hash_algorithm == HashAlgorithm.BLAKE3:
+            return blake3.blake3()
+        return hashlib.new(self.hash_algorithm.value, usedforsecurity=False)
+    
+    def fast_hash(
+        self,
+        file_path: Path,
+        use_cache: bool = True,
+        stat_result: Optional[os.stat_result] = None
+    ) -> str:
+        """
+        Calculate a fast non-cryptographic hash of file (xxh3_64).
+        
+        Only suitable for ruling files out: equal fast hashes must still be
+        confirmed with calculate_hash(). Without the xxhash package this is
+        the full hash.
+        
+        Args:
+            file_path: Path to file
+            use_cache: Whether to use cached hash if available
+            stat_result: The file's current stat, if already known
+        
+        Returns:
+            Hex string of file hash
+        """
+        if not XXHASH_AVAILABLE:
+            return self.calculate_hash(file_path, use_cache, stat_result)
+        return self._hash_file(
+            file_path, self.FAST_HASH_ALGORITHM, xxhash.xxh3_64, use_cache,
+            stat_result=stat_result
+        )
+    
+    def prefix_key(
+        self,
+        file_path: Path,
+        use_cache: bool = True,
+        stat_result: Optional[os.stat_result] = None
+    ) -> str:
+        """
+        Calculate a cheap key from a file's size and first PREFIX_SIZE bytes.
+        
+        Files with different keys can't be identical; equal keys say nothing.
+        
+        Args:
+            file_path: Path to file
+            use_cache: Whether to use cached key if available
+            stat_result: The file's current stat, if already known
         
-        # Calculate hash
-        logger.debug(f"Calculating {self.HASH_ALGORITHM} hash for {file_path.name}")
-        hasher = hashlib.new(self.HASH_ALGORITHM)
+        Returns:
+            Hex string key
+        """
+        return self._hash_file(
+            file_path, self.PREFIX_KEY_ALGORITHM, 'blake2b', use_cache,
+            limit=self.PREFIX_SIZE, stat_result=stat_result
+        )
+    
+    def _hash_file(
+        self,
+        file_path: Path,
+        algo: str,
+        digest,
+        use_cache: bool,
+        limit: Optional[int] = None,
+        stat_result: Optional[os.stat_result] = None
+    ) -> str:
+        """
+        Hash a file, going through the cache.
+        
+        Args:
+            file_path: Path to file
+            algo: Algorithm name, used as the cache tag
+            digest: hashlib algorithm name or hash constructor
+            use_cache: Whether to use cached hash if available
+            limit: Hash only the file size and this many leading bytes
+            stat_result: The file's current stat; taken here if not given
+        
+        Returns:
+            Hex string of file hash
+        """
+        file_str = str(file_path)
         
         try:
-            with open(file_path, 'rb') as f:
-                while chunk := f.read(self.CHUNK_SIZE):
-                    hasher.update(chunk)
+            # One stat both validates the cache entry and keys the new one
+            st = stat_result if stat_result is not None else os.stat(file_str)
+            file_key = (st.st_size, st.st_mtime_ns, st.st_ino)
+            
+            # Check cache if enabled (exact match, so sub-second rewrites and
+            # atomic replaces invalidate it)
+            cached = self._hash_cache.get(file_str, algo) if use_cache else None
+            if cached is not None and tuple(cached[1:]) == file_key:
+                logger.debug(f"Using cached hash for {file_path.name}")
+                return cached[0]
+            
+            # Calculate hash
+            logger.debug(f"Calculating {algo} hash for {file_path.name}")
             
-            hash_value = hasher.hexdigest()
+            # Unbuffered: reads go straight from the fd into the hash buffer.
+            # The file is read once, so ask for aggressive read-ahead and
+            # drop its pages afterwards rather than evicting useful ones.
+            with open(file_path, 'rb', buffering=0) as f:
+                if _HAS_FADVISE:
+                    _fadvise(f.fileno(), os.POSIX_FADV_SEQUENTIAL)
+                if limit is None:
+                    hash_value = self._digest_file(f, digest).hexdigest()
+                else:
+                    hasher = hashlib.new(digest, usedforsecurity=False)
+                    hasher.update(st.st_size.to_bytes(8, 'little'))
+                    hasher.update(_read_head(f, limit))
+                    hash_value = hasher.hexdigest()
+                if _HAS_FADVISE:
+                    _fadvise(f.fileno(), os.POSIX_FADV_DONTNEED)
             
             # Update cache
-            self._hash_cache[file_str] = (hash_value, os.path.getmtime(file_str))
+            self._hash_cache.put(file_str, algo, hash_value, *file_key)
             
             return hash_value
             
@@ -102,21 +494,118 @@ class Deduplicator:
             logger.error(f"Error calculating hash for {file_path}: {e}")
             raise
     
+    def _hash_with_prefix_key(
+        self,
+        file_path: Path,
+        stat_result: os.stat_result
+    ) -> Tuple[str, str]:
+        """
+        Calculate a file's content hash and prefix key in one read.
+        
+        Equivalent to calculate_hash() plus prefix_key(), but the leading
+        bytes feed both hashes, so they aren't read from disk again after
+        the full pass has dropped the file from the page cache. A cached
+        value for either one is reused as usual.
+        
+        Args:
+            file_path: Path to file
+            stat_result: The file's current stat
+        
+        Returns:
+            (content hash, prefix key)
+        """
+        file_str = str(file_path)
+        file_key = (stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino)
+        algo = self.hash_algorithm.value
+        
+        # With one of the two cached, the other costs a single read anyway
+        cached = self._hash_cache.get(file_str, algo)
+        if cached is not None and tuple(cached[1:]) == file_key:
+            return cached[0], self.prefix_key(file_path, stat_result=stat_result)
+        cached = self._hash_cache.get(file_str, self.PREFIX_KEY_ALGORITHM)
+        if cached is not None and tuple(cached[1:]) == file_key:
+            return self.calculate_hash(file_path, stat_result=stat_result), cached[0]
+        
+        logger.debug(f"Calculating {algo} hash and prefix key for {file_path.name}")
+        digest = self._content_digest()
+        if isinstance(digest, str):
+            hasher = hashlib.new(digest, usedforsecurity=False)
+        else:
+            hasher = digest()
+        prefix_hasher = hashlib.new('blake2b', usedforsecurity=False)
+        prefix_hasher.update(stat_result.st_size.to_bytes(8, 'little'))
+        
+        with open(file_path, 'rb', buffering=0) as f:
+            if _HAS_FADVISE:
+                _fadvise(f.fileno(), os.POSIX_FADV_SEQUENTIAL)
+            head = _read_head(f, self.PREFIX_SIZE)
+            prefix_hasher.update(head)
+            hasher.update(head)
+            hash_value = self._digest_file(f, lambda: hasher).hexdigest()
+            if _HAS_FADVISE:
+                _fadvise(f.fileno(), os.POSIX_FADV_DONTNEED)
+        
+        prefix_value = prefix_hasher.hexdigest()
+        self._hash_cache.put(file_str, algo, hash_value, *file_key)
+        self._hash_cache.put(file_str, self.PREFIX_KEY_ALGORITHM, prefix_value, *file_key)
+        return hash_value, prefix_value
+    
+    def _digest_file(self, f, digest=None):
+        """
+        Hash an open binary file from its current position to EOF.
+        
+        Uses hashlib.file_digest (Python 3.11+), which reads into one
+        reusable buffer and feeds OpenSSL with the GIL released. Older
+        versions use the equivalent readinto loop. Like every hasher here,
+        named algorithms are created with usedforsecurity=False, so
+        FIPS-mode OpenSSL builds allow them for integrity checks.
+        
+        Args:
+            f: File object opened in binary read mode
+            digest: hashlib algorithm name or hash constructor
+                (default: HASH_ALGORITHM)
+        
+        Returns:
+            Hash object
+        """
+        if digest is None:
+            digest = self.HASH_ALGORITHM.value
+        
+        if isinstance(digest, str):
+            digest = partial(hashlib.new, digest, usedforsecurity=False)
+        
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, digest)
+        
+        hasher = digest()
+        buf = bytearray(self.CHUNK_SIZE)
+        view = memoryview(buf)
+        while size := f.readinto(buf):
+            hasher.update(view[:size])
+        return hasher
+    
     def check_duplicate(
         self,
         file_path: Path,
         search_directories: list[Path],
         check_filename: bool = True,
-        check_hash: bool = True
+        check_hash: bool = True,
+        hash_index: Optional[Dict[str, List[Path]]] = None
     ) -> DuplicateCheckResult:
         """
         Check if file is a duplicate of any file in search directories.
         
+        Callers checking many files should build the index of the search
+        directories once with build_directory_hash_index() and pass it in;
+        the hash check is then one hash and one lookup instead of hashing
+        every file in the search directories.
+        
         Args:
             file_path: Path to file to check
             search_directories: List of directories to search for duplicates
             check_filename: Whether to check for filename matches
             check_hash: Whether to check for hash matches
+            hash_index: Pre-built hash index covering search_directories
         
         Returns:
             DuplicateCheckResult with duplicate status
@@ -136,25 +625,47 @@ class Deduplicator:
                     )
         
         # Thorough check: hash comparison
+        if check_hash and hash_index is not None:
+            return self.check_duplicate_fast(file_path, hash_index)
+        
         if check_hash:
             try:
-                file_hash = self.calculate_hash(file_path)
+                file_stat = os.stat(file_path)
+                file_size = file_stat.st_size
+                file_hash = self.calculate_hash(file_path, stat_result=file_stat)
+                file_fast_hash = None  # Computed at the first same-size candidate
                 
                 # Search for matching hash in all directories
                 for search_dir in search_directories:
                     if not search_dir.exists():
                         continue
                     
-                    for existing_file in search_dir.rglob('*'):
-                        if not existing_file.is_file():
+                    for existing_path, existing_stat in _walk_files(str(search_dir)):
+                        # Files of another size can't match, so skip them
+                        # before building a Path or hashing anything
+                        if existing_stat.st_size != file_size:
                             continue
                         
+                        existing_file = Path(existing_path)
                         if existing_file == file_path:
                             continue
                         
-                        # Calculate hash of potential duplicate
+                        # Calculate hash of potential duplicate, ruling it
+                        # out with the fast hash before SHA256
                         try:
-                            existing_hash = self.calculate_hash(existing_file)
+                            if XXHASH_AVAILABLE:
+                                if file_fast_hash is None:
+                                    file_fast_hash = self.fast_hash(
+                                        file_path, stat_result=file_stat
+                                    )
+                                if self.fast_hash(
+                                    existing_file, stat_result=existing_stat
+                                ) != file_fast_hash:
+                                    continue
+                            
+                            existing_hash = self.calculate_hash(
+                                existing_file, stat_result=existing_stat
+                            )
                             
                             if existing_hash == file_hash:
                                 logger.info(f"Duplicate detected (hash): {filename} matches {existing_file}")
@@ -182,7 +693,7 @@ class Deduplicator:
         # No checks performed or no duplicates found
         return DuplicateCheckResult(is_duplicate=False)
     
-    def build_directory_hash_index(self, directory: Path) -> Dict[str, Path]:
+    def build_directory_hash_index(self, directory: Path) -> Dict[str, List[Path]]:
         """
         Build hash index of all files in directory for faster duplicate checking.
         
@@ -190,43 +701,155 @@ class Deduplicator:
             directory: Directory to index
         
         Returns:
-            Dictionary mapping hash -> file path
+            Dictionary mapping hash -> all file paths with that content
         """
         logger.info(f"Building hash index for {directory}")
-        hash_index = {}
+        hash_index = _HashIndex()
         
         if not directory.exists():
             logger.warning(f"Directory does not exist: {directory}")
             return hash_index
         
-        file_count = 0
-        for file_path in directory.rglob('*'):
-            if not file_path.is_file():
-                continue
-            
+        # Reuse the walk's stat results so each file is stat'ed only once.
+        # Each file's prefix key comes from the same read as its hash, so
+        # every indexed file is in the pre-filter.
+        file_stats = {Path(path): st for path, st in _walk_files(str(directory))}
+        file_paths = list(file_stats)
+        hashes = self._hash_files_parallel(
+            file_paths,
+            lambda path: self._hash_with_prefix_key(path, file_stats[path])
+        )
+        
+        hash_index.prefilter = _BloomFilter(len(hashes))
+        for file_path in file_paths:
+            hashed = hashes.get(file_path)
+            if hashed is not None:
+                file_hash, prefix = hashed
+                hash_index.setdefault(file_hash, []).append(file_path)
+                hash_index.prefilter.add(prefix)
+        
+        logger.info(f"Indexed {len(hashes)} files in {directory}")
+        return hash_index
+    
+    def add_to_index(self, hash_index: Dict[str, List[Path]], file_path: Path) -> Optional[str]:
+        """
+        Add a new or modified file to an index built by build_directory_hash_index().
+        
+        Keeps a long-lived index current from file events instead of
+        rebuilding it; only the changed file is hashed.
+        
+        Args:
+            hash_index: Index to update in place
+            file_path: File that was created or modified
+        
+        Returns:
+            The file's hash, or None if it could not be hashed
+        """
+        # A modified file may be indexed under its previous hash
+        self.remove_from_index(hash_index, file_path)
+        
+        try:
+            file_hash = self.calculate_hash(file_path)
+            prefilter = getattr(hash_index, 'prefilter', None)
+            if prefilter is not None:
+                prefilter.add(self.prefix_key(file_path))
+        except Exception as e:
+            logger.warning(f"Error indexing {file_path}: {e}")
+            return None
+        
+        hash_index.setdefault(file_hash, []).append(file_path)
+        return file_hash
+    
+    def remove_from_index(self, hash_index: Dict[str, List[Path]], file_path: Path) -> bool:
+        """
+        Remove a deleted (or about to be re-hashed) file from an index.
+        
+        The hash cache is tried first, so deleted files are usually found
+        without a scan. It may already hold the file's new hash (if it was
+        re-hashed since indexing), so a miss falls back to scanning the index.
+        The pre-filter can't forget keys; stale keys only cost a full hash.
+        
+        Args:
+            hash_index: Index to update in place
+            file_path: File that was deleted or modified
+        
+        Returns:
+            True if the file was in the index
+        """
+        cached = self._hash_cache.get(str(file_path), self.hash_algorithm.value)
+        if cached is not None and file_path in hash_index.get(cached[0], ()):
+            file_hash = cached[0]
+        else:
+            file_hash = next(
+                (h for h, paths in hash_index.items() if file_path in paths), None
+            )
+            if file_hash is None:
+                return False
+        
+        paths = hash_index[file_hash]
+        paths.remove(file_path)
+        if not paths:
+            del hash_index[file_hash]
+        return True
+    
+    def calculate_hashes_batch(
+        self,
+        file_paths: List[Path],
+        max_workers: Optional[int] = None
+    ) -> Dict[Path, str]:
+        """
+        Hash many files concurrently.
+        
+        hashlib releases the GIL while hashing, so worker threads run in
+        parallel up to the disk's read bandwidth. Files that cannot be
+        hashed are logged and left out of the result.
+        
+        Args:
+            file_paths: Files to hash
+            max_workers: Thread count (default: min(8, CPU count))
+        
+        Returns:
+            Dictionary mapping file path -> hash
+        """
+        return self._hash_files_parallel(file_paths, self.calculate_hash, max_workers)
+    
+    def _hash_files_parallel(
+        self,
+        file_paths: List[Path],
+        hash_func: Callable[[Path], Any],
+        max_workers: Optional[int] = None
+    ) -> Dict[Path, Any]:
+        """Map hash_func over files on a thread pool, dropping (and logging) failures."""
+        if max_workers is None:
+            max_workers = min(8, os.cpu_count() or 1)
+        
+        def try_hash(file_path: Path) -> Any:
             try:
-                file_hash = self.calculate_hash(file_path)
-                hash_index[file_hash] = file_path
-                file_count += 1
-                
-                if file_count % 100 == 0:
-                    logger.debug(f"Indexed {file_count} files...")
-                    
+                return hash_func(file_path)
             except Exception as e:
-                logger.warning(f"Error indexing {file_path}: {e}")
-                continue
+                logger.warning(f"Error hashing {file_path}: {e}")
+                return None
         
-        logger.info(f"Indexed {file_count} files in {directory}")
-        return hash_index
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            hashes = executor.map(try_hash, file_paths)
+            return {
+                file_path: file_hash
+                for file_path, file_hash in zip(file_paths, hashes)
+                if file_hash is not None
+            }
     
     def check_duplicate_fast(
         self,
         file_path: Path,
-        hash_index: Dict[str, Path]
+        hash_index: Dict[str, List[Path]]
     ) -> DuplicateCheckResult:
         """
         Fast duplicate check using pre-built hash index.
         
+        With an index from build_directory_hash_index(), a file whose size
+        and leading bytes match no indexed file is reported as unique
+        without hashing the rest of it (hash_value is then None).
+        
         Args:
             file_path: File to check
             hash_index: Pre-built hash index from build_directory_hash_index()
@@ -235,18 +858,25 @@ class Deduplicator:
             DuplicateCheckResult
         """
         try:
+            prefilter = getattr(hash_index, 'prefilter', None)
+            if prefilter is not None and self.prefix_key(file_path) not in prefilter:
+                return DuplicateCheckResult(is_duplicate=False)
+            
             file_hash = self.calculate_hash(file_path)
             
-            if file_hash in hash_index:
-                existing_file = hash_index[file_hash]
-                if existing_file != file_path:
-                    logger.info(f"Duplicate detected: {file_path.name} matches {existing_file}")
-                    return DuplicateCheckResult(
-                        is_duplicate=True,
-                        existing_file=existing_file,
-                        hash_value=file_hash,
-                        match_type='hash'
-                    )
+            # Any indexed copy other than the file itself is a duplicate
+            existing_file = next(
+                (path for path in hash_index.get(file_hash, ()) if path != file_path),
+                None
+            )
+            if existing_file is not None:
+                logger.info(f"Duplicate detected: {file_path.name} matches {existing_file}")
+                return DuplicateCheckResult(
+                    is_duplicate=True,
+                    existing_file=existing_file,
+                    hash_value=file_hash,
+                    match_type='hash'
+                )
             
             return DuplicateCheckResult(
                 is_duplicate=False,
@@ -257,29 +887,18 @@ class Deduplicator:
             logger.error(f"Error during fast duplicate check: {e}")
             return DuplicateCheckResult(is_duplicate=False)
     
-    def _load_cache(self):
-        """Load hash cache from file."""
-        try:
-            with open(self.cache_file, 'r') as f:
-                data = json.load(f)
-                self._hash_cache = {
-                    path: (hash_val, mtime)
-                    for path, (hash_val, mtime) in data.items()
-                }
-            logger.info(f"Loaded hash cache with {len(self._hash_cache)} entries")
-        except Exception as e:
-            logger.warning(f"Could not load hash cache: {e}")
-            self._hash_cache = {}
-    
     def save_cache(self):
-        """Save hash cache to file."""
+        """
+        Flush the hash cache to its file.
+        
+        Entries are written as they are computed; this only checkpoints the
+        write-ahead log so the database file is self-contained.
+        """
         if not self.cache_file:
             return
         
         try:
-            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
-            with open(self.cache_file, 'w') as f:
-                json.dump(self._hash_cache, f)
+            self._hash_cache.checkpoint()
             logger.info(f"Saved hash cache with {len(self._hash_cache)} entries")
         except Exception as e:
             logger.error(f"Error saving hash cache: {e}")
@@ -296,16 +915,14 @@ class Deduplicator:
         Args:
             max_age_days: Remove entries older than this many days
         """
-        current_time = time.time()
-        max_age_seconds = max_age_days * 86400
+        cutoff_ns = time.time_ns() - max_age_days * 86400 * 10**9
         
-        paths_to_remove = []
-        for path, (_, mtime) in self._hash_cache.items():
-            # Remove if file doesn't exist or is too old
-            if not os.path.exists(path) or (current_time - mtime) > max_age_seconds:
-                paths_to_remove.append(path)
+        # Too old: one indexed delete
+        pruned = self._hash_cache.delete_older_than(cutoff_ns)
         
-        for path in paths_to_remove:
-            del self._hash_cache[path]
+        # Missing files still need a check per entry
+        missing = [path for path in self._hash_cache.paths() if not os.path.exists(path)]
+        self._hash_cache.delete(missing)
+        pruned += len(missing)
         
-        logger.info(f"Pruned {len(paths_to_remove)} entries from hash cache")
+        logger.info(f"Pruned {pruned} entries from hash cache")
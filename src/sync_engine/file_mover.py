@@ -8,8 +8,11 @@ Author: Next_Prism Project
 License: MIT
 """
 
+import errno
+import itertools
 import os
 import shutil
+from collections import deque
 from pathlib import Path
 from typing import Optional, Tuple
 from dataclasses import dataclass
@@ -17,6 +20,7 @@ from datetime import datetime
 import time
 
 from ..utils.logger import get_logger
+from ..utils.file_ops import copy_and_hash
 from ..config.schema import Config
 from .deduplicator import Deduplicator
 
@@ -33,6 +37,7 @@ class MoveResult:
     error_message: Optional[str] = None
     was_archived: bool = False
     was_renamed: bool = False
+    verified: bool = False
 
 
 class FileMover:
@@ -58,14 +63,15 @@ class FileMover:
         """
         self.config = config
         self.deduplicator = deduplicator or Deduplicator()
-        self._move_log = []
+        self._move_log = deque(maxlen=1000)  # Keeps the last 1000 entries
         
         logger.info("FileMover initialized")
     
     def move_to_photoprism(
         self,
         source_file: Path,
-        verify_hash: bool = True
+        verify_hash: bool = True,
+        source_hash: Optional[str] = None
     ) -> MoveResult:
         """
         Move file from Nextcloud to PhotoPrism import directory.
@@ -73,6 +79,8 @@ class FileMover:
         Args:
             source_file: Source file path
             verify_hash: Whether to verify hash after move
+            source_hash: Source hash if already known (e.g. the hash_value of
+                a DuplicateCheckResult), saving a read of the source
         
         Returns:
             MoveResult with operation details
@@ -105,14 +113,7 @@ class FileMover:
                 error_message="Insufficient disk space at destination"
             )
         
-        # Calculate source hash before move
-        source_hash = None
-        if verify_hash:
-            try:
-                source_hash = self.deduplicator.calculate_hash(source_file)
-                logger.debug(f"Source hash: {source_hash}")
-            except Exception as e:
-                logger.warning(f"Could not calculate source hash: {e}")
+        copy_mode = self.config.photoprism.import_mode == "copy"
         
         # Perform move
         try:
@@ -121,32 +122,57 @@ class FileMover:
             # Ensure destination directory exists
             destination_file.parent.mkdir(parents=True, exist_ok=True)
             
-            # Move file
-            if self.config.photoprism.import_mode == "copy":
-                shutil.copy2(source_file, destination_file)
+            # Move file. A rename or a complete in-kernel copy moves the
+            # bytes without userspace buffers, so there is nothing to verify.
+            verified_by_kernel = False
+            if copy_mode and verify_hash:
+                verified_by_kernel = self._copy_file_range(source_file, destination_file)
+                if verified_by_kernel:
+                    logger.debug(f"Copied file to {destination_file} in kernel")
+                else:
+                    # The copy hashes the source as read, saving a separate
+                    # read of it; the destination is still re-read below
+                    copied_hash = self._copy_and_hash(source_file, destination_file)
+                    if source_hash is None:
+                        source_hash = copied_hash
+                    logger.debug(f"Copied file to {destination_file} (hash: {copied_hash})")
+            elif copy_mode:
+                self._copy_file(source_file, destination_file)
                 logger.debug(f"Copied file to {destination_file}")
             else:
-                shutil.move(str(source_file), str(destination_file))
+                verified_by_kernel = self._try_rename(source_file, destination_file)
+                if not verified_by_kernel:
+                    # Cross-filesystem: shutil.move copies, so hash the
+                    # source first to verify the copy
+                    if verify_hash and source_hash is None:
+                        try:
+                            source_hash = self.deduplicator.calculate_hash(source_file)
+                            logger.debug(f"Source hash: {source_hash}")
+                        except Exception as e:
+                            logger.warning(f"Could not calculate source hash: {e}")
+                    shutil.move(str(source_file), str(destination_file))
                 logger.debug(f"Moved file to {destination_file}")
             
             # Verify hash after move
-            if verify_hash and source_hash:
-                dest_hash = self.deduplicator.calculate_hash(destination_file)
+            verified = verified_by_kernel
+            if verify_hash and source_hash and not verified_by_kernel:
+                dest_hash = self.deduplicator.calculate_hash(destination_file, use_cache=False)
                 if dest_hash != source_hash:
                     logger.error(f"Hash mismatch after move! Source: {source_hash}, Dest: {dest_hash}")
                     # Attempt rollback
-                    self._rollback_move(source_file, destination_file, copy_mode=(self.config.photoprism.import_mode == "copy"))
+                    self._rollback_move(source_file, destination_file, copy_mode=copy_mode)
                     return MoveResult(
                         success=False,
                         source_path=source_file,
                         error_message="Hash verification failed after move"
                     )
+                verified = True
                 logger.debug("Hash verification passed")
             
             # Archive original if in copy mode and archive enabled
             archive_path = None
             was_archived = False
-            if self.config.photoprism.import_mode == "copy" and self.config.monitoring.archive_mode:
+            if copy_mode and self.config.monitoring.archive_mode:
                 archive_result = self._archive_original(source_file)
                 if archive_result:
                     archive_path = archive_result
@@ -161,7 +187,8 @@ class FileMover:
                 destination_path=destination_file,
                 archive_path=archive_path,
                 was_archived=was_archived,
-                was_renamed=was_renamed
+                was_renamed=was_renamed,
+                verified=verified
             )
             
         except Exception as e:
@@ -172,6 +199,101 @@ class FileMover:
                 error_message=str(e)
             )
     
+    def _try_rename(self, source_file: Path, destination_file: Path) -> bool:
+        """
+        Move a file with a single rename if both paths are on one filesystem.
+        
+        Returns:
+            True if renamed, False if the paths are on different filesystems
+        
+        Raises:
+            OSError: The rename failed for another reason
+        """
+        try:
+            os.rename(source_file, destination_file)
+            return True
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            return False
+    
+    def _copy_file(self, source_file: Path, destination_file: Path):
+        """
+        Copy file data in the kernel, keeping the source timestamps.
+        
+        On the same filesystem copy_file_range lets the kernel clone or copy
+        the data without a userspace round-trip (a reflink on btrfs/XFS);
+        otherwise shutil.copyfile uses sendfile where available. Unlike
+        shutil.copy2, permission bits and extended attributes are not copied.
+        
+        Args:
+            source_file: File to copy
+            destination_file: New file to create
+        """
+        if not self._copy_file_range(source_file, destination_file):
+            st = os.stat(source_file)
+            shutil.copyfile(source_file, destination_file)
+            os.utime(destination_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+    
+    def _copy_file_range(self, source_file: Path, destination_file: Path) -> bool:
+        """
+        Copy a whole file with copy_file_range, keeping the source timestamps.
+        
+        Only attempted when both paths are on one filesystem. The data never
+        passes through userspace, so a copy that reaches the full source size
+        is byte-identical and needs no hash verification.
+        
+        Args:
+            source_file: File to copy
+            destination_file: New file to create
+        
+        Returns:
+            True if the whole file was copied, False if the caller must copy
+            it another way (the destination may then hold partial data)
+        """
+        if not hasattr(os, 'copy_file_range'):
+            return False
+        
+        st = os.stat(source_file)
+        if st.st_dev != os.stat(destination_file.parent).st_dev:
+            return False
+        
+        try:
+            with open(source_file, 'rb') as fsrc, open(destination_file, 'wb') as fdst:
+                remaining = st.st_size
+                while remaining > 0:
+                    count = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if count == 0:
+                        return False  # Source shrank under us
+                    remaining -= count
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL):
+                raise
+            logger.debug(f"copy_file_range unavailable, falling back: {e}")
+            return False
+        
+        os.utime(destination_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+        return True
+    
+    def _copy_and_hash(self, source_file: Path, destination_file: Path) -> str:
+        """
+        Copy a file with copy_and_hash(), keeping the source timestamps.
+        
+        Args:
+            source_file: File to copy
+            destination_file: New file to create
+        
+        Returns:
+            Hex digest of the source data as read (deduplicator's algorithm)
+        """
+        st = os.stat(source_file)
+        hash_value = copy_and_hash(
+            source_file, destination_file,
+            self.deduplicator.new_hasher(), self.deduplicator.CHUNK_SIZE
+        )
+        os.utime(destination_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+        return hash_value
+    
     def _check_disk_space(self, source_file: Path, destination_dir: Path) -> bool:
         """
         Check if destination has sufficient disk space.
@@ -286,6 +408,12 @@ class FileMover:
             copy_mode: Whether operation was in copy mode
         """
         try:
+            # In move mode the destination is the only copy; put it back
+            if not copy_mode and not source_path.exists() and dest_path.exists():
+                logger.info(f"Rolling back: restoring {source_path}")
+                shutil.move(str(dest_path), str(source_path))
+                return
+            
             if dest_path.exists():
                 logger.info(f"Rolling back: removing {dest_path}")
                 dest_path.unlink()
@@ -307,10 +435,6 @@ class FileMover:
             'mode': self.config.photoprism.import_mode
         }
         self._move_log.append(log_entry)
-        
-        # Keep last 1000 entries
-        if len(self._move_log) > 1000:
-            self._move_log = self._move_log[-1000:]
     
     def get_move_history(self, limit: int = 100) -> list:
         """
@@ -322,7 +446,8 @@ class FileMover:
         Returns:
             List of move log entries
         """
-        return self._move_log[-limit:]
+        start = max(0, len(self._move_log) - limit)
+        return list(itertools.islice(self._move_log, start, None))
     
     def clear_move_history(self):
         """Clear move history log."""
@@ -8,11 +8,15 @@ Author: Next_Prism Project
 License: MIT
 """
 
+import errno
 import os
 import shutil
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime
 
 from .logger import get_logger
@@ -20,14 +24,49 @@ from .logger import get_logger
 logger = get_logger(__name__)
 
 
-def calculate_file_hash(file_path: str, algorithm: str = "sha256", chunk_size: int = 8192) -> str:
+def _cpu_has_sha_ni() -> bool:
+    """Check /proc/cpuinfo for the x86 SHA extensions (Linux only)."""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    return 'sha_ni' in line.split()
+    except OSError:
+        pass
+    return False
+
+
+# OpenSSL (hashlib's backend) uses the SHA extensions when the CPU has them,
+# making SHA-256 several times faster than MD5 or SHA-1
+_HAS_SHA_NI = _cpu_has_sha_ni()
+# Per destination directory: the names claimed by moves still in progress,
+# so concurrent moves never pick the same destination path. A directory's
+# entry is removed when its last claim is released.
+_dest_claims: Dict[str, Set[str]] = {}
+_dest_claims_lock = threading.Lock()
+
+logger.debug(
+    "sha256 hashing via "
+    f"{'OpenSSL' if hashlib.sha256.__name__.startswith('openssl_') else 'builtin code'}, "
+    f"SHA extensions {'available' if _HAS_SHA_NI else 'not detected'}"
+)
+
+
+def calculate_file_hash(file_path: str, algorithm: str = "sha256", chunk_size: int = 262144) -> str:
     """
     Calculate hash of a file.
     
+    On Python 3.11+ the file is streamed through hashlib.file_digest, which
+    reads into one reusable buffer and hashes with the GIL released. Hashes
+    are created with usedforsecurity=False, so FIPS-mode OpenSSL builds
+    still allow md5/sha1 for integrity checks. Prefer the sha256 default:
+    it is hardware accelerated on CPUs with SHA extensions.
+    
     Args:
         file_path: Path to the file
         algorithm: Hash algorithm (md5, sha1, sha256, etc.)
-        chunk_size: Size of chunks to read (bytes)
+        chunk_size: Size of chunks to read (bytes) on older Pythons;
+            hashlib releases the GIL for updates of 2048 bytes or more
         
     Returns:
         Hexadecimal hash string
@@ -39,11 +78,22 @@ def calculate_file_hash(file_path: str, algorithm: str = "sha256", chunk_size: i
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
     
+    if hasattr(hashlib, 'file_digest'):
+        with open(file_path, 'rb') as f:
+            try:
+                return hashlib.file_digest(
+                    f, partial(hashlib.new, algorithm, usedforsecurity=False)
+                ).hexdigest()
+            except ValueError:
+                raise ValueError(f"Unsupported hash algorithm: {algorithm}")
+    
     try:
-        hash_func = hashlib.new(algorithm)
+        hash_func = hashlib.new(algorithm, usedforsecurity=False)
     except ValueError:
         raise ValueError(f"Unsupported hash algorithm: {algorithm}")
     
+    # No point allocating a buffer larger than the file
+    chunk_size = max(1, min(chunk_size, os.path.getsize(file_path)))
     with open(file_path, 'rb') as f:
         while chunk := f.read(chunk_size):
             hash_func.update(chunk)
@@ -85,41 +135,41 @@ def safe_move_file(
         # Create destination directory
         dest_dir.mkdir(parents=True, exist_ok=True)
         
-        # Determine destination path
-        dest_path = dest_dir / source_path.name
-        
-        # Handle collisions
-        if dest_path.exists():
-            if collision_strategy == "skip":
-                logger.info(f"Skipping existing file: {dest_path}")
-                return False, None, "File already exists (skipped)"
-            elif collision_strategy == "rename":
-                # Append timestamp to filename
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                stem = dest_path.stem
-                suffix = dest_path.suffix
-                dest_path = dest_dir / f"{stem}_{timestamp}{suffix}"
-                logger.info(f"Renaming to avoid collision: {dest_path.name}")
-            # For "overwrite", just proceed
-        
-        # Calculate source hash if verification enabled
-        source_hash = None
-        if verify_hash:
-            source_hash = calculate_file_hash(str(source_path))
-        
-        # Move the file
-        shutil.move(str(source_path), str(dest_path))
-        logger.debug(f"Moved: {source} -> {dest_path}")
-        
-        # Verify hash after move
-        if verify_hash and source_hash:
-            dest_hash = calculate_file_hash(str(dest_path))
-            if source_hash != dest_hash:
-                logger.error(f"Hash mismatch after move: {dest_path}")
-                # Attempt to restore (if possible)
-                return False, None, "File integrity check failed after move"
+        # Determine destination path, counting names claimed by concurrent
+        # moves into the same directory as taken
+        with _dest_claims_lock:
+            claimed = _dest_claims.get(str(dest_dir), frozenset())
+            dest_path = dest_dir / source_path.name
+            
+            # Handle collisions
+            if dest_path.exists() or dest_path.name in claimed:
+                if collision_strategy == "skip":
+                    logger.info(f"Skipping existing file: {dest_path}")
+                    return False, None, "File already exists (skipped)"
+                elif collision_strategy == "rename":
+                    # Append timestamp to filename
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    stem = dest_path.stem
+                    suffix = dest_path.suffix
+                    dest_path = dest_dir / f"{stem}_{timestamp}{suffix}"
+                    counter = 1
+                    while dest_path.exists() or dest_path.name in claimed:
+                        dest_path = dest_dir / f"{stem}_{timestamp}_{counter}{suffix}"
+                        counter += 1
+                    logger.info(f"Renaming to avoid collision: {dest_path.name}")
+                # For "overwrite", just proceed
+            
+            _dest_claims.setdefault(str(dest_dir), set()).add(dest_path.name)
         
-        return True, str(dest_path), None
+        try:
+            return _move_and_verify(source_path, dest_path, verify_hash)
+        finally:
+            with _dest_claims_lock:
+                claimed = _dest_claims.get(str(dest_dir))
+                if claimed is not None:
+                    claimed.discard(dest_path.name)
+                    if not claimed:
+                        del _dest_claims[str(dest_dir)]
         
     except PermissionError as e:
         logger.error(f"Permission error moving file: {e}")
@@ -132,6 +182,128 @@ def safe_move_file(
         return False, None, f"Unexpected error: {e}"
 
 
+def _move_and_verify(
+    source_path: Path,
+    dest_path: Path,
+    verify_hash: bool
+) -> Tuple[bool, Optional[str], Optional[str]]:
+    """Move source_path to dest_path, optionally checking its hash afterwards."""
+    # On one filesystem a rename moves no data, so there is nothing to verify
+    try:
+        os.rename(source_path, dest_path)
+        logger.debug(f"Renamed: {source_path} -> {dest_path}")
+        return True, str(dest_path), None
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    
+    if not verify_hash:
+        shutil.move(str(source_path), str(dest_path))
+        logger.debug(f"Moved: {source_path} -> {dest_path}")
+        return True, str(dest_path), None
+    
+    # Cross-filesystem: hash the source while copying it, then check the copy
+    # before the source is removed
+    source_hash = copy_and_hash(
+        source_path, dest_path, hashlib.new("sha256", usedforsecurity=False)
+    )
+    shutil.copystat(source_path, dest_path)
+    
+    dest_hash = calculate_file_hash(str(dest_path))
+    if source_hash != dest_hash:
+        logger.error(f"Hash mismatch after move: {dest_path}")
+        # The source is still intact; drop the bad copy
+        dest_path.unlink()
+        return False, None, "File integrity check failed after move"
+    
+    os.unlink(source_path)
+    logger.debug(f"Moved: {source_path} -> {dest_path}")
+    
+    return True, str(dest_path), None
+
+
+def copy_and_hash(source, destination, hasher, chunk_size: int = 262144) -> str:
+    """
+    Copy a file's data and hash it in the same pass.
+    
+    Each chunk is hashed and written from one buffer, so the source is read
+    once. The result is the hash of the source as read; it says nothing
+    about what reached the destination, so verify by re-reading that.
+    Metadata is not copied.
+    
+    Args:
+        source: File to copy
+        destination: File to create or overwrite
+        hasher: Empty hash object (anything with update() and hexdigest())
+        chunk_size: Size of chunks to read (bytes)
+        
+    Returns:
+        Hexadecimal hash string of the copied data
+    """
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    
+    with open(source, 'rb', buffering=0) as fsrc, open(destination, 'wb') as fdst:
+        while size := fsrc.readinto(buf):
+            chunk = view[:size]
+            hasher.update(chunk)
+            fdst.write(chunk)
+    
+    return hasher.hexdigest()
+
+
+def safe_move_files(
+    sources: List[str],
+    destination_dir: str,
+    verify_hash: bool = True,
+    collision_strategy: str = "rename",
+    max_workers: Optional[int] = None
+) -> List[Tuple[bool, Optional[str], Optional[str]]]:
+    """
+    Safely move many files to a destination directory concurrently.
+    
+    Each file goes through safe_move_file() on a thread pool; hashlib
+    releases the GIL while hashing, so verification of several files runs
+    in parallel. Files with the same name get distinct destinations.
+    
+    Args:
+        sources: Source file paths
+        destination_dir: Destination directory path
+        verify_hash: Verify file integrity after move
+        collision_strategy: How to handle filename collisions
+            (see safe_move_file)
+        max_workers: Thread count (default: CPU count)
+        
+    Returns:
+        List of (success, destination_path, error_message) tuples, in the
+        order of sources
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    
+    results: List[Tuple[bool, Optional[str], Optional[str]]] = [
+        (False, None, None)
+    ] * len(sources)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                safe_move_file, source, destination_dir, verify_hash, collision_strategy
+            ): i
+            for i, source in enumerate(sources)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if done % 100 == 0:
+                logger.debug(f"Moved {done}/{len(sources)} files...")
+    
+    logger.info(
+        f"Moved {sum(1 for success, _, _ in results if success)}/{len(sources)} "
+        f"files to {destination_dir}"
+    )
+    return results
+
+
 def archive_file(
     source: str,
     archive_base_path: str,
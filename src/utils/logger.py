@@ -9,11 +9,12 @@ License: MIT
 """
 
 import logging
+import shlex
 import sys
 from pathlib import Path
 from logging.handlers import RotatingFileHandler
 from pythonjsonlogger import jsonlogger
-from typing import Optional
+from typing import Optional, Sequence
 
 
 class ColoredFormatter(logging.Formatter):
@@ -134,3 +135,20 @@ def get_logger(name: str) -> logging.Logger:
         Logger instance
     """
     return logging.getLogger(f"next_prism.{name}")
+
+
+class LazyCommand:
+    """
+    Defer rendering of a command argument list until a log record is emitted.
+    
+    Pass as a %-style logging argument; the join only happens if the
+    record passes the logger's level check.
+    """
+    
+    __slots__ = ("command",)
+    
+    def __init__(self, command: Sequence[str]):
+        self.command = command
+    
+    def __str__(self) -> str:
+        return shlex.join(self.command)
@@ -106,8 +106,9 @@ async def startup_event():
         orchestrator = Orchestrator(config)
         orchestrator.initialize()
         
-        # Initialize scheduler
-        scheduler = TaskScheduler(config)
+        # Initialize scheduler on the server's event loop (uvloop when
+        # available, which uvicorn selects by default)
+        scheduler = TaskScheduler(config, async_mode=True)
         
         # Set callback to add files to queue for scanning
         def scan_callback(folder_path: Optional[str] = None):
@@ -7,14 +7,18 @@ Author: Next_Prism Project
 License: MIT
 """
 
+import errno
 import os
 import tempfile
 import pytest
 from pathlib import Path
+from unittest.mock import patch
 
+from src.utils import file_ops
 from src.utils.file_ops import (
     calculate_file_hash,
     safe_move_file,
+    safe_move_files,
     archive_file,
     is_image_file,
     get_file_size_mb,
@@ -50,6 +54,14 @@ class TestFileHashing:
         with pytest.raises(FileNotFoundError):
             calculate_file_hash("/nonexistent/file.txt")
     
+    def test_hash_unsupported_algorithm_raises_error(self, tmp_path):
+        """Test that an unknown algorithm raises ValueError."""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("test content")
+        
+        with pytest.raises(ValueError):
+            calculate_file_hash(str(test_file), algorithm="not-a-hash")
+    
     def test_hash_large_file(self, tmp_path):
         """Test hashing larger files with chunks."""
         test_file = tmp_path / "large.txt"
@@ -141,6 +153,97 @@ class TestSafeMoveFile:
         
         assert success is False
         assert "already exists" in error
+    
+    def test_cross_device_move_verifies_copy(self, tmp_path):
+        """Test the copy path taken when rename fails with EXDEV."""
+        source = tmp_path / "source.jpg"
+        source.write_bytes(os.urandom(300_000))
+        data = source.read_bytes()
+        os.utime(source, (1_000_000, 1_000_000))
+        
+        dest_dir = tmp_path / "destination"
+        
+        with patch("os.rename", side_effect=OSError(errno.EXDEV, "Cross-device link")):
+            success, dest_path, error = safe_move_file(str(source), str(dest_dir))
+        
+        assert success is True
+        assert error is None
+        assert Path(dest_path).read_bytes() == data
+        assert Path(dest_path).stat().st_mtime == 1_000_000
+        assert not source.exists()
+    
+    def test_cross_device_move_keeps_source_on_mismatch(self, tmp_path):
+        """Test a bad cross-device copy is removed and the source kept."""
+        source = tmp_path / "source.jpg"
+        source.write_bytes(b"photo data")
+        
+        dest_dir = tmp_path / "destination"
+        
+        with patch("os.rename", side_effect=OSError(errno.EXDEV, "Cross-device link")), \
+                patch("src.utils.file_ops.calculate_file_hash", return_value="bad"):
+            success, dest_path, error = safe_move_file(str(source), str(dest_dir))
+        
+        assert success is False
+        assert "integrity" in error
+        assert source.read_bytes() == b"photo data"
+        assert list(dest_dir.iterdir()) == []
+
+
+class TestSafeMoveFiles:
+    """Test suite for batch file moving."""
+    
+    def test_batch_move(self, tmp_path):
+        """Test moving several files, in order, with verification."""
+        sources = []
+        for i in range(5):
+            source = tmp_path / f"source{i}.txt"
+            source.write_text(f"content {i}")
+            sources.append(str(source))
+        
+        dest_dir = tmp_path / "destination"
+        
+        results = safe_move_files(sources, str(dest_dir), max_workers=4)
+        
+        assert len(results) == 5
+        for i, (success, dest_path, error) in enumerate(results):
+            assert success is True
+            assert error is None
+            assert Path(dest_path).read_text() == f"content {i}"
+    
+    def test_batch_same_name_gets_distinct_destinations(self, tmp_path):
+        """Test that concurrent moves of same-named files don't collide."""
+        sources = []
+        for i in range(8):
+            source = tmp_path / f"dir{i}" / "photo.jpg"
+            source.parent.mkdir()
+            source.write_text(f"content {i}")
+            sources.append(str(source))
+        
+        dest_dir = tmp_path / "destination"
+        
+        results = safe_move_files(sources, str(dest_dir), verify_hash=False, max_workers=8)
+        
+        dest_paths = [dest_path for _, dest_path, _ in results]
+        assert all(success for success, _, _ in results)
+        assert len(set(dest_paths)) == 8
+        assert sorted(Path(p).read_text() for p in dest_paths) == \
+            sorted(f"content {i}" for i in range(8))
+    
+    def test_destination_claims_released(self, tmp_path):
+        """Test claim bookkeeping is dropped once moves into a directory finish."""
+        dest_dir = str(tmp_path / "destination")
+        for name in ("first", "second"):
+            source = tmp_path / name / "photo.jpg"
+            source.parent.mkdir()
+            source.write_text(name)
+        
+        assert safe_move_file(str(tmp_path / "first" / "photo.jpg"), dest_dir)[0] is True
+        skipped = safe_move_file(
+            str(tmp_path / "second" / "photo.jpg"), dest_dir, collision_strategy="skip"
+        )
+        
+        assert skipped[0] is False
+        assert file_ops._dest_claims == {}
 
 
 class TestArchiveFile:
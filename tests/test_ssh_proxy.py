@@ -13,7 +13,9 @@ License: MIT
 
 import pytest
 import socket
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
 
@@ -21,6 +23,72 @@ from src.docker_interface.ssh_proxy import SSHProxyClient, SSHConnection
 from src.docker_interface.proxy_discovery import ProxyDiscovery, ProxyService
 
 
+class FakeChannel:
+    """Finished exec channel backed by a readable socket for select()."""
+    def __init__(self, command="", stdout=None, stderr=b"", exit_code=0):
+        self._reader, self._writer = socket.socketpair()
+        self._writer.send(b"x")
+        self._out = f"ran {command}".encode() if stdout is None else stdout
+        self._err = stderr
+        self.exit_status = exit_code
+        self.eof_received = True
+        self.command = None
+        self.closed = False
+    
+    def exec_command(self, command):
+        self.command = command
+    
+    def fileno(self):
+        return self._reader.fileno()
+    
+    def recv_ready(self):
+        return bool(self._out)
+    
+    def recv(self, size):
+        data, self._out = self._out, b""
+        return data
+    
+    def recv_stderr_ready(self):
+        return bool(self._err)
+    
+    def recv_stderr(self, size):
+        data, self._err = self._err, b""
+        return data
+    
+    def exit_status_ready(self):
+        return True
+    
+    def recv_exit_status(self):
+        return self.exit_status
+    
+    def close(self):
+        self._reader.close()
+        self._writer.close()
+        self.closed = True
+
+
+class LateOutputChannel(FakeChannel):
+    """Channel whose exit status arrives before its last output and EOF."""
+    def __init__(self, first=b"", stdout=b"", stderr=b"", delay=0.2):
+        super().__init__(stdout=first)
+        if not first:
+            self._reader.recv(1)  # Nothing to read until the output arrives
+        self.eof_received = False
+        self._timer = threading.Timer(delay, self._finish, args=(stdout, stderr))
+        self._timer.start()
+    
+    def _finish(self, stdout, stderr):
+        self._out += stdout
+        self._err = stderr
+        self.eof_received = True
+        if stdout:
+            self._writer.send(b"x")  # paramiko only signals stdout and EOF
+    
+    def close(self):
+        self._timer.cancel()
+        super().close()
+
+
 class TestSSHProxyClient:
     """Test SSH proxy client functionality."""
     
@@ -50,7 +118,8 @@ class TestSSHProxyClient:
         assert client.private_key_path == Path(temp_key_file)
         assert client.connection_timeout == 10
         assert client.max_connections == 3
-        assert len(client._pool) == 0
+        assert len(client._routes) == 0
+        assert client._private_key is not None  # Loaded eagerly
     
     def test_missing_key_file(self):
         """Test handling of missing private key file."""
@@ -59,15 +128,14 @@ class TestSSHProxyClient:
             # Trigger key loading
             client._load_private_key()
     
-    @patch('paramiko.SSHClient')
-    def test_connection_creation(self, mock_ssh_client, temp_key_file):
+    @patch('socket.create_connection')
+    @patch('paramiko.Transport')
+    def test_connection_creation(self, mock_transport_cls, mock_socket, temp_key_file):
         """Test SSH connection creation."""
         # Mock successful connection
-        mock_client_instance = MagicMock()
         mock_transport = MagicMock()
         mock_transport.is_active.return_value = True
-        mock_client_instance.get_transport.return_value = mock_transport
-        mock_ssh_client.return_value = mock_client_instance
+        mock_transport_cls.return_value = mock_transport
         
         client = SSHProxyClient(
             private_key_path=temp_key_file,
@@ -79,21 +147,25 @@ class TestSSHProxyClient:
         
         assert conn.host == "test-proxy"
         assert conn.port == 2222
-        assert conn.in_use is True
+        assert conn.transport is mock_transport
+        assert conn.in_use is False
         assert conn.error_count == 0
         
         # Verify connection was attempted
-        mock_client_instance.connect.assert_called_once()
+        mock_socket.assert_called_once_with(("test-proxy", 2222), timeout=5)
+        mock_transport.connect.assert_called_once_with(
+            username="proxyuser", pkey=client._private_key
+        )
+        mock_transport.set_keepalive.assert_called_once_with(30)
     
-    @patch('paramiko.SSHClient')
-    def test_connection_pooling(self, mock_ssh_client, temp_key_file):
+    @patch('socket.create_connection')
+    @patch('paramiko.Transport')
+    def test_connection_pooling(self, mock_transport_cls, mock_socket, temp_key_file):
         """Test connection pool management."""
-        # Mock SSH client
-        mock_client_instance = MagicMock()
+        # Mock SSH transport
         mock_transport = MagicMock()
         mock_transport.is_active.return_value = True
-        mock_client_instance.get_transport.return_value = mock_transport
-        mock_ssh_client.return_value = mock_client_instance
+        mock_transport_cls.return_value = mock_transport
         
         client = SSHProxyClient(
             private_key_path=temp_key_file,
@@ -102,35 +174,213 @@ class TestSSHProxyClient:
         
         # Get first connection
         conn1 = client._get_connection("test-proxy", 2222)
-        assert len(client._pool[("test-proxy", 2222)]) == 1
+        route = client._routes[("test-proxy", 2222)]
+        assert route.in_use == {conn1}
         
         # Release and get again - should reuse
         client._release_connection(conn1)
         conn2 = client._get_connection("test-proxy", 2222)
         assert conn1 is conn2
-        assert len(client._pool[("test-proxy", 2222)]) == 1
+        assert route.in_use == {conn1}
+        assert len(route.idle) == 0
+        mock_transport_cls.assert_called_once()
     
-    @patch('paramiko.SSHClient')
-    def test_command_execution(self, mock_ssh_client, temp_key_file):
-        """Test command execution through proxy."""
-        # Mock successful command execution
-        mock_client_instance = MagicMock()
+    def test_connection_sharing(self, temp_key_file):
+        """Test concurrent users share one transport up to max_sessions."""
+        client = SSHProxyClient(private_key_path=temp_key_file, max_sessions=2)
+        conn = SSHConnection(
+            transport=MagicMock(), host="test-proxy", port=2222,
+            last_used=time.monotonic()
+        )
+        
+        with patch.object(client, '_create_connection', return_value=conn) as create:
+            conn1 = client._get_connection("test-proxy", 2222)
+            conn2 = client._get_connection("test-proxy", 2222)
+            assert conn1 is conn2 is conn
+            assert conn.sessions == 2
+            assert create.call_count == 1
+        
+        client._release_connection(conn1)
+        client._release_connection(conn2)
+        route = client._routes[("test-proxy", 2222)]
+        assert conn.sessions == 0
+        assert list(route.idle) == [conn]
+        assert not route.in_use
+    
+    def test_pool_wait_for_release(self, temp_key_file):
+        """Test a full route hands over a released connection or times out."""
+        client = SSHProxyClient(
+            private_key_path=temp_key_file,
+            connection_timeout=2,
+            max_connections=1,
+            max_sessions=1
+        )
         mock_transport = MagicMock()
         mock_transport.is_active.return_value = True
-        mock_client_instance.get_transport.return_value = mock_transport
+        conn = SSHConnection(
+            transport=mock_transport, host="test-proxy", port=2222,
+            last_used=time.monotonic()
+        )
+        
+        with patch.object(client, '_create_connection', return_value=conn):
+            conn1 = client._get_connection("test-proxy", 2222)
+            threading.Timer(0.1, client._release_connection, args=(conn1,)).start()
+            conn2 = client._get_connection("test-proxy", 2222)
+            assert conn2 is conn1
+            
+            client.connection_timeout = 0.1
+            with pytest.raises(TimeoutError):
+                client._get_connection("test-proxy", 2222)
+    
+    def test_pool_stats(self, temp_key_file):
+        """Test pool stats follow acquire, release and cleanup."""
+        client = SSHProxyClient(
+            private_key_path=temp_key_file,
+            max_sessions=1,
+            connection_idle_timeout=60
+        )
+        conns = [
+            SSHConnection(transport=MagicMock(), host=host, port=2222,
+                          last_used=time.monotonic())
+            for host in ("nextcloud-proxy", "nextcloud-proxy", "photoprism-proxy")
+        ]
+        
+        with patch.object(client, '_create_connection', side_effect=conns):
+            for conn in conns:
+                client._get_connection(conn.host, 2222)
+        assert client.get_pool_stats() == {
+            "total_hosts": 2, "total_connections": 3,
+            "active_connections": 3, "idle_connections": 0
+        }
+        
+        for conn in conns:
+            client._release_connection(conn)
+        conns[2].last_used -= 120
+        client._cleanup_connections()
+        assert client.get_pool_stats() == {
+            "total_hosts": 1, "total_connections": 2,
+            "active_connections": 0, "idle_connections": 2
+        }
+    
+    def test_recent_connection_skips_probe(self, temp_key_file):
+        """Test only connections idle past the keepalive interval are probed."""
+        client = SSHProxyClient(private_key_path=temp_key_file)
+        mock_transport = MagicMock()
+        mock_transport.is_active.return_value = False
+        conn = SSHConnection(
+            transport=mock_transport, host="test-proxy", port=2222,
+            last_used=time.monotonic()
+        )
+        route = client._get_route(("test-proxy", 2222))
+        route.idle.append(conn)
+        route.size = 1
+        
+        assert client._get_connection("test-proxy", 2222) is conn
+        mock_transport.is_active.assert_not_called()
+        
+        client._release_connection(conn)
+        conn.last_used -= client.KEEPALIVE_INTERVAL
+        fresh = SSHConnection(
+            transport=MagicMock(), host="test-proxy", port=2222,
+            last_used=time.monotonic()
+        )
+        with patch.object(client, '_create_connection', return_value=fresh):
+            assert client._get_connection("test-proxy", 2222) is fresh
+        mock_transport.is_active.assert_called_once()
+        mock_transport.close.assert_called_once()
+    
+    def test_discard_shared_connection(self, temp_key_file):
+        """Test a discarded transport is closed only after its last user."""
+        client = SSHProxyClient(private_key_path=temp_key_file)
+        mock_transport = MagicMock()
+        conn = SSHConnection(
+            transport=mock_transport, host="test-proxy", port=2222,
+            last_used=time.monotonic()
+        )
+        
+        with patch.object(client, '_create_connection', return_value=conn):
+            conn1 = client._get_connection("test-proxy", 2222)
+            conn2 = client._get_connection("test-proxy", 2222)
+        
+        client._release_connection(conn1, discard=True)
+        mock_transport.close.assert_not_called()
+        assert client._routes[("test-proxy", 2222)].size == 0
         
-        # Mock exec_command return
-        mock_stdin = MagicMock()
-        mock_stdout = MagicMock()
-        mock_stderr = MagicMock()
-        mock_stdout.channel.recv_exit_status.return_value = 0
-        mock_stdout.read.return_value = b"Success output"
-        mock_stderr.read.return_value = b""
+        client._release_connection(conn2)
+        mock_transport.close.assert_called_once()
+        assert not client._routes[("test-proxy", 2222)].idle
+    
+    def test_execute_commands_batch(self, temp_key_file):
+        """Test a batch runs on parallel channels of one pooled connection."""
+        client = SSHProxyClient(private_key_path=temp_key_file, max_sessions=2)
         
-        mock_client_instance.exec_command.return_value = (
-            mock_stdin, mock_stdout, mock_stderr
+        commands = ["php occ status", "php occ user:list", "php occ app:list"]
+        pending = iter(commands)
+        mock_transport = MagicMock()
+        mock_transport.open_session.side_effect = (
+            lambda timeout=None: FakeChannel(next(pending))
+        )
+        conn = SSHConnection(
+            transport=mock_transport, host="test-proxy", port=2222,
+            last_used=time.monotonic()
         )
-        mock_ssh_client.return_value = mock_client_instance
+        
+        with patch.object(client, '_create_connection', return_value=conn):
+            results = client.execute_commands_batch("test-proxy", 2222, commands)
+        
+        assert results == [(True, f"ran {command}", "") for command in commands]
+        assert client._routes[("test-proxy", 2222)].idle[0] is conn
+        assert conn.sessions == 0
+    
+    def test_execute_many(self, temp_key_file):
+        """Test commands fan out across proxies and come back in order."""
+        client = SSHProxyClient(private_key_path=temp_key_file)
+        
+        def make_conn(host, port):
+            transport = MagicMock()
+            transport.open_session.side_effect = (
+                lambda timeout=None: FakeChannel(f"{host}")
+            )
+            return SSHConnection(transport=transport, host=host, port=port,
+                                 last_used=time.monotonic())
+        
+        def create(host, port):
+            if host == "down-proxy":
+                raise socket.timeout("timed out")
+            return make_conn(host, port)
+        
+        targets = [
+            ("nextcloud-proxy", 2222, "php occ status"),
+            ("down-proxy", 2222, "php occ status"),
+            ("photoprism-proxy", 2222, "photoprism index"),
+            ("nextcloud-proxy", 2222, "php occ user:list"),
+        ]
+        with patch.object(client, '_create_connection', side_effect=create):
+            results = client.execute_many(targets)
+        
+        assert results[0] == (True, "ran nextcloud-proxy", "")
+        assert results[1] == (False, "", "timed out")
+        assert results[2] == (True, "ran photoprism-proxy", "")
+        assert results[3] == (True, "ran nextcloud-proxy", "")
+        route = client._routes[("nextcloud-proxy", 2222)]
+        assert route.idle[0].sessions == 0 and not route.in_use
+    
+    @staticmethod
+    def _mock_transport(exit_code, stdout, stderr):
+        """Create a mock transport whose channels report the given result."""
+        mock_channel = FakeChannel(stdout=stdout, stderr=stderr, exit_code=exit_code)
+        mock_transport = MagicMock()
+        mock_transport.is_active.return_value = True
+        mock_transport.open_session.return_value = mock_channel
+        return mock_transport, mock_channel
+    
+    @patch('socket.create_connection')
+    @patch('paramiko.Transport')
+    def test_command_execution(self, mock_transport_cls, mock_socket, temp_key_file):
+        """Test command execution through proxy."""
+        # Mock successful command execution
+        mock_transport, mock_channel = self._mock_transport(0, b"Success output", b"")
+        mock_transport_cls.return_value = mock_transport
         
         client = SSHProxyClient(private_key_path=temp_key_file)
         
@@ -145,33 +395,17 @@ class TestSSHProxyClient:
         assert stdout == "Success output"
         assert stderr == ""
         
-        # Verify command was executed
-        mock_client_instance.exec_command.assert_called_with(
-            "php occ status",
-            timeout=300  # Default timeout
-        )
+        # Verify command was executed on its own channel
+        assert mock_channel.command == "php occ status"
+        assert mock_channel.closed
     
-    @patch('paramiko.SSHClient')
-    def test_command_failure(self, mock_ssh_client, temp_key_file):
+    @patch('socket.create_connection')
+    @patch('paramiko.Transport')
+    def test_command_failure(self, mock_transport_cls, mock_socket, temp_key_file):
         """Test handling of failed command execution."""
         # Mock failed command execution
-        mock_client_instance = MagicMock()
-        mock_transport = MagicMock()
-        mock_transport.is_active.return_value = True
-        mock_client_instance.get_transport.return_value = mock_transport
-        
-        # Mock exec_command return with failure
-        mock_stdin = MagicMock()
-        mock_stdout = MagicMock()
-        mock_stderr = MagicMock()
-        mock_stdout.channel.recv_exit_status.return_value = 1
-        mock_stdout.read.return_value = b""
-        mock_stderr.read.return_value = b"Command failed"
-        
-        mock_client_instance.exec_command.return_value = (
-            mock_stdin, mock_stdout, mock_stderr
-        )
-        mock_ssh_client.return_value = mock_client_instance
+        mock_transport, _ = self._mock_transport(1, b"", b"Command failed")
+        mock_transport_cls.return_value = mock_transport
         
         client = SSHProxyClient(private_key_path=temp_key_file)
         
@@ -185,6 +419,53 @@ class TestSSHProxyClient:
         assert success is False
         assert stderr == "Command failed"
     
+    def test_drain_waits_for_eof_after_exit_status(self):
+        """Test output sent after the exit status is not truncated."""
+        channel = LateOutputChannel(first=b"first, ", stdout=b"last lines")
+        try:
+            (success, out, err), = SSHProxyClient._drain_channels([channel], 5)
+        finally:
+            channel.close()
+        
+        assert success is True
+        assert out == "first, last lines"
+    
+    def test_drain_reads_stderr_only_output(self):
+        """Test a command writing only to stderr is drained without waiting out the timeout."""
+        channel = LateOutputChannel(stderr=b"warning: no photos", delay=0.1)
+        started = time.monotonic()
+        try:
+            (success, out, err), = SSHProxyClient._drain_channels([channel], 3)
+        finally:
+            channel.close()
+        
+        assert success is True
+        assert err == "warning: no photos"
+        assert time.monotonic() - started < 1
+    
+    @patch('time.sleep')
+    def test_command_retry(self, mock_sleep, temp_key_file):
+        """Test a failed attempt is retried with backoff on a fresh channel."""
+        import paramiko
+        mock_transport, _ = self._mock_transport(0, b"ok", b"")
+        open_session = mock_transport.open_session
+        mock_transport.open_session = MagicMock(side_effect=[
+            paramiko.SSHException("channel refused"), open_session.return_value
+        ])
+        conn = SSHConnection(
+            transport=mock_transport, host="test-proxy", port=2222,
+            last_used=time.monotonic()
+        )
+        client = SSHProxyClient(private_key_path=temp_key_file)
+        
+        with patch.object(client, '_create_connection', return_value=conn):
+            result = client.execute_command("test-proxy", 2222, "php occ status")
+        
+        assert result == (True, "ok", "")
+        mock_sleep.assert_called_once_with(2)
+        assert conn.error_count == 0
+        assert conn.sessions == 0
+    
     def test_connection_cleanup(self, temp_key_file):
         """Test cleanup of idle connections."""
         client = SSHProxyClient(
@@ -193,26 +474,47 @@ class TestSSHProxyClient:
         )
         
         # Create mock connection
-        mock_client = MagicMock()
         mock_transport = MagicMock()
         mock_transport.is_active.return_value = False  # Simulate dead connection
-        mock_client.get_transport.return_value = mock_transport
         
         conn = SSHConnection(
-            client=mock_client,
+            transport=mock_transport,
             host="test",
             port=2222,
-            last_used=time.time() - 10,  # 10 seconds ago
-            in_use=False
+            last_used=time.monotonic() - 10  # 10 seconds ago
         )
         
-        client._pool[("test", 2222)] = [conn]
+        client._get_route(("test", 2222)).idle.append(conn)
         
         # Clean up
         client._cleanup_connections()
         
         # Connection should be removed
-        assert ("test", 2222) not in client._pool
+        assert len(client._routes[("test", 2222)].idle) == 0
+        mock_transport.close.assert_called_once()
+    
+    def test_cleanup_keeps_lifo_order(self, temp_key_file):
+        """Test cleanup drops expired idle connections and keeps MRU order."""
+        client = SSHProxyClient(
+            private_key_path=temp_key_file,
+            connection_idle_timeout=60
+        )
+        now = time.monotonic()
+        route = client._get_route(("test", 2222))
+        for age in (120, 30, 10, 1):  # oldest released first
+            transport = MagicMock()
+            transport.is_active.return_value = True
+            route.idle.append(SSHConnection(
+                transport=transport, host="test", port=2222, last_used=now - age
+            ))
+        route.size = 4
+        newest = route.idle[-1]
+        
+        client._cleanup_connections(("test", 2222))
+        
+        assert [now - conn.last_used for conn in route.idle] == pytest.approx([30, 10, 1])
+        assert route.size == 3
+        assert client._get_connection("test", 2222) is newest
 
 
 class TestProxyDiscovery:
@@ -240,9 +542,11 @@ class TestProxyDiscovery:
     def test_discover_proxy(self, mock_docker_client):
         """Test proxy service discovery."""
         # Mock service discovery
-        mock_service = Mock()
-        mock_service.name = "nextcloud-proxy"
-        mock_docker_client.services.list.return_value = [mock_service]
+        mock_service = {
+            "ID": "abc123",
+            "Spec": {"Name": "nextcloud-proxy", "Labels": {"service": "nextcloud-proxy"}}
+        }
+        mock_docker_client.api.services.return_value = [mock_service]
         
         discovery = ProxyDiscovery(docker_client=mock_docker_client)
         
@@ -261,6 +565,87 @@ class TestProxyDiscovery:
         # Should be cached
         assert "nextcloud" in discovery._cache
     
+    def test_failed_refresh_evicts_cached_proxy(self, mock_docker_client):
+        """Test a forced refresh whose health check fails drops the cached entry."""
+        mock_docker_client.api.services.return_value = [{
+            "ID": "abc123",
+            "Spec": {"Name": "nextcloud-proxy", "Labels": {"service": "nextcloud-proxy"}}
+        }]
+        
+        discovery = ProxyDiscovery(docker_client=mock_docker_client)
+        
+        with patch.object(discovery, '_resolve_hostname', return_value="10.0.0.1"):
+            with patch.object(discovery, '_check_health', return_value=True):
+                assert discovery.discover_proxy("nextcloud") is not None
+            with patch.object(discovery, '_check_health', return_value=False):
+                assert discovery.discover_proxy("nextcloud", force_refresh=True) is None
+        
+        assert discovery.get_cached_proxy("nextcloud") is None
+    
+    def test_fetch_all_proxy_services(self, mock_docker_client):
+        """Test proxy services are listed once and grouped by type."""
+        services = [
+            {"ID": label, "Spec": {"Name": label, "Labels": {"service": label}}}
+            for label in ("nextcloud-proxy", "photoprism-proxy", "database")
+        ]
+        mock_docker_client.api.services.return_value = services
+        
+        discovery = ProxyDiscovery(docker_client=mock_docker_client)
+        grouped = discovery._fetch_all_proxy_services()
+        discovery._fetch_all_proxy_services()
+        
+        assert sorted(grouped) == ["nextcloud", "photoprism"]
+        assert grouped["photoprism"][0]["Spec"]["Name"] == "photoprism-proxy"
+        assert mock_docker_client.api.services.call_count == 1
+    
+    def test_list_all_proxy_services(self, mock_docker_client):
+        """Test replica counts come from a single batched tasks call."""
+        services = [
+            {
+                "ID": f"service{index}" + "0" * 16,
+                "Spec": {
+                    "Name": label,
+                    "Labels": {"service": label},
+                    "Mode": {"Replicated": {"Replicas": 1}}
+                }
+            }
+            for index, label in enumerate(("nextcloud-proxy", "photoprism-proxy"))
+        ]
+        mock_docker_client.api.services.return_value = services
+        mock_docker_client.api.tasks.return_value = [
+            {"ServiceID": services[0]["ID"], "Status": {"State": "running"}},
+            {"ServiceID": services[1]["ID"], "Status": None}
+        ]
+        
+        discovery = ProxyDiscovery(docker_client=mock_docker_client)
+        listed = {entry["type"]: entry for entry in discovery.list_all_proxy_services()}
+        
+        assert listed["nextcloud"]["replicas"] == "1/1"
+        assert listed["photoprism"]["replicas"] == "0/1"
+        assert mock_docker_client.api.tasks.call_count == 1
+    
+    def test_discover_all(self, mock_docker_client):
+        """Test concurrent discovery of multiple proxy types."""
+        discovery = ProxyDiscovery(docker_client=mock_docker_client)
+        
+        def fake_discover(service_type, force_refresh=False):
+            if service_type == "nextcloud":
+                return ProxyService(
+                    service_name="nextcloud-proxy",
+                    service_type="nextcloud",
+                    hostname="nextcloud-proxy",
+                    port=2222,
+                    is_healthy=True
+                )
+            return None
+        
+        with patch.object(discovery, 'discover_proxy', side_effect=fake_discover):
+            results = discovery.discover_all(["nextcloud", "photoprism"])
+        
+        assert set(results) == {"nextcloud", "photoprism"}
+        assert results["nextcloud"].service_name == "nextcloud-proxy"
+        assert results["photoprism"] is None
+    
     def test_cache_validity(self, mock_docker_client):
         """Test cache TTL and validation."""
         discovery = ProxyDiscovery(
@@ -274,7 +659,7 @@ class TestProxyDiscovery:
             service_type="nextcloud",
             hostname="test",
             port=2222,
-            last_check=time.time(),
+            last_check=time.monotonic(),
             is_healthy=True
         )
         discovery._cache["nextcloud"] = proxy
@@ -291,6 +676,60 @@ class TestProxyDiscovery:
         cached = discovery.get_cached_proxy("nextcloud")
         assert cached is None
     
+    def test_adaptive_ttl(self, mock_docker_client):
+        """Test successes lengthen the cache TTL up to the cap and errors reset it."""
+        discovery = ProxyDiscovery(
+            docker_client=mock_docker_client,
+            cache_ttl=10,
+            cache_ttl_max=40
+        )
+        proxy = ProxyService(
+            service_name="test-proxy",
+            service_type="nextcloud",
+            hostname="test",
+            port=2222,
+            last_check=time.monotonic()
+        )
+        discovery._cache["nextcloud"] = proxy
+        
+        for _ in range(5):
+            discovery.mark_proxy_success("nextcloud")
+        assert proxy.stable_hits == 2
+        assert discovery._effective_ttl(proxy) == 40
+        
+        # Aged past the base TTL but within the adaptive one
+        proxy.last_check = time.monotonic() - 30
+        assert discovery.get_cached_proxy("nextcloud") is proxy
+        
+        discovery.mark_proxy_error("nextcloud")
+        assert discovery._effective_ttl(proxy) == 10
+    
+    def test_cache_lru_bound(self, mock_docker_client):
+        """Test the proxy cache evicts least recently used entries."""
+        discovery = ProxyDiscovery(docker_client=mock_docker_client)
+        discovery.CACHE_MAXSIZE = 2
+        
+        for service_type in ("a", "b"):
+            discovery._cache_put(service_type, ProxyService(
+                service_name=f"{service_type}-proxy",
+                service_type=service_type,
+                hostname=f"{service_type}-proxy",
+                port=2222,
+                last_check=time.monotonic()
+            ))
+        
+        # Touch "a" so "b" becomes least recently used
+        assert discovery.get_cached_proxy("a") is not None
+        discovery._cache_put("c", ProxyService(
+            service_name="c-proxy",
+            service_type="c",
+            hostname="c-proxy",
+            port=2222,
+            last_check=time.monotonic()
+        ))
+        
+        assert list(discovery._cache) == ["a", "c"]
+    
     def test_error_counting(self, mock_docker_client):
         """Test proxy error tracking and removal."""
         discovery = ProxyDiscovery(
@@ -304,7 +743,7 @@ class TestProxyDiscovery:
             service_type="nextcloud",
             hostname="test",
             port=2222,
-            last_check=time.time(),
+            last_check=time.monotonic(),
             is_healthy=True
         )
         discovery._cache["nextcloud"] = proxy
@@ -323,6 +762,182 @@ class TestProxyDiscovery:
         cached = discovery.get_cached_proxy("nextcloud")
         assert cached is None
     
+    def test_refresh_all(self, mock_docker_client):
+        """Test cached proxies are re-checked and marked by result."""
+        discovery = ProxyDiscovery(docker_client=mock_docker_client)
+        for service_type in ("nextcloud", "photoprism"):
+            discovery._cache[service_type] = ProxyService(
+                service_name=f"{service_type}-proxy",
+                service_type=service_type,
+                hostname=f"{service_type}-proxy",
+                port=2222,
+                is_healthy=True
+            )
+        
+        with patch.object(
+            discovery, '_check_health',
+            side_effect=lambda proxy: proxy.service_type == "nextcloud"
+        ):
+            results = discovery.refresh_all()
+        
+        assert results == {"nextcloud": True, "photoprism": False}
+        assert discovery._cache["nextcloud"].error_count == 0
+        assert discovery._cache["photoprism"].error_count == 1
+    
+    def test_background_refresh(self, mock_docker_client):
+        """Test the refresher re-discovers known proxies until closed."""
+        discovery = ProxyDiscovery(
+            docker_client=mock_docker_client,
+            cache_ttl=0.2,
+            background_refresh=True
+        )
+        
+        with patch.object(discovery, 'discover_all', return_value={}) as mock_discover:
+            time.sleep(0.35)
+            discovery.close()
+        
+        assert not discovery._refresher.is_alive()
+        mock_discover.assert_called_with(
+            ["nextcloud", "photoprism"], force_refresh=True
+        )
+    
+    def test_dns_cache(self, mock_docker_client):
+        """Test resolved hostnames are reused within the DNS TTL."""
+        discovery = ProxyDiscovery(docker_client=mock_docker_client, dns_ttl=60)
+        addrinfo = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.7", 0))]
+        
+        with patch('socket.getaddrinfo', return_value=addrinfo) as mock_resolve:
+            assert discovery._resolve_hostname("nextcloud-proxy") == "10.0.0.7"
+            assert discovery._resolve_hostname("nextcloud-proxy") == "10.0.0.7"
+        
+        assert mock_resolve.call_count == 1
+    
+    def test_resolve_ip_literal(self, mock_docker_client):
+        """Test IP literals skip DNS and malformed addresses are not taken as IPs."""
+        discovery = ProxyDiscovery(docker_client=mock_docker_client)
+        
+        with patch('socket.getaddrinfo', side_effect=socket.gaierror) as mock_resolve:
+            assert discovery._resolve_hostname("10.0.0.9") == "10.0.0.9"
+            assert discovery._resolve_hostname("fd00::9") == "fd00::9"
+            assert mock_resolve.call_count == 0
+            
+            assert discovery._resolve_hostname("1.2.3") is None
+            assert mock_resolve.call_count == 1
+    
+    def test_dns_single_flight(self, mock_docker_client):
+        """Test concurrent resolutions of one hostname share a single lookup."""
+        discovery = ProxyDiscovery(docker_client=mock_docker_client)
+        addrinfo = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.8", 0))]
+        
+        def slow_resolve(*args, **kwargs):
+            time.sleep(0.2)
+            return addrinfo
+        
+        with patch('socket.getaddrinfo', side_effect=slow_resolve) as mock_resolve:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                results = list(pool.map(
+                    lambda _: discovery._resolve_hostname("photoprism-proxy"),
+                    range(4)
+                ))
+        
+        assert results == ["10.0.0.8"] * 4
+        assert mock_resolve.call_count == 1
+    
+    def test_health_check_reuses_socket(self, mock_docker_client):
+        """Test a successful health check keeps its socket for the next check."""
+        discovery = ProxyDiscovery(docker_client=mock_docker_client)
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        
+        proxy = ProxyService(
+            service_name="test-proxy",
+            service_type="nextcloud",
+            hostname="localhost",
+            ip_address="127.0.0.1",
+            port=server.getsockname()[1]
+        )
+        
+        try:
+            assert discovery._check_health(proxy) is True
+            pooled = discovery._health_sockets["nextcloud"][1]
+            
+            assert discovery._check_health(proxy) is True
+            assert discovery._health_sockets["nextcloud"][1] is pooled
+            
+            discovery.invalidate_cache("nextcloud")
+            assert "nextcloud" not in discovery._health_sockets
+        finally:
+            server.close()
+    
+    def test_concurrent_health_checks_share_pool(self, mock_docker_client):
+        """Test concurrent checks of one proxy leave a single live pooled socket."""
+        discovery = ProxyDiscovery(docker_client=mock_docker_client)
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(16)
+        
+        proxy = ProxyService(
+            service_name="test-proxy",
+            service_type="nextcloud",
+            hostname="localhost",
+            ip_address="127.0.0.1",
+            port=server.getsockname()[1]
+        )
+        
+        try:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(lambda _: discovery._check_health(proxy), range(32)))
+            
+            assert all(results)
+            assert list(discovery._health_sockets) == ["nextcloud"]
+            assert discovery._socket_alive(discovery._health_sockets["nextcloud"][1])
+        finally:
+            discovery.invalidate_cache()
+            server.close()
+    
+    def test_pooled_socket_closed_by_server(self, mock_docker_client):
+        """Test a pooled socket is reported dead once the server closes it."""
+        discovery = ProxyDiscovery(docker_client=mock_docker_client)
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        
+        proxy = ProxyService(
+            service_name="test-proxy",
+            service_type="nextcloud",
+            hostname="localhost",
+            ip_address="127.0.0.1",
+            port=server.getsockname()[1]
+        )
+        
+        try:
+            assert discovery._check_health(proxy) is True
+            pooled = discovery._health_sockets["nextcloud"][1]
+            
+            conn, _ = server.accept()
+            conn.sendall(b"SSH-2.0-OpenSSH_9.6\r\n")
+            time.sleep(0.05)
+            assert discovery._socket_alive(pooled) is True
+            
+            conn.close()
+            server.close()
+            time.sleep(0.05)
+            assert discovery._socket_alive(pooled) is False
+        finally:
+            server.close()
+            discovery.invalidate_cache()
+    
+    def test_negative_cache(self, mock_docker_client):
+        """Test failed resolutions are not retried within neg_cache_ttl."""
+        discovery = ProxyDiscovery(docker_client=mock_docker_client, neg_cache_ttl=5)
+        
+        with patch('socket.getaddrinfo', side_effect=socket.gaierror) as mock_resolve:
+            assert discovery._resolve_hostname("missing-proxy") is None
+            assert discovery._resolve_hostname("missing-proxy") is None
+        
+        assert mock_resolve.call_count == 1
+    
     def test_health_check(self, mock_docker_client):
         """Test proxy health checking."""
         discovery = ProxyDiscovery(
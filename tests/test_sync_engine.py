@@ -8,11 +8,15 @@ Author: Next_Prism Project
 License: MIT
 """
 
+import errno
+import hashlib
+import io
+import json
 import os
 import tempfile
 import pytest
 from pathlib import Path
-from unittest.mock import Mock, MagicMock
+from unittest.mock import Mock, MagicMock, patch
 
 from src.core.sync_engine import (
     SyncEngine,
@@ -21,6 +25,8 @@ from src.core.sync_engine import (
     SyncResult
 )
 from src.config.schema import MonitoredFolder, FolderType
+from src.sync_engine import Deduplicator, HashAlgorithm, FileMover
+from src.sync_engine.deduplicator import _BloomFilter, _read_head
 
 
 class TestDeduplicationCache:
@@ -161,6 +167,31 @@ class TestSyncEngine:
         assert result2.is_duplicate is True
         assert sync_engine.stats["duplicates_skipped"] == 1
     
+    def test_sync_file_uses_watcher_stat(self, sync_engine, tmp_path):
+        """Test a stat result from the watcher is reused for size and existence."""
+        source = tmp_path / "source.jpg"
+        source.write_bytes(b"x" * 2048)
+        # Report a different size so the result shows which stat was used
+        fields = list(os.stat(source))
+        fields[6] = 4096
+        stat_result = os.stat_result(fields)
+        
+        folder_config = MonitoredFolder(
+            path=str(tmp_path),
+            type=FolderType.CUSTOM,
+            archive_moved=False
+        )
+        
+        result = sync_engine.sync_file(
+            file_path=str(source),
+            folder_config=folder_config,
+            skip_dedupe=True,
+            stat_result=stat_result
+        )
+        
+        assert result.status == SyncStatus.COMPLETED
+        assert result.file_size_mb == 4096 / (1024 * 1024)
+    
     def test_sync_nonexistent_file(self, sync_engine, tmp_path):
         """Test syncing non-existent file fails gracefully."""
         folder_config = MonitoredFolder(
@@ -177,5 +208,326 @@ class TestSyncEngine:
         assert "not found" in result.error_message.lower()
 
 
+class TestDeduplicator:
+    """Test suite for the hash-based deduplicator."""
+    
+    def test_calculate_hash_blake3(self, tmp_path):
+        """Test BLAKE3 hashing of a real file."""
+        blake3 = pytest.importorskip("blake3")
+        
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        test_file = tmp_path / "photo.jpg"
+        test_file.write_bytes(data)
+        
+        deduplicator = Deduplicator(hash_algorithm=HashAlgorithm.BLAKE3)
+        
+        assert deduplicator.hash_algorithm == HashAlgorithm.BLAKE3
+        assert deduplicator.calculate_hash(test_file) == blake3.blake3(data).hexdigest()
+    
+    def test_hashers_not_for_security(self, tmp_path):
+        """Test hashers are built with usedforsecurity=False (FIPS-mode OpenSSL)."""
+        photo = tmp_path / "photo.jpg"
+        photo.write_bytes(b"content")
+        deduplicator = Deduplicator()
+        
+        with patch("src.sync_engine.deduplicator.hashlib.new", wraps=hashlib.new) as new:
+            hasher = deduplicator.new_hasher()
+            hasher.update(b"content")
+            assert hasher.hexdigest() == deduplicator.calculate_hash(photo)
+            deduplicator.prefix_key(photo)
+        
+        assert new.call_count == 3
+        for call in new.call_args_list:
+            assert call.kwargs == {"usedforsecurity": False}
+    
+    def test_add_to_index(self, tmp_path):
+        """Test adding a new file makes later copies duplicates."""
+        library = tmp_path / "library"
+        library.mkdir()
+        (library / "a.jpg").write_bytes(b"photo a")
+        
+        deduplicator = Deduplicator()
+        index = deduplicator.build_directory_hash_index(library)
+        
+        new_file = library / "b.jpg"
+        new_file.write_bytes(b"photo b")
+        upload = tmp_path / "upload.jpg"
+        upload.write_bytes(b"photo b")
+        assert deduplicator.check_duplicate_fast(upload, index).is_duplicate is False
+        
+        file_hash = deduplicator.add_to_index(index, new_file)
+        
+        assert index[file_hash] == [new_file]
+        result = deduplicator.check_duplicate_fast(upload, index)
+        assert result.is_duplicate is True
+        assert result.existing_file == new_file
+    
+    def test_remove_deleted_file_from_index(self, tmp_path):
+        """Test removing a deleted file drops its empty hash entry."""
+        library = tmp_path / "library"
+        library.mkdir()
+        photo = library / "a.jpg"
+        photo.write_bytes(b"photo a")
+        
+        deduplicator = Deduplicator()
+        index = deduplicator.build_directory_hash_index(library)
+        photo.unlink()
+        
+        assert deduplicator.remove_from_index(index, photo) is True
+        assert len(index) == 0
+        assert deduplicator.remove_from_index(index, photo) is False
+    
+    def test_modified_file_rehashed_before_reindex(self, tmp_path):
+        """Test the old entry goes even if the cache already has the new hash."""
+        library = tmp_path / "library"
+        library.mkdir()
+        photo = library / "a.jpg"
+        photo.write_bytes(b"old content")
+        
+        deduplicator = Deduplicator()
+        index = deduplicator.build_directory_hash_index(library)
+        old_hash = deduplicator.calculate_hash(photo)
+        
+        photo.write_bytes(b"new content, different size")
+        deduplicator.calculate_hash(photo)  # Cache now holds the new hash
+        new_hash = deduplicator.add_to_index(index, photo)
+        
+        assert old_hash not in index
+        assert index[new_hash] == [photo]
+        
+        upload = tmp_path / "upload.jpg"
+        upload.write_bytes(b"old content")
+        assert deduplicator.check_duplicate_fast(upload, index).is_duplicate is False
+    
+    def test_bloom_filter_has_no_false_negatives(self):
+        """Test every added key is found and few others are."""
+        bloom = _BloomFilter(1000)
+        for i in range(1000):
+            bloom.add(f"key-{i}")
+        
+        assert all(f"key-{i}" in bloom for i in range(1000))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        assert false_positives < 300  # Target rate is 1%
+    
+    def test_read_head_handles_short_reads(self):
+        """Test prefix reads loop over short reads (e.g. network mounts)."""
+        class ShortReads(io.BytesIO):
+            def read(self, size=-1):
+                return super().read(min(size, 1000))
+        
+        data = os.urandom(70000)
+        assert _read_head(ShortReads(data), 65536) == data[:65536]
+        assert _read_head(ShortReads(data[:500]), 65536) == data[:500]
+    
+    def test_prefilter_skips_full_hash_of_unique_file(self, tmp_path):
+        """Test a file unlike any indexed one is ruled out without hashing."""
+        library = tmp_path / "library"
+        library.mkdir()
+        for i in range(10):
+            (library / f"{i}.jpg").write_bytes(os.urandom(1000))
+        
+        deduplicator = Deduplicator()
+        index = deduplicator.build_directory_hash_index(library)
+        assert index.prefilter is not None
+        
+        upload = tmp_path / "upload.jpg"
+        upload.write_bytes(os.urandom(1000))
+        
+        with patch.object(deduplicator, "calculate_hash") as calculate_hash:
+            result = deduplicator.check_duplicate_fast(upload, index)
+        
+        assert result.is_duplicate is False
+        assert result.hash_value is None
+        calculate_hash.assert_not_called()
+    
+    def test_index_reads_each_file_once(self, tmp_path):
+        """Test indexing takes the hash and prefix key from one read per file."""
+        library = tmp_path / "library"
+        library.mkdir()
+        for i in range(5):
+            (library / f"{i}.jpg").write_bytes(os.urandom(100000 + i))
+        
+        deduplicator = Deduplicator()
+        with patch("src.sync_engine.deduplicator.open", create=True, side_effect=open) as opened:
+            deduplicator.build_directory_hash_index(library)
+        
+        assert opened.call_count == 5
+        for i in range(5):
+            photo = library / f"{i}.jpg"
+            fresh = Deduplicator()
+            assert deduplicator.calculate_hash(photo) == fresh.calculate_hash(photo)
+            assert deduplicator.prefix_key(photo) == fresh.prefix_key(photo)
+    
+    def test_prefilter_keeps_duplicates(self, tmp_path):
+        """Test every indexed file's copy passes the pre-filter."""
+        library = tmp_path / "library"
+        library.mkdir()
+        for i in range(10):
+            (library / f"{i}.jpg").write_bytes(os.urandom(1000 + i))
+        
+        deduplicator = Deduplicator()
+        index = deduplicator.build_directory_hash_index(library)
+        
+        for i in range(10):
+            upload = tmp_path / f"upload{i}.jpg"
+            upload.write_bytes((library / f"{i}.jpg").read_bytes())
+            result = deduplicator.check_duplicate_fast(upload, index)
+            assert result.is_duplicate is True
+            assert result.existing_file == library / f"{i}.jpg"
+    
+    def test_hash_cache_reused_until_file_changes(self, tmp_path):
+        """Test cached hashes are dropped on any size, mtime or inode change."""
+        photo = tmp_path / "photo.jpg"
+        photo.write_bytes(b"original")
+        
+        deduplicator = Deduplicator()
+        with patch.object(
+            deduplicator, "_digest_file", wraps=deduplicator._digest_file
+        ) as digest_file:
+            first = deduplicator.calculate_hash(photo)
+            assert deduplicator.calculate_hash(photo) == first
+            assert digest_file.call_count == 1
+            
+            # Same size, mtime one nanosecond later
+            st = photo.stat()
+            os.utime(photo, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+            deduplicator.calculate_hash(photo)
+            assert digest_file.call_count == 2
+            
+            # Atomic replace: new inode, same size and mtime
+            st = photo.stat()
+            replacement = tmp_path / "replacement.jpg"
+            replacement.write_bytes(b"replaced")
+            os.utime(replacement, ns=(st.st_atime_ns, st.st_mtime_ns))
+            os.replace(replacement, photo)
+            assert deduplicator.calculate_hash(photo) != first
+            assert digest_file.call_count == 3
+    
+    def test_hash_cache_persists(self, tmp_path):
+        """Test a new deduplicator reuses hashes from the cache file."""
+        photo = tmp_path / "photo.jpg"
+        photo.write_bytes(b"content")
+        cache_file = str(tmp_path / "cache" / "hashes.db")
+        
+        first = Deduplicator(cache_file=cache_file)
+        file_hash = first.calculate_hash(photo)
+        first.save_cache()
+        
+        second = Deduplicator(cache_file=cache_file)
+        with patch.object(second, "_digest_file") as digest_file:
+            assert second.calculate_hash(photo) == file_hash
+        digest_file.assert_not_called()
+    
+    def test_legacy_json_cache_moved_aside(self, tmp_path):
+        """Test an old JSON cache file is replaced by a persistent database."""
+        photo = tmp_path / "photo.jpg"
+        photo.write_bytes(b"content")
+        cache_file = tmp_path / "hashes.json"
+        cache_file.write_text(json.dumps({str(photo): ["0" * 64, 1700000000.0]}))
+        
+        first = Deduplicator(cache_file=str(cache_file))
+        file_hash = first.calculate_hash(photo)
+        first.save_cache()
+        
+        assert (tmp_path / "hashes.json.legacy").exists()
+        second = Deduplicator(cache_file=str(cache_file))
+        with patch.object(second, "_digest_file") as digest_file:
+            assert second.calculate_hash(photo) == file_hash
+        digest_file.assert_not_called()
+    
+    def test_hash_cache_tagged_by_algorithm(self, tmp_path):
+        """Test hashes of one algorithm are never served for another."""
+        photo = tmp_path / "photo.jpg"
+        photo.write_bytes(b"content")
+        
+        deduplicator = Deduplicator()
+        content_hash = deduplicator.calculate_hash(photo)
+        prefix_key = deduplicator.prefix_key(photo)
+        
+        assert prefix_key != content_hash
+        assert deduplicator.calculate_hash(photo) == content_hash
+
+
+class TestFileMover:
+    """Test suite for moves into the PhotoPrism import directory."""
+    
+    @pytest.fixture
+    def make_mover(self, tmp_path):
+        """Create a file mover for an import mode, with archiving off."""
+        def make(import_mode):
+            config = MagicMock()
+            config.photoprism.import_path = str(tmp_path / "import")
+            config.photoprism.import_mode = import_mode
+            config.monitoring.archive_mode = False
+            return FileMover(config)
+        return make
+    
+    @pytest.fixture
+    def source(self, tmp_path):
+        """Create a source photo."""
+        source = tmp_path / "nextcloud" / "photo.jpg"
+        source.parent.mkdir()
+        source.write_bytes(os.urandom(100_000))
+        return source
+    
+    def test_userspace_copy_rereads_destination(self, make_mover, source, tmp_path):
+        """Test a copy whose destination differs from the source is caught."""
+        mover = make_mover("copy")
+        data = source.read_bytes()
+        
+        def bad_copy(src, dst, hasher, chunk_size):
+            # Hash the real data but write something else
+            Path(dst).write_bytes(b"corrupted")
+            hasher.update(data)
+            return hasher.hexdigest()
+        
+        with patch.object(mover, "_copy_file_range", return_value=False), \
+                patch("src.sync_engine.file_mover.copy_and_hash", bad_copy):
+            result = mover.move_to_photoprism(source)
+        
+        assert result.success is False
+        assert result.verified is False
+        assert source.read_bytes() == data
+        assert not (tmp_path / "import" / "photo.jpg").exists()
+    
+    def test_move_rollback_restores_source(self, make_mover, source, tmp_path):
+        """Test a failed cross-filesystem move puts the only copy back."""
+        mover = make_mover("move")
+        data = source.read_bytes()
+        
+        with patch.object(mover, "_try_rename", return_value=False):
+            result = mover.move_to_photoprism(source, source_hash="0" * 64)
+        
+        assert result.success is False
+        assert source.read_bytes() == data
+        assert not (tmp_path / "import" / "photo.jpg").exists()
+    
+    def test_kernel_copy_skips_hashing(self, make_mover, source):
+        """Test a complete copy_file_range copy is trusted without a hash."""
+        mover = make_mover("copy")
+        
+        with patch.object(mover.deduplicator, "calculate_hash") as calculate_hash:
+            result = mover.move_to_photoprism(source)
+        
+        assert result.success is True
+        assert result.verified is True
+        assert result.destination_path.read_bytes() == source.read_bytes()
+        calculate_hash.assert_not_called()
+    
+    @pytest.mark.parametrize("verify_hash", [True, False])
+    def test_copy_without_copy_file_range(self, make_mover, source, verify_hash):
+        """Test copies fall back to userspace when copy_file_range fails."""
+        mover = make_mover("copy")
+        
+        with patch("os.copy_file_range", create=True,
+                   side_effect=OSError(errno.ENOSYS, "Function not implemented")):
+            result = mover.move_to_photoprism(source, verify_hash=verify_hash)
+        
+        assert result.success is True
+        assert result.verified is verify_hash
+        assert result.destination_path.read_bytes() == source.read_bytes()
+        assert result.destination_path.stat().st_mtime_ns == source.stat().st_mtime_ns
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])